@@ -1,9 +1,10 @@
 # dashboard/views.py
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count
 
 from jobs.models import Job
+from jobs.quantiles import latency_percentiles
+from jobs.stats import user_job_stats
 
 
 @login_required
@@ -11,28 +12,20 @@ def index(request):
     """
     Main dashboard view showing job statistics and recent jobs
     """
-    # Get user's jobs
-    user_jobs = Job.objects.filter(user=request.user)
-
-    # Get counts for each status
-    active_jobs_count = user_jobs.filter(status__in=["pending", "running"]).count()
-    completed_jobs_count = user_jobs.filter(status="completed").count()
-    failed_jobs_count = user_jobs.filter(status="failed").count()
+    stats = user_job_stats(request.user)
+    status_counts = stats["status_counts"]
 
     # Get recent jobs
-    recent_jobs = user_jobs.order_by("-created_at")[:10]
-
-    # Priority statistics
-    priority_counts = user_jobs.values("priority").annotate(count=Count("priority"))
-    priority_stats = {item["priority"]: item["count"] for item in priority_counts}
+    recent_jobs = Job.objects.filter(user=request.user).order_by("-created_at")[:10]
 
     context = {
-        "active_jobs_count": active_jobs_count,
-        "completed_jobs_count": completed_jobs_count,
-        "failed_jobs_count": failed_jobs_count,
+        "active_jobs_count": status_counts["pending"] + status_counts["running"],
+        "completed_jobs_count": status_counts["completed"],
+        "failed_jobs_count": status_counts["failed"],
         "recent_jobs": recent_jobs,
-        "priority_stats": priority_stats,
-        "total_jobs": user_jobs.count(),
+        "priority_stats": stats["priority_counts"],
+        "total_jobs": stats["total_jobs"],
+        "latency": latency_percentiles(request.user)["user"],
     }
 
     return render(request, "dashboard/index.html", context)
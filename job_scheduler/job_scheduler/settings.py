@@ -115,6 +115,136 @@ REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = os.getenv("REDIS_PORT", "6379")
 CELERY_BROKER_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
 CELERY_RESULT_BACKEND = f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
+# Run tasks in the calling process instead of sending them to workers (local
+# development and testing)
+CELERY_TASK_ALWAYS_EAGER = (
+    os.getenv("CELERY_TASK_ALWAYS_EAGER", "False").lower() == "true"
+)
+
+# Job scheduler
+# The scheduler wakes on job submission and completion; this poll is a fallback
+SCHEDULER_POLL_INTERVAL = float(os.getenv("SCHEDULER_POLL_INTERVAL", "30"))
+
+# Number of jobs run at once by a fixed-size worker pool
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "3"))
+
+# Autoscaling pool: bounds, seconds between decisions and before shrinking again,
+# and how soon a pending job's deadline must be to count as deadline pressure
+SCHEDULER_AUTOSCALE = os.getenv("SCHEDULER_AUTOSCALE", "False").lower() == "true"
+SCHEDULER_MIN_WORKERS = int(os.getenv("SCHEDULER_MIN_WORKERS", "1"))
+SCHEDULER_MAX_WORKERS = int(
+    os.getenv("SCHEDULER_MAX_WORKERS", str(os.cpu_count() or 1))
+)
+SCHEDULER_AUTOSCALE_INTERVAL = float(os.getenv("SCHEDULER_AUTOSCALE_INTERVAL", "5"))
+SCHEDULER_AUTOSCALE_COOLDOWN = float(os.getenv("SCHEDULER_AUTOSCALE_COOLDOWN", "30"))
+SCHEDULER_AUTOSCALE_DEADLINE_HORIZON = float(
+    os.getenv("SCHEDULER_AUTOSCALE_DEADLINE_HORIZON", "60")
+)
+
+# Scheduler engine: "thread" (one pool thread per running job) or "async" (one
+# coroutine per running job, for large numbers of I/O-bound jobs)
+SCHEDULER_ENGINE = os.getenv("SCHEDULER_ENGINE", "thread")
+SCHEDULER_ASYNC_MAX_JOBS = int(os.getenv("SCHEDULER_ASYNC_MAX_JOBS", "1000"))
+
+# Maximum jobs running at once per job queue; queues not listed are only bound
+# by the engine's overall limit
+SCHEDULER_QUEUE_CONCURRENCY = {}
+
+# Scheduling policy: "priority" (priority, then earliest deadline), "laxity"
+# (least laxity first: deadline minus estimated duration) or "fair_share"
+# (stride scheduling across users, weighted by SchedulingShare)
+SCHEDULER_POLICY = os.getenv("SCHEDULER_POLICY", "priority")
+SCHEDULER_FAIR_SHARE_DEFAULT_WEIGHT = int(
+    os.getenv("SCHEDULER_FAIR_SHARE_DEFAULT_WEIGHT", "1")
+)
+# Default cap on running jobs per user under fair share; unset for no cap
+SCHEDULER_FAIR_SHARE_MAX_JOBS = (
+    int(os.getenv("SCHEDULER_FAIR_SHARE_MAX_JOBS"))
+    if os.getenv("SCHEDULER_FAIR_SHARE_MAX_JOBS")
+    else None
+)
+
+# Job priorities as "name:level" pairs; higher levels run first. Jobs store the
+# level, so levels can be added or renamed without rewriting existing jobs.
+SCHEDULER_PRIORITY_LEVELS = {
+    name.strip(): int(level)
+    for name, level in (
+        pair.split(":")
+        for pair in os.getenv(
+            "SCHEDULER_PRIORITY_LEVELS", "high:3,medium:2,low:1"
+        ).split(",")
+    )
+}
+# Priority of jobs submitted without one
+SCHEDULER_DEFAULT_PRIORITY = os.getenv("SCHEDULER_DEFAULT_PRIORITY", "medium")
+# Priority aging: seconds a job has to wait to be ranked a priority level
+# higher, so lower priorities can't starve under sustained load; 0 disables it
+SCHEDULER_PRIORITY_AGING = float(os.getenv("SCHEDULER_PRIORITY_AGING", "0"))
+
+# Resolution (seconds) of the timing wheel holding jobs whose run_at is ahead
+SCHEDULER_TIMER_TICK = float(os.getenv("SCHEDULER_TIMER_TICK", "0.01"))
+
+# Recurring jobs: a run missed by more than the grace period (seconds), e.g.
+# while no scheduler was running, is handled by the definition's misfire
+# policy; "catch_up" generates at most SCHEDULER_RECURRING_MAX_CATCH_UP runs
+SCHEDULER_RECURRING_MISFIRE_GRACE = float(
+    os.getenv("SCHEDULER_RECURRING_MISFIRE_GRACE", "60")
+)
+SCHEDULER_RECURRING_MAX_CATCH_UP = int(
+    os.getenv("SCHEDULER_RECURRING_MAX_CATCH_UP", "100")
+)
+
+# What to do with jobs that are unlikely to meet their deadline given the work
+# queued ahead of them: "off", "warn" or "reject"
+SCHEDULER_DEADLINE_CHECK = os.getenv("SCHEDULER_DEADLINE_CHECK", "warn")
+
+# Job leases: a scheduler renews the leases of its running jobs every heartbeat;
+# jobs whose lease expires are requeued until they reach the attempt limit
+SCHEDULER_LEASE_SECONDS = float(os.getenv("SCHEDULER_LEASE_SECONDS", "15"))
+SCHEDULER_HEARTBEAT_INTERVAL = float(os.getenv("SCHEDULER_HEARTBEAT_INTERVAL", "5"))
+SCHEDULER_MAX_ATTEMPTS = int(os.getenv("SCHEDULER_MAX_ATTEMPTS", "3"))
+
+# Job outcomes are written in batches: every flush interval (seconds) or as soon
+# as a batch fills up. A batch size of 1 writes each outcome straight away.
+SCHEDULER_COMPLETION_FLUSH_INTERVAL = float(
+    os.getenv("SCHEDULER_COMPLETION_FLUSH_INTERVAL", "0.01")
+)
+SCHEDULER_COMPLETION_BATCH_SIZE = int(
+    os.getenv("SCHEDULER_COMPLETION_BATCH_SIZE", "100")
+)
+
+# Largest JSON array accepted by the bulk job endpoint; NDJSON is streamed and
+# not limited
+SCHEDULER_BULK_MAX_JSON_BYTES = int(
+    os.getenv("SCHEDULER_BULK_MAX_JSON_BYTES", str(64 * 1024 * 1024))
+)
+
+# Jobs and executions per page of the API, the HTML lists and the WebSocket
+SCHEDULER_PAGE_SIZE = int(os.getenv("SCHEDULER_PAGE_SIZE", "50"))
+
+# Bearer token Prometheus scrapes /metrics with; without one, /metrics is only
+# open to staff users and start_scheduler's --metrics-port to anyone
+SCHEDULER_METRICS_TOKEN = os.getenv("SCHEDULER_METRICS_TOKEN", "")
+
+# Execution backend ("thread", "process", "subprocess" or "celery") for each job
+# queue; a job's own execution_backend overrides its queue's
+SCHEDULER_QUEUE_BACKENDS = {
+    "default": os.getenv("SCHEDULER_DEFAULT_BACKEND", "thread"),
+}
+SCHEDULER_PROCESS_WORKERS = int(
+    os.getenv("SCHEDULER_PROCESS_WORKERS", str(os.cpu_count() or 1))
+)
+
+# Celery backend: the Celery queue jobs are sent to, how many seconds beyond its
+# estimated duration to wait for a job's result before failing it, and how
+# often the async engine polls for results
+SCHEDULER_CELERY_QUEUE = os.getenv("SCHEDULER_CELERY_QUEUE", "celery")
+SCHEDULER_CELERY_RESULT_TIMEOUT = float(
+    os.getenv("SCHEDULER_CELERY_RESULT_TIMEOUT", "300")
+)
+SCHEDULER_CELERY_POLL_INTERVAL = float(
+    os.getenv("SCHEDULER_CELERY_POLL_INTERVAL", "0.05")
+)
 
 # Channel Layer
 CHANNEL_LAYERS = {
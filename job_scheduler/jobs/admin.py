@@ -0,0 +1,24 @@
+from django.contrib import admin
+from .models import RecurringJob, SchedulingShare
+
+
+@admin.register(SchedulingShare)
+class SchedulingShareAdmin(admin.ModelAdmin):
+    list_display = ["user", "weight", "max_concurrent_jobs"]
+    search_fields = ["user__username"]
+
+
+@admin.register(RecurringJob)
+class RecurringJobAdmin(admin.ModelAdmin):
+    list_display = [
+        "name",
+        "user",
+        "cron_expression",
+        "misfire_policy",
+        "enabled",
+        "next_fire_at",
+        "last_fired_at",
+    ]
+    list_filter = ["enabled", "misfire_policy"]
+    search_fields = ["name", "user__username"]
+    readonly_fields = ["next_fire_at", "last_fired_at"]
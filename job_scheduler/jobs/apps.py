@@ -7,3 +7,4 @@ class JobsConfig(AppConfig):
 
     def ready(self):
         """Import signals when the app is ready"""
+        from . import signals  # noqa: F401
@@ -0,0 +1,210 @@
+# jobs/async_scheduler.py
+import asyncio
+import collections
+import logging
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+from . import metrics
+from .executors import CeleryBackend
+from .scheduler import JobScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncJobScheduler(JobScheduler):
+    """
+    Scheduler engine that runs on a single asyncio event loop. Each running job
+    is a coroutine instead of a pool thread, so thousands of I/O-bound or
+    waiting jobs can run at once. Jobs are picked from the same ready queue and
+    claimed the same way as in JobScheduler, with concurrency bounded overall
+    and per queue (SCHEDULER_QUEUE_CONCURRENCY).
+
+    Jobs on the default thread backend run as coroutines and Celery results
+    are polled from the loop; jobs on other backends are handed to that
+    backend without blocking the loop.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._loop_wakeup = None
+        self._queue_load = collections.Counter()
+        super().__init__()
+
+    def configure(self, workers=None, autoscale=None, policy=None, **kwargs):
+        """
+        Set how many jobs may run at once (default: SCHEDULER_ASYNC_MAX_JOBS)
+        and the scheduling policy
+        """
+        if autoscale:
+            raise ValueError("The async engine does not support autoscaling")
+
+        # The thread pool only waits on jobs that run on non-thread backends
+        super().configure(
+            workers=settings.SCHEDULER_WORKERS, autoscale=False, policy=policy
+        )
+        self.pool_size = workers or settings.SCHEDULER_ASYNC_MAX_JOBS
+
+    def notify(self):
+        """Wake the event loop; safe to call from any thread"""
+        super().notify()
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._loop_wakeup.set)
+
+    def _run_scheduler(self):
+        """Run the event loop in the scheduler thread"""
+        asyncio.run(self._run())
+
+    async def _run(self):
+        """
+        Main scheduler loop. Waits for a job event or the safety-net poll, then
+        starts as many jobs as the global and per-queue limits allow.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._loop_wakeup = asyncio.Event()
+        poll_interval = settings.SCHEDULER_POLL_INTERVAL
+        next_poll = time.monotonic() + poll_interval
+        tasks = set()
+
+        while self._running:
+            # Clear before dispatching so wake-ups that arrive meanwhile are kept
+            self._loop_wakeup.clear()
+            iteration_started = time.perf_counter()
+
+            try:
+                await sync_to_async(self._fire_recurring_jobs)()
+
+                available_slots = self.pool_size - len(self._current_jobs)
+                if available_slots > 0:
+                    jobs = await self._get_next_jobs_async(available_slots)
+                    for job in jobs:
+                        self._current_jobs.add(job.id)
+                        task = asyncio.create_task(self._execute_job_async(job))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+
+                    await sync_to_async(self._announce_started)(jobs)
+
+            except Exception as e:
+                logger.error(f"Error in scheduler loop: {e}")
+
+                # Popped jobs may not have been claimed; start from the database
+                self._queue_stale = True
+
+            metrics.LOOP_SECONDS.observe(time.perf_counter() - iteration_started)
+
+            # Wait for the next event or delayed job; the poll is a safety net
+            timeout = min(
+                next_poll - time.monotonic(),
+                self._time_to_next_timer(),
+                self._next_recurring_check - time.time(),
+            )
+            try:
+                await asyncio.wait_for(
+                    self._loop_wakeup.wait(), timeout=max(timeout, 0)
+                )
+            except asyncio.TimeoutError:
+                pass
+
+            if time.monotonic() >= next_poll:
+                next_poll = time.monotonic() + poll_interval
+
+                # Without LISTEN/NOTIFY, jobs submitted by other processes are
+                # only seen by reloading the queue on the safety-net poll
+                if connections[DEFAULT_DB_ALIAS].vendor != "postgresql":
+                    self._queue_stale = True
+
+                # Pick up changed fair-share weights
+                self._shares_stale = True
+
+        # Let running jobs finish their state transitions
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop = None
+
+    async def _get_next_jobs_async(self, limit):
+        """Claim up to ``limit`` jobs from queues that still have capacity"""
+        await sync_to_async(self._sync_queue)()
+
+        queue_limits = settings.SCHEDULER_QUEUE_CONCURRENCY
+        jobs = []
+        while len(jobs) < limit and self._queue:
+            # Pop one job at a time so each pick sees the updated queue load
+            popped = {}
+            while len(jobs) + len(popped) < limit:
+                saturated = {
+                    queue
+                    for queue, queue_limit in queue_limits.items()
+                    if self._queue_load[queue] >= queue_limit
+                }
+                job_id, queue = self._queue.pop_with_partition(exclude=saturated)
+                if job_id is None:
+                    break
+                popped[job_id] = queue
+                self._queue_load[queue] += 1
+
+            if not popped:
+                break
+
+            claimed = await sync_to_async(self._claim_job_ids)(list(popped))
+
+            # Release the capacity reserved for jobs that were not claimed
+            for job in claimed:
+                del popped[job.id]
+            for job_id, queue in popped.items():
+                self._queue_load[queue] -= 1
+                self._queue.job_finished(job_id)
+            jobs.extend(claimed)
+
+        return jobs
+
+    async def _execute_job_async(self, job):
+        """Execute a single job as a coroutine and buffer its outcome"""
+        started_at = timezone.now()
+        try:
+            # Log start
+            logger.info(f"Starting job {job.name} ({job.id})")
+
+            # Only the job body failing fails the job
+            success, error = True, None
+            try:
+                # Run the job body: natively for the thread backend, otherwise
+                # on the job's backend without blocking the loop
+                backend = self.backends.for_job(job)
+                if backend.name == "thread":
+                    await asyncio.sleep(job.estimated_duration)
+                elif isinstance(backend, CeleryBackend):
+                    await backend.execute_async(job)
+                else:
+                    await self._loop.run_in_executor(
+                        self.executor, backend.execute, job
+                    )
+            except Exception as e:
+                success, error = False, e
+
+            try:
+                await self._record_outcome(job, started_at, success, error)
+            except Exception as e:
+                # The outcome stays buffered and is written by the next flush
+                logger.error(f"Error writing the outcome of job {job.id}: {e}")
+
+        finally:
+            self._current_jobs.discard(job.id)
+            self._queue_load[job.queue] -= 1
+            self._queue.job_finished(job.id)
+
+            # A slot just freed up
+            self._loop_wakeup.set()
+
+    async def _record_outcome(self, job, started_at, success, error=None):
+        """Buffer a job's outcome without blocking the loop"""
+        if self.completions.buffering:
+            self.completions.record(job, started_at, success, error)
+        else:
+            # Otherwise recording writes to the database straight away
+            await sync_to_async(self.completions.record)(
+                job, started_at, success, error
+            )
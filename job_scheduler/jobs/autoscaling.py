@@ -0,0 +1,119 @@
+# jobs/autoscaling.py
+import collections
+import time
+
+# Utilization above which a backlog makes the pool grow
+SCALE_UP_UTILIZATION = 0.8
+
+# Utilization below which an idle pool shrinks
+SCALE_DOWN_UTILIZATION = 0.5
+
+# Weight of the newest sample in the utilization moving average
+UTILIZATION_SMOOTHING = 0.3
+
+# Number of recent decisions kept for inspection
+DECISION_HISTORY = 100
+
+
+ScalingDecision = collections.namedtuple(
+    "ScalingDecision",
+    [
+        "timestamp",
+        "previous_size",
+        "new_size",
+        "reason",
+        "queue_depth",
+        "urgent_jobs",
+        "utilization",
+    ],
+)
+
+
+class Autoscaler:
+    """
+    Decides how many jobs the scheduler may run at once, between min_workers
+    and max_workers. The pool grows when jobs are waiting and the workers are
+    busy (at most doubling per decision, unless deadlines are at risk) and
+    shrinks one worker at a time once it has been underused for a cooldown.
+    """
+
+    def __init__(self, min_workers, max_workers, cooldown=30):
+        if not 1 <= min_workers <= max_workers:
+            raise ValueError(
+                f"Invalid pool bounds: min_workers={min_workers}, "
+                f"max_workers={max_workers}"
+            )
+
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.cooldown = cooldown
+        self.utilization = 0.0
+        self.scale_ups = 0
+        self.scale_downs = 0
+        self.reasons = collections.Counter()
+        self.decisions = collections.deque(maxlen=DECISION_HISTORY)
+        self._last_change = 0.0
+
+    def evaluate(self, size, busy, queue_depth, urgent_jobs):
+        """
+        Return the pool size to use next, given the current size, the number of
+        running jobs, the number of pending jobs and how many of those are
+        close to missing their deadline
+        """
+        now = time.monotonic()
+        sample = busy / size if size else 1.0
+        self.utilization += UTILIZATION_SMOOTHING * (sample - self.utilization)
+
+        new_size, reason = size, None
+
+        if urgent_jobs and busy + urgent_jobs > size:
+            # Deadlines at risk: make room for every urgent job right away
+            new_size, reason = busy + urgent_jobs, "deadline pressure"
+
+        elif queue_depth and sample >= SCALE_UP_UTILIZATION:
+            new_size, reason = min(busy + queue_depth, size * 2), "queue depth"
+
+        elif (
+            not queue_depth
+            and self.utilization < SCALE_DOWN_UTILIZATION
+            and now - self._last_change >= self.cooldown
+        ):
+            new_size = max(busy, size - 1)
+            reason = "low utilization"
+
+        new_size = max(self.min_workers, min(self.max_workers, new_size))
+        if new_size == size:
+            return size
+
+        if new_size > size:
+            self.scale_ups += 1
+        else:
+            self.scale_downs += 1
+        self.reasons[reason] += 1
+
+        self._last_change = now
+        self.decisions.append(
+            ScalingDecision(
+                timestamp=time.time(),
+                previous_size=size,
+                new_size=new_size,
+                reason=reason,
+                queue_depth=queue_depth,
+                urgent_jobs=urgent_jobs,
+                utilization=round(self.utilization, 3),
+            )
+        )
+        return new_size
+
+    def metrics(self):
+        """Current scaling state and counters"""
+        last = self.decisions[-1] if self.decisions else None
+        return {
+            "min_workers": self.min_workers,
+            "max_workers": self.max_workers,
+            "utilization": round(self.utilization, 3),
+            "scale_ups": self.scale_ups,
+            "scale_downs": self.scale_downs,
+            "decisions_by_reason": dict(self.reasons),
+            "last_decision": last._asdict() if last else None,
+        }
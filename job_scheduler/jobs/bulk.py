@@ -0,0 +1,155 @@
+# jobs/bulk.py
+import itertools
+import json
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import BaseParser
+from . import counters, feasibility
+from .models import Job, JobLog
+from .scheduler import notify_scheduler
+from .serializers import BulkJobSerializer
+from .signals import broadcast_jobs_created
+
+# Rows validated and inserted at a time
+BULK_CHUNK_SIZE = 1000
+
+
+class BulkJSONParser(BaseParser):
+    """
+    JSON parser for bulk submissions. Unlike DRF's, it reads the body straight
+    from the stream, so arrays of jobs may be larger than
+    DATA_UPLOAD_MAX_MEMORY_SIZE, up to SCHEDULER_BULK_MAX_JSON_BYTES.
+    """
+
+    media_type = "application/json"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        limit = settings.SCHEDULER_BULK_MAX_JSON_BYTES
+        body = stream.read(limit + 1)
+        if len(body) > limit:
+            raise ParseError(
+                f"JSON body is larger than {limit} bytes; send NDJSON instead"
+            )
+        try:
+            return json.loads(body.decode(encoding))
+        except ValueError as e:
+            raise ParseError(f"JSON parse error: {e}")
+
+
+class NDJSONParser(BaseParser):
+    """
+    Newline-delimited JSON, one job per line. Lines are decoded lazily as the
+    view consumes them, so the request body is never held in memory whole.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        return ndjson_rows(stream, encoding)
+
+
+def ndjson_rows(stream, encoding="utf-8"):
+    """Decode each non-blank line of ``stream``"""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line.decode(encoding))
+        except ValueError as e:
+            raise ParseError(f"Line {line_number} is not valid JSON: {e}")
+
+
+def create_jobs(rows, user, context=None):
+    """
+    Validate ``rows`` with the JobSerializer rules and insert them for ``user``,
+    BULK_CHUNK_SIZE at a time, all or nothing. Returns how many jobs were
+    created; any invalid row raises a ValidationError naming the rows (counted
+    from 0) that failed in its chunk. The deadline check reads the backlog
+    once per chunk (see feasibility.Backlog).
+
+    Inserting in bulk skips post_save, so the scheduler is told about the new
+    jobs all at once and the owner gets a single summary over the WebSocket.
+    """
+    created = 0
+    job_ids = []
+    rows = iter(rows)
+    with transaction.atomic():
+        while chunk := list(itertools.islice(rows, BULK_CHUNK_SIZE)):
+            serializer = BulkJobSerializer(data=chunk, many=True, context=context or {})
+            if not serializer.is_valid():
+                # Newer DRF versions report {index: errors}, older ones a list
+                errors = serializer.errors
+                if not isinstance(errors, dict):
+                    errors = dict(enumerate(errors))
+                raise ValidationError(
+                    {
+                        "rows": {
+                            created + index: row_errors
+                            for index, row_errors in errors.items()
+                            if row_errors
+                        }
+                    }
+                )
+
+            jobs = [
+                Job(
+                    user=user,
+                    # bulk_create skips save(), which normally sets this
+                    latest_start_at=Job.compute_latest_start(
+                        values["deadline"], values["estimated_duration"]
+                    ),
+                    **values,
+                )
+                for values in serializer.validated_data
+            ]
+            warnings = check_deadlines(jobs, created)
+            Job.objects.bulk_create(jobs, batch_size=BULK_CHUNK_SIZE)
+            JobLog.objects.bulk_create(
+                JobLog(job=job, message=message, log_type=JobLog.WARNING)
+                for job, message in warnings
+            )
+            counters.jobs_created(jobs)
+            job_ids.extend(job.id for job in jobs)
+            created += len(chunk)
+
+        if created:
+            notify_scheduler(job_ids=job_ids)
+            transaction.on_commit(lambda: broadcast_jobs_created(user.id, created))
+
+    return created
+
+
+def check_deadlines(jobs, offset):
+    """
+    Apply SCHEDULER_DEADLINE_CHECK to a chunk of new ``jobs``, the first of
+    which is row ``offset``: raise a ValidationError naming the jobs unlikely
+    to meet their deadline in "reject" mode, or return ``(job, warning)``
+    pairs to log in "warn" mode
+    """
+    mode = feasibility.check_mode()
+    if mode == "off":
+        return []
+
+    backlog = feasibility.Backlog(jobs)
+    problems = {
+        offset + index: problem
+        for index, job in enumerate(jobs)
+        if (problem := feasibility.deadline_problem(job, backlog=backlog))
+    }
+    if problems and mode == "reject":
+        raise ValidationError(
+            {
+                "rows": {
+                    index: {"deadline": [problem]}
+                    for index, problem in problems.items()
+                }
+            }
+        )
+    return [(jobs[index - offset], problem) for index, problem in problems.items()]
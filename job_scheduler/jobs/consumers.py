@@ -1,7 +1,10 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.core.exceptions import ValidationError
 from .models import Job
+from .pagination import InvalidCursor, keyset_page
+from .stats import user_job_stats
 
 
 class JobConsumer(AsyncWebsocketConsumer):
@@ -44,55 +47,38 @@ class JobConsumer(AsyncWebsocketConsumer):
             await self.send_job_stats()
         elif command == "get_jobs":
             status_filter = data.get("status")
-            await self.send_job_list(status_filter)
+            await self.send_job_list(status_filter, data.get("cursor"))
 
     @database_sync_to_async
     def get_user_jobs_stats(self):
         """Get statistics about the user's jobs"""
-        user_jobs = Job.objects.filter(user=self.user)
-
-        # Get counts by status
-        status_counts = {}
-        for status, _ in Job.STATUS_CHOICES:
-            status_counts[status] = user_jobs.filter(status=status).count()
-
-        # Get counts by priority
-        priority_counts = {}
-        for priority, _ in Job.PRIORITY_CHOICES:
-            priority_counts[priority] = user_jobs.filter(priority=priority).count()
-
-        # Calculate average wait times
-        waiting_times = []
-        completed_jobs = user_jobs.filter(status="completed")
-        for job in completed_jobs:
-            if job.started_at and job.created_at:
-                waiting_times.append((job.started_at - job.created_at).total_seconds())
-
-        avg_wait_time = sum(waiting_times) / len(waiting_times) if waiting_times else 0
-
-        return {
-            "status_counts": status_counts,
-            "priority_counts": priority_counts,
-            "avg_wait_time": avg_wait_time,
-            "total_jobs": user_jobs.count(),
-        }
+        return user_job_stats(self.user)
 
     @database_sync_to_async
-    def get_user_jobs(self, status_filter=None):
-        """Get jobs belonging to the user with optional status filter"""
+    def get_user_jobs(self, status_filter=None, cursor=None):
+        """
+        Get a page of the jobs belonging to the user, newest first, with
+        optional status filter, starting at ``cursor`` if given. Returns a
+        Page of job dicts; an invalid cursor gets the first page.
+        """
         query = Job.objects.filter(user=self.user)
 
         if status_filter and status_filter in dict(Job.STATUS_CHOICES):
             query = query.filter(status=status_filter)
 
+        try:
+            page = keyset_page(query, "-created_at", cursor)
+        except (InvalidCursor, ValidationError):
+            page = keyset_page(query, "-created_at")
+
         jobs = []
-        for job in query.order_by("-created_at"):
+        for job in page.items:
             jobs.append(
                 {
                     "id": str(job.id),
                     "name": job.name,
                     "status": job.status,
-                    "priority": job.priority,
+                    "priority": job.priority_name,
                     "deadline": job.deadline.isoformat() if job.deadline else None,
                     "created_at": job.created_at.isoformat(),
                     "started_at": job.started_at.isoformat()
@@ -107,7 +93,7 @@ class JobConsumer(AsyncWebsocketConsumer):
                 }
             )
 
-        return jobs
+        return page._replace(items=jobs)
 
     async def send_job_stats(self):
         """Send job statistics to the WebSocket"""
@@ -115,11 +101,23 @@ class JobConsumer(AsyncWebsocketConsumer):
 
         await self.send(text_data=json.dumps({"type": "stats", "data": stats}))
 
-    async def send_job_list(self, status_filter=None):
-        """Send job list to the WebSocket"""
-        jobs = await self.get_user_jobs(status_filter)
+    async def send_job_list(self, status_filter=None, cursor=None):
+        """
+        Send a page of the job list to the WebSocket, with the cursors to send
+        back with get_jobs for the next and previous pages
+        """
+        page = await self.get_user_jobs(status_filter, cursor)
 
-        await self.send(text_data=json.dumps({"type": "jobs", "data": jobs}))
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "type": "jobs",
+                    "data": page.items,
+                    "next": page.next_cursor,
+                    "previous": page.previous_cursor,
+                }
+            )
+        )
 
     async def job_update(self, event):
         """Handle job update event from channel layer"""
@@ -127,6 +125,12 @@ class JobConsumer(AsyncWebsocketConsumer):
             text_data=json.dumps({"type": "job_update", "data": event["data"]})
         )
 
+    async def jobs_created(self, event):
+        """Handle the summary of jobs created in bulk"""
+        await self.send(
+            text_data=json.dumps({"type": "jobs_created", "data": event["data"]})
+        )
+
     async def stats_update(self, event):
         """Handle stats update event from channel layer"""
         await self.send(text_data=json.dumps({"type": "stats", "data": event["data"]}))
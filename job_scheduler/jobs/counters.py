@@ -0,0 +1,291 @@
+# jobs/counters.py
+import collections
+import math
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DurationField, F, Q, Sum
+from .models import Job, UserJobCounters
+
+# Fields of the state a job contributes to its owner's counters
+COUNTED_FIELDS = (
+    "user_id",
+    "status",
+    "priority",
+    "created_at",
+    "started_at",
+    "completed_at",
+)
+
+# Running sums of seconds may differ from a fresh count by rounding alone
+SECONDS_TOLERANCE = 1e-3
+
+# Counts by priority level are kept in UserJobCounters.priority_counts, so any
+# number of levels can be counted; elsewhere they are named with this prefix
+PRIORITY_PREFIX = "priority_"
+
+
+def priority_field(priority):
+    """Counter name for a priority level"""
+    return f"{PRIORITY_PREFIX}{priority}"
+
+
+def counter_fields():
+    """The counter columns, besides priority_counts"""
+    return [
+        *(status for status, _ in Job.STATUS_CHOICES),
+        "timed_jobs",
+        "total_wait_time",
+        "total_execution_time",
+    ]
+
+
+def stored_counts(counters):
+    """``{field: value}`` of a UserJobCounters row, as count_jobs() gives them"""
+    counts = {field: getattr(counters, field) for field in counter_fields()}
+    for level, count in counters.priority_counts.items():
+        counts[priority_field(level)] = count
+    return counts
+
+
+def set_counts(counters, counts):
+    """Set a UserJobCounters row to ``{field: value}``; missing fields are 0"""
+    for field in counter_fields():
+        setattr(counters, field, counts.get(field, 0))
+    counters.priority_counts = {
+        field[len(PRIORITY_PREFIX) :]: value
+        for field, value in counts.items()
+        if field.startswith(PRIORITY_PREFIX) and value
+    }
+
+
+def job_counts(status, priority, created_at, started_at, completed_at):
+    """What one job in this state adds to its owner's counters"""
+    counts = {status: 1, priority_field(priority): 1}
+    # Only completed jobs count towards the average wait and execution time
+    if status == "completed" and started_at and completed_at:
+        counts["timed_jobs"] = 1
+        counts["total_wait_time"] = (started_at - created_at).total_seconds()
+        counts["total_execution_time"] = (completed_at - started_at).total_seconds()
+    return counts
+
+
+def job_state(job):
+    """The counted fields of a Job instance, user_id first"""
+    return tuple(getattr(job, field) for field in COUNTED_FIELDS)
+
+
+def add(deltas, state, sign=1):
+    """Add what a job in ``state`` (see job_state) contributes, times ``sign``"""
+    user_id, *fields = state
+    user_deltas = deltas.setdefault(user_id, collections.defaultdict(int))
+    for field, value in job_counts(*fields).items():
+        user_deltas[field] += sign * value
+
+
+def jobs_created(jobs):
+    """Count Job instances that were just inserted without save()"""
+    deltas = {}
+    for job in jobs:
+        add(deltas, job_state(job))
+    apply(deltas)
+
+
+def jobs_moved(jobs, from_status):
+    """Count Job instances whose status was just changed from ``from_status``"""
+    deltas = {}
+    for job in jobs:
+        # Jobs only leave pending or running, which have no times counted
+        add(deltas, (job.user_id, from_status, job.priority, None, None, None), -1)
+        add(deltas, job_state(job))
+    apply(deltas)
+
+
+def jobs_deleted(counts):
+    """Take jobs counted by count_jobs() and since deleted off the counters"""
+    apply(
+        {
+            user_id: {field: -value for field, value in user_counts.items()}
+            for user_id, user_counts in counts.items()
+        }
+    )
+
+
+def state_before_save(job):
+    """
+    The counted state of ``job`` as stored, or None if it is about to be
+    inserted. Loaded jobs remember it; others are looked up.
+    """
+    if job._state.adding:
+        return None
+
+    state = getattr(job, "_counted_state", None)
+    if state is None:
+        state = Job.objects.filter(pk=job.pk).values_list(*COUNTED_FIELDS).first()
+    return state
+
+
+def job_saved(job, previous):
+    """Count a save() of ``job``, which was in state ``previous`` before it"""
+    state = job_state(job)
+    job._counted_state = state
+    if state == previous:
+        return
+
+    deltas = {}
+    if previous is not None:
+        add(deltas, previous, -1)
+    add(deltas, state)
+    apply(deltas)
+
+
+def count_jobs(jobs):
+    """
+    Counters for the owners of the Job queryset ``jobs``, worked out from
+    scratch in one aggregate grouped by owner and priority: ``{user_id:
+    {field: value}}``
+    """
+    timed = Q(status="completed", started_at__isnull=False, completed_at__isnull=False)
+    aggregates = {
+        status: Count("id", filter=Q(status=status)) for status, _ in Job.STATUS_CHOICES
+    }
+    aggregates["priority_jobs"] = Count("id")
+    aggregates["timed_jobs"] = Count("id", filter=timed)
+    aggregates["total_wait_time"] = Sum(
+        F("started_at") - F("created_at"), output_field=DurationField(), filter=timed
+    )
+    aggregates["total_execution_time"] = Sum(
+        F("completed_at") - F("started_at"), output_field=DurationField(), filter=timed
+    )
+
+    counts = {}
+    rows = jobs.order_by().values("user_id", "priority").annotate(**aggregates)
+    for row in rows:
+        user_counts = counts.setdefault(row.pop("user_id"), collections.Counter())
+        user_counts[priority_field(row.pop("priority"))] += row.pop("priority_jobs")
+        for field in ("total_wait_time", "total_execution_time"):
+            row[field] = row[field].total_seconds() if row[field] else 0.0
+        user_counts.update(row)
+    return {user_id: dict(user_counts) for user_id, user_counts in counts.items()}
+
+
+def apply(deltas):
+    """
+    Add ``{user_id: {field: delta}}`` to the users' counters in the caller's
+    transaction: the rows are locked, changed and written back with two
+    queries however many users there are. A user without counters yet gets
+    them counted from their jobs, which already include the change.
+    """
+    deltas = {
+        user_id: user_deltas
+        for user_id, user_deltas in deltas.items()
+        if any(user_deltas.values())
+    }
+    if not deltas:
+        return
+
+    with transaction.atomic(savepoint=False):
+        # Locking in one order keeps concurrent transitions from deadlocking
+        rows = list(
+            UserJobCounters.objects.select_for_update()
+            .filter(user_id__in=deltas)
+            .order_by("user_id")
+        )
+        for counters in rows:
+            counts = stored_counts(counters)
+            for field, delta in deltas[counters.user_id].items():
+                counts[field] = counts.get(field, 0) + delta
+            set_counts(counters, counts)
+        UserJobCounters.objects.bulk_update(
+            rows, [*counter_fields(), "priority_counts"]
+        )
+
+        missing = deltas.keys() - {counters.user_id for counters in rows}
+        if missing:
+            create_counters(missing, deltas)
+
+
+def create_counters(user_ids, deltas=None):
+    """
+    Count the jobs of users who have no counters yet and store them. A row
+    someone else inserted first was counted without the caller's uncommitted
+    changes, so their ``deltas`` (as apply() takes them) are added to it.
+    """
+    counts = count_jobs(Job.objects.filter(user_id__in=user_ids))
+    lost = {}
+    for user_id in sorted(user_ids):
+        counters = UserJobCounters(user_id=user_id)
+        set_counts(counters, counts.get(user_id, {}))
+        try:
+            with transaction.atomic():
+                counters.save(force_insert=True)
+        except IntegrityError:
+            # Someone else got there first, counting without our changes
+            if deltas and user_id in deltas:
+                lost[user_id] = deltas[user_id]
+
+    if lost:
+        apply(lost)
+
+
+def get_counters(user):
+    """The counters of ``user`` (a User or a user id), created if missing"""
+    user_id = getattr(user, "pk", user)
+    counters = UserJobCounters.objects.filter(user_id=user_id).first()
+    if counters is None:
+        create_counters([user_id])
+        counters = UserJobCounters.objects.get(user_id=user_id)
+    return counters
+
+
+def rebuild(dry_run=False):
+    """
+    Recount every user's jobs and overwrite their counters, unless
+    ``dry_run``. Returns the drift found, ``{user_id: {field: (stored,
+    counted)}}``; users without counters are reported with None stored.
+    """
+    fields = [*counter_fields(), "priority_counts"]
+    with transaction.atomic():
+        # Transitions wait for the lock and then count on top of the rebuild
+        stored = {
+            counters.user_id: counters
+            for counters in UserJobCounters.objects.select_for_update().order_by(
+                "user_id"
+            )
+        }
+        counted = count_jobs(Job.objects.all())
+
+        drift = {}
+        to_update = []
+        to_create = []
+        for user_id in stored.keys() | counted.keys():
+            values = {field: 0 for field in counter_fields()}
+            values.update(counted.get(user_id, {}))
+            counters = stored.get(user_id)
+            if counters is None:
+                drift[user_id] = {
+                    field: (None, value) for field, value in sorted(values.items())
+                }
+                counters = UserJobCounters(user_id=user_id)
+                set_counts(counters, values)
+                to_create.append(counters)
+                continue
+
+            current = stored_counts(counters)
+            differences = {
+                field: (current.get(field, 0), values.get(field, 0))
+                for field in sorted(current.keys() | values.keys())
+                if not math.isclose(
+                    current.get(field, 0),
+                    values.get(field, 0),
+                    abs_tol=SECONDS_TOLERANCE,
+                )
+            }
+            if differences:
+                drift[user_id] = differences
+                set_counts(counters, values)
+                to_update.append(counters)
+
+        if not dry_run:
+            UserJobCounters.objects.bulk_update(to_update, fields, batch_size=1000)
+            UserJobCounters.objects.bulk_create(to_create, batch_size=1000)
+
+    return drift
@@ -0,0 +1,154 @@
+# jobs/cron.py
+from datetime import timedelta
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+# Shorthands accepted in place of the five fields
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+MONTH_NAMES = {
+    name: number
+    for number, name in enumerate(
+        ["jan", "feb", "mar", "apr", "may", "jun"]
+        + ["jul", "aug", "sep", "oct", "nov", "dec"],
+        start=1,
+    )
+}
+DAY_NAMES = {
+    name: number
+    for number, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])
+}
+
+# Give up looking for a matching time this far ahead (e.g. "0 0 30 2 *")
+SEARCH_LIMIT = timedelta(days=366 * 5)
+
+
+class CronExpression:
+    """
+    Standard five-field cron expression: minute, hour, day of month, month and
+    day of week. Fields take ``*``, numbers, ranges (``1-5``), steps (``*/15``,
+    ``10-50/10``), comma-separated lists and, for months and days of the week,
+    three-letter names. ``@hourly``, ``@daily`` and the other usual macros are
+    accepted too. As in cron, when both day fields are restricted a day
+    matching either of them fires.
+
+    Times are matched in the current time zone (settings.TIME_ZONE).
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = MACROS.get(expression.strip().lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(
+                f"Cron expression {expression!r} must have 5 fields, got {len(fields)}"
+            )
+
+        minute, hour, day, month, weekday = fields
+        self.minutes = self._parse(minute, 0, 59)
+        self.hours = self._parse(hour, 0, 23)
+        self.days = self._parse(day, 1, 31)
+        self.months = self._parse(month, 1, 12, MONTH_NAMES)
+
+        # Both 0 and 7 mean Sunday
+        self.weekdays = {value % 7 for value in self._parse(weekday, 0, 7, DAY_NAMES)}
+
+        # Fields starting with "*" (like "*/2") don't count as restricted
+        self._any_day = day.startswith("*")
+        self._any_weekday = weekday.startswith("*")
+
+    def __str__(self):
+        return self.expression
+
+    def matches_day(self, moment):
+        """Whether the day fields allow ``moment``'s date"""
+        day_ok = moment.day in self.days
+        # isoweekday() is 1 (Monday) to 7 (Sunday); cron counts from Sunday = 0
+        weekday_ok = moment.isoweekday() % 7 in self.weekdays
+
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment):
+        """First fire time strictly after the aware datetime ``moment``"""
+        local = timezone.localtime(moment)
+        candidate = local.replace(tzinfo=None, second=0, microsecond=0)
+        candidate += timedelta(minutes=1)
+        limit = candidate + SEARCH_LIMIT
+
+        while candidate < limit:
+            if candidate.month not in self.months:
+                # First day of the next month
+                candidate = (candidate.replace(day=1) + timedelta(days=32)).replace(
+                    day=1, hour=0, minute=0
+                )
+            elif not self.matches_day(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                fire_at = timezone.make_aware(candidate)
+                # Wall-clock times repeated by a DST change only fire once
+                if fire_at > moment:
+                    return fire_at
+                candidate += timedelta(minutes=1)
+
+        raise ValueError(f"Cron expression {self.expression!r} never fires")
+
+    @staticmethod
+    def _parse(field, low, high, names=None):
+        """Set of values a field allows"""
+        values = set()
+        for part in field.lower().split(","):
+            if "/" in part:
+                part, step = part.split("/", 1)
+                step = CronExpression._number(step, 1, high, None)
+            else:
+                step = 1
+
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start, end = part.split("-", 1)
+                start = CronExpression._number(start, low, high, names)
+                end = CronExpression._number(end, low, high, names)
+                if start > end:
+                    raise ValueError(f"Invalid cron range {part!r}")
+            else:
+                start = CronExpression._number(part, low, high, names)
+                # "5/15" means every 15 from 5
+                end = high if step > 1 else start
+
+            values.update(range(start, end + 1, step))
+        return values
+
+    @staticmethod
+    def _number(value, low, high, names):
+        """A field value given as a number or a name, checked against its bounds"""
+        if names and value in names:
+            return names[value]
+        if not value.isdigit():
+            raise ValueError(f"Invalid cron value {value!r}")
+
+        number = int(value)
+        if not low <= number <= high:
+            raise ValueError(f"Cron value {number} is outside {low}-{high}")
+        return number
+
+
+def validate_cron(expression):
+    """Model field validator for cron expressions"""
+    try:
+        CronExpression(expression).next_after(timezone.now())
+    except ValueError as e:
+        raise ValidationError(str(e))
@@ -0,0 +1,98 @@
+# jobs/dependencies.py
+from django.db.models import Count, F, OuterRef, QuerySet, Subquery
+from django.utils import timezone
+from . import counters
+from .models import Job, JobLog
+
+# Edge table of Job.dependencies: from_job depends on to_job
+Edge = Job.dependencies.through
+
+
+def children_of(job_ids):
+    """Subquery of the ids of jobs that depend on any of ``job_ids``"""
+    return Edge.objects.filter(to_job__in=job_ids).values("from_job")
+
+
+def release_dependents(job_ids):
+    """
+    Count the completion of ``job_ids`` (a list, or a queryset of ids) against
+    the jobs that depend on them, in one UPDATE, and return the ids of the
+    pending jobs it made runnable. Each job's counter drops by the number of
+    its parents in ``job_ids``, and its updated_at is set, so a released job's
+    priority ages from its release (see Job.compute_ready_at).
+    """
+    if not isinstance(job_ids, QuerySet) and not job_ids:
+        return []
+
+    completed_parents = (
+        Edge.objects.filter(from_job=OuterRef("pk"), to_job__in=job_ids)
+        .values("from_job")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    released = Job.objects.filter(id__in=children_of(job_ids)).update(
+        remaining_dependencies=F("remaining_dependencies")
+        - Subquery(completed_parents),
+        updated_at=timezone.now(),
+    )
+    if not released:
+        return []
+
+    return list(
+        Job.objects.filter(
+            id__in=children_of(job_ids), status="pending", remaining_dependencies=0
+        ).values_list("id", flat=True)
+    )
+
+
+def release_unfinished(jobs):
+    """
+    Release the jobs waiting on the unfinished jobs in the queryset ``jobs``,
+    which are about to be deleted, and queue those made runnable
+    """
+    # Imported here because the scheduler imports this module
+    from .scheduler import notify_scheduler
+
+    unfinished = jobs.filter(status__in=["pending", "running"]).values("id")
+    for job_id in release_dependents(unfinished):
+        notify_scheduler(job_id)
+
+
+def fail_dependents(job_ids, now):
+    """
+    Fail every pending job downstream of the failed ``job_ids``, one level of
+    the graph per query, and return them. Each edge is followed once.
+    """
+    failed = []
+    frontier = list(job_ids)
+    while frontier:
+        descendants = list(
+            Job.objects.filter(id__in=children_of(frontier), status="pending")
+        )
+        if not descendants:
+            break
+
+        Job.objects.filter(id__in=[job.id for job in descendants]).update(
+            status="failed", completed_at=now, updated_at=now
+        )
+        for job in descendants:
+            job.status = "failed"
+            job.completed_at = job.updated_at = now
+        counters.jobs_moved(descendants, "pending")
+        failed.extend(descendants)
+        frontier = [job.id for job in descendants]
+
+    JobLog.objects.bulk_create(
+        JobLog(
+            job=job,
+            message="Not run because a job it depends on failed",
+            log_type=JobLog.ERROR,
+        )
+        for job in failed
+    )
+    return failed
+
+
+def unfinished_count(parents):
+    """How many of ``parents`` have not completed yet"""
+    return sum(1 for parent in parents if parent.status != "completed")
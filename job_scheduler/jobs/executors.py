@@ -0,0 +1,211 @@
+# jobs/executors.py
+import asyncio
+import json
+import multiprocessing
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from celery.exceptions import TimeoutError as CeleryTimeoutError
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from .tasks import run_job_task
+from .worker import run_job
+
+
+class JobBodyError(Exception):
+    """Raised when a job body reports failure"""
+
+
+class ExecutionBackend:
+    """
+    Runs job bodies for the scheduler. ``execute`` is called from a scheduler
+    worker thread and blocks until the body finishes; all database state
+    transitions stay with the caller.
+    """
+
+    name = None
+
+    def execute(self, job):
+        """Run the job body, returning its execution time or raising JobBodyError"""
+        success, error_message, execution_time = self.run(job_payload(job))
+        if not success:
+            raise JobBodyError(error_message)
+        return execution_time
+
+    def run(self, payload):
+        """Run a payload and return the worker's result tuple"""
+        raise NotImplementedError
+
+    def shutdown(self):
+        """Release any workers held by the backend"""
+
+
+class ThreadBackend(ExecutionBackend):
+    """Runs the body in the calling scheduler thread"""
+
+    name = "thread"
+
+    def run(self, payload):
+        return run_job(payload)
+
+
+class ProcessBackend(ExecutionBackend):
+    """Runs the body in a pool of worker processes, one core each"""
+
+    name = "process"
+
+    def __init__(self):
+        # Spawned workers only import jobs.worker, never Django or the DB state
+        self._pool = ProcessPoolExecutor(
+            max_workers=settings.SCHEDULER_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def run(self, payload):
+        return self._pool.submit(run_job, payload).result()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class SubprocessBackend(ExecutionBackend):
+    """Runs each body in a fresh ``python -m jobs.worker`` process"""
+
+    name = "subprocess"
+
+    def run(self, payload):
+        completed = subprocess.run(
+            [sys.executable, "-m", "jobs.worker"],
+            input=json.dumps(payload),
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+        )
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()
+            return False, error[-1] if error else "Worker process failed", None
+        return tuple(json.loads(completed.stdout))
+
+
+class CeleryBackend(ExecutionBackend):
+    """
+    Hands the body to Celery workers, which may run on other hosts, and waits
+    for the task result. The scheduler keeps deciding what runs when and
+    records every outcome itself, so workers never need the database.
+    """
+
+    name = "celery"
+
+    def submit(self, payload):
+        """Send a payload to the workers and return its AsyncResult"""
+        return run_job_task.apply_async(
+            args=[payload], queue=settings.SCHEDULER_CELERY_QUEUE
+        )
+
+    def run(self, payload):
+        result = self.submit(payload)
+        try:
+            # Scheduler threads are never inside a task, though eager tasks
+            # running in other threads can make Celery think they are
+            result.get(
+                timeout=self.timeout(payload),
+                propagate=False,
+                disable_sync_subtasks=False,
+            )
+        except CeleryTimeoutError:
+            return self._timed_out(result, payload)
+        return self._outcome(result)
+
+    async def execute_async(self, job):
+        """
+        Like execute, but polls for the result so that the async engine can
+        wait on any number of remote jobs without holding a thread each
+        """
+        payload = job_payload(job)
+        result = self.submit(payload)
+        give_up_at = time.monotonic() + self.timeout(payload)
+
+        while not result.ready():
+            if time.monotonic() > give_up_at:
+                success, error_message, execution_time = self._timed_out(
+                    result, payload
+                )
+                break
+            await asyncio.sleep(settings.SCHEDULER_CELERY_POLL_INTERVAL)
+        else:
+            success, error_message, execution_time = self._outcome(result)
+
+        if not success:
+            raise JobBodyError(error_message)
+        return execution_time
+
+    @staticmethod
+    def timeout(payload):
+        """Seconds to wait for a job's result before giving up on its worker"""
+        return payload["estimated_duration"] + settings.SCHEDULER_CELERY_RESULT_TIMEOUT
+
+    @staticmethod
+    def _outcome(result):
+        """The worker's result tuple for a finished task"""
+        if not result.successful():
+            # The task raised, or the worker running it was lost
+            return False, f"Celery task failed: {result.result!r}", None
+        return tuple(result.result)
+
+    def _timed_out(self, result, payload):
+        """Stop waiting for a task: revoke it and report the job as failed"""
+        result.revoke()
+        return (
+            False,
+            f"No result from a Celery worker within {self.timeout(payload):g}s",
+            None,
+        )
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (ThreadBackend, ProcessBackend, SubprocessBackend, CeleryBackend)
+}
+
+
+def job_payload(job):
+    """The part of a job a worker needs to run it"""
+    return {
+        "job_id": str(job.id),
+        "name": job.name,
+        "estimated_duration": job.estimated_duration,
+    }
+
+
+class ExecutionBackends:
+    """Backends by name, created on first use"""
+
+    def __init__(self):
+        self._backends = {}
+        self._lock = threading.Lock()
+
+    def for_job(self, job):
+        """The job's own backend, or else its queue's"""
+        queue_backends = settings.SCHEDULER_QUEUE_BACKENDS
+        name = job.execution_backend or queue_backends.get(
+            job.queue, queue_backends["default"]
+        )
+        return self.get(name)
+
+    def get(self, name):
+        """The backend called ``name``"""
+        with self._lock:
+            if name not in self._backends:
+                if name not in BACKENDS:
+                    raise ImproperlyConfigured(f"Unknown execution backend: {name}")
+                self._backends[name] = BACKENDS[name]()
+            return self._backends[name]
+
+    def shutdown(self):
+        """Shut down every backend created so far"""
+        with self._lock:
+            for backend in self._backends.values():
+                backend.shutdown()
+            self._backends = {}
@@ -0,0 +1,201 @@
+# jobs/feasibility.py
+import bisect
+import itertools
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q, Sum
+from django.utils import timezone
+from .models import Job, JobLog
+
+DEADLINE_CHECK_MODES = ("off", "warn", "reject")
+
+
+def check_mode():
+    """The configured SCHEDULER_DEADLINE_CHECK mode"""
+    mode = settings.SCHEDULER_DEADLINE_CHECK
+    if mode not in DEADLINE_CHECK_MODES:
+        raise ImproperlyConfigured(
+            f"Unknown SCHEDULER_DEADLINE_CHECK {mode!r}; "
+            f"expected one of {', '.join(DEADLINE_CHECK_MODES)}"
+        )
+    return mode
+
+
+def worker_count():
+    """Number of jobs the scheduler runs at once, at most"""
+    if settings.SCHEDULER_AUTOSCALE:
+        return max(settings.SCHEDULER_MAX_WORKERS, 1)
+    return max(settings.SCHEDULER_WORKERS, 1)
+
+
+def ahead_of(job, policy=None):
+    """Condition matching pending jobs the policy would dispatch before ``job``"""
+    policy = policy or settings.SCHEDULER_POLICY
+    latest_start_at = Job.compute_latest_start(job.deadline, job.estimated_duration)
+
+    if policy == "laxity":
+        return Q(latest_start_at__lte=latest_start_at)
+
+    # Priority order; fair share also orders each user's jobs this way
+    return Q(priority__gt=job.priority) | Q(
+        priority=job.priority, deadline__lte=job.deadline
+    )
+
+
+def runnable(now):
+    """
+    Condition matching pending jobs the scheduler could start at ``now``: not
+    waiting on dependencies and not delayed past ``now``. Within the partial
+    index the claim query uses.
+    """
+    return Q(status="pending", remaining_dependencies=0) & (
+        Q(run_at__isnull=True) | Q(run_at__lte=now)
+    )
+
+
+def running_work(now, exclude=None):
+    """Seconds left of the running jobs' estimates, but ``exclude``'s (an id)"""
+    running = Job.objects.filter(status="running")
+    if exclude is not None:
+        running = running.exclude(id=exclude)
+    return sum(
+        (
+            max(duration - (now - started_at).total_seconds(), 0)
+            if started_at
+            else duration
+        )
+        for duration, started_at in running.values_list(
+            "estimated_duration", "started_at"
+        )
+    )
+
+
+def work_ahead(job, policy=None, now=None):
+    """
+    Seconds of estimated work that has to finish, or at least start, before
+    ``job`` can: what is left of the running jobs' estimates plus the runnable
+    pending jobs queued ahead of it. Jobs that are delayed or waiting on
+    dependencies can't take a worker yet, so they don't count. Two queries:
+    the running jobs, at most one per worker, and one aggregate over the
+    pending index.
+    """
+    now = now or timezone.now()
+    queued = (
+        Job.objects.filter(runnable(now) & ahead_of(job, policy))
+        .exclude(id=job.id)
+        .aggregate(total=Sum("estimated_duration"))["total"]
+    )
+    return running_work(now, exclude=job.id) + (queued or 0)
+
+
+class Backlog:
+    """
+    The work ahead of new jobs, read once to check many of them, e.g. a chunk
+    of a bulk submission: work_ahead() for each job without a query each.
+    The runnable pending jobs are read summed by the key the policy orders
+    them by, and the new ``jobs`` themselves queue ahead of one another.
+    """
+
+    def __init__(self, jobs=(), policy=None, now=None):
+        self.policy = policy or settings.SCHEDULER_POLICY
+        self.now = now or timezone.now()
+        self.running = running_work(self.now)
+
+        new = [job for job in jobs if not job.run_at or job.run_at <= self.now]
+        self._new_ids = {job.id for job in new}
+        pending = Job.objects.filter(runnable(self.now)).order_by()
+        if self.policy == "laxity":
+            rows = [
+                (None, latest_start_at, total)
+                for latest_start_at, total in pending.filter(
+                    latest_start_at__isnull=False
+                )
+                .values("latest_start_at")
+                .annotate(total=Sum("estimated_duration"))
+                .values_list("latest_start_at", "total")
+            ]
+            rows.extend(
+                (None, self._latest_start(job), job.estimated_duration) for job in new
+            )
+        else:
+            rows = list(
+                pending.values("priority", "deadline")
+                .annotate(total=Sum("estimated_duration"))
+                .values_list("priority", "deadline", "total")
+            )
+            rows.extend(
+                (job.priority, job.deadline, job.estimated_duration) for job in new
+            )
+
+        # {priority level (None for laxity): (sorted keys, running totals)}
+        self._levels = {}
+        rows.sort(key=lambda row: (row[0] is None, row[0] or 0, row[1]))
+        for level, level_rows in itertools.groupby(rows, key=lambda row: row[0]):
+            keys, totals = [], []
+            for _, key, total in level_rows:
+                keys.append(key)
+                totals.append((totals[-1] if totals else 0) + total)
+            self._levels[level] = (keys, totals)
+
+    @staticmethod
+    def _latest_start(job):
+        return Job.compute_latest_start(job.deadline, job.estimated_duration)
+
+    def _up_to(self, level, key):
+        """Seconds of work at ``level`` with a key up to ``key``"""
+        keys, totals = self._levels.get(level, ((), ()))
+        index = bisect.bisect_right(keys, key)
+        return totals[index - 1] if index else 0
+
+    def work_ahead(self, job):
+        """What work_ahead() gives for ``job``, from the backlog read"""
+        if self.policy == "laxity":
+            queued = self._up_to(None, self._latest_start(job))
+        else:
+            queued = self._up_to(job.priority, job.deadline) + sum(
+                totals[-1]
+                for level, (_, totals) in self._levels.items()
+                if level > job.priority
+            )
+
+        # A new job is part of the backlog but not ahead of itself
+        if job.id in self._new_ids:
+            queued -= job.estimated_duration
+        return self.running + queued
+
+
+def estimated_completion(job, policy=None, now=None, backlog=None):
+    """
+    When ``job`` would finish if the work ahead is spread over every worker.
+    The work ahead is read from ``backlog`` (a Backlog) when given.
+    """
+    now = backlog.now if backlog else now or timezone.now()
+    work = backlog.work_ahead(job) if backlog else work_ahead(job, policy, now)
+    start = now + timedelta(seconds=work / worker_count())
+
+    # A delayed job cannot start before its run_at, however idle the workers
+    if job.run_at and job.run_at > start:
+        start = job.run_at
+    return start + timedelta(seconds=job.estimated_duration)
+
+
+def deadline_problem(job, policy=None, backlog=None):
+    """Explain why ``job`` is unlikely to meet its deadline, or return None"""
+    if job.deadline is None or not job.estimated_duration:
+        return None
+
+    finish = estimated_completion(job, policy, backlog=backlog)
+    if finish <= job.deadline:
+        return None
+
+    late = (finish - job.deadline).total_seconds()
+    return (
+        f"Job is expected to finish around {finish:%Y-%m-%d %H:%M:%S}, "
+        f"{late:.0f}s after its deadline, given the work queued ahead of it"
+    )
+
+
+def log_deadline_warning(job, message):
+    """Record a deadline warning in the job's log"""
+    JobLog.objects.create(job=job, message=message, log_type=JobLog.WARNING)
@@ -1,6 +1,7 @@
 from django import forms
 from django.utils import timezone
 from datetime import timedelta
+from . import feasibility
 from .models import Job
 
 
@@ -11,10 +12,26 @@ class JobForm(forms.ModelForm):
         ),
         help_text="Deadline for job completion",
     )
+    run_at = forms.DateTimeField(
+        required=False,
+        widget=forms.DateTimeInput(
+            attrs={"type": "datetime-local"}, format="%Y-%m-%dT%H:%M"
+        ),
+        help_text="Don't start the job before this time; leave blank to run it as "
+        "soon as possible",
+    )
 
     class Meta:
         model = Job
-        fields = ["name", "estimated_duration", "priority", "deadline"]
+        fields = [
+            "name",
+            "estimated_duration",
+            "priority",
+            "deadline",
+            "run_at",
+            "queue",
+            "execution_backend",
+        ]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -38,3 +55,30 @@ class JobForm(forms.ModelForm):
         if duration <= 0:
             raise forms.ValidationError("Duration must be greater than zero")
         return duration
+
+    def clean(self):
+        """Check the job can meet its deadline given the current backlog"""
+        cleaned_data = super().clean()
+        self.deadline_warning = None
+
+        run_at = cleaned_data.get("run_at")
+        deadline = cleaned_data.get("deadline")
+        if run_at and deadline and run_at >= deadline:
+            self.add_error("run_at", "Start time must be before the deadline.")
+
+        if self.errors or feasibility.check_mode() == "off":
+            return cleaned_data
+
+        # The instance only gets the submitted values after clean()
+        job = Job(
+            id=self.instance.id,
+            priority=cleaned_data["priority"],
+            deadline=cleaned_data["deadline"],
+            estimated_duration=cleaned_data["estimated_duration"],
+            run_at=cleaned_data.get("run_at"),
+        )
+        problem = feasibility.deadline_problem(job)
+        if problem and feasibility.check_mode() == "reject":
+            raise forms.ValidationError(problem)
+        self.deadline_warning = problem
+        return cleaned_data
@@ -0,0 +1,135 @@
+import time
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from jobs import counters
+from jobs.models import Job
+from jobs.scheduler import JobScheduler
+from jobs.signals import job_post_save
+
+
+class Rollback(Exception):
+    """Raised to discard everything the benchmark wrote"""
+
+
+def legacy_get_next_jobs(limit=1):
+    """The per-priority-group claim the scheduler used before the single UPDATE"""
+    with transaction.atomic():
+        pending_jobs = Job.objects.filter(status="pending").select_for_update(
+            skip_locked=True
+        )
+
+        if not pending_jobs.exists():
+            return []
+
+        result = []
+        for priority, _ in Job.PRIORITY_CHOICES:
+            priority_group = pending_jobs.filter(priority=priority)
+            if not priority_group.exists():
+                continue
+
+            remaining = limit - len(result)
+            if remaining <= 0:
+                break
+
+            result.extend(priority_group.order_by("deadline")[:remaining])
+            if len(result) >= limit:
+                break
+
+        for job in result:
+            job.status = "running"
+            job.started_at = timezone.now()
+            job.save(update_fields=["status", "started_at"])
+
+        return result
+
+
+class Command(BaseCommand):
+    help = "Compares database round trips per dispatch for the old and new job claim"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--jobs", type=int, default=500, help="Pending jobs to seed"
+        )
+        parser.add_argument(
+            "--batch", type=int, default=3, help="Jobs claimed per dispatch"
+        )
+        parser.add_argument(
+            "--rounds", type=int, default=50, help="Dispatches to measure"
+        )
+
+    def handle(self, *args, **options):
+        # Measure the claim alone, not the WebSocket notifications
+        post_save.disconnect(job_post_save, sender=Job)
+        try:
+            # The ready queue loads the seeded jobs on the first dispatch, as
+            # it would when the scheduler starts
+            scheduler = JobScheduler()
+            results = {
+                "legacy": self._measure(legacy_get_next_jobs, options),
+                "ready queue": self._measure(scheduler._get_next_jobs, options),
+            }
+        finally:
+            post_save.connect(job_post_save, sender=Job)
+
+        self.stdout.write(
+            f"{options['rounds']} dispatches of {options['batch']} jobs "
+            f"from {options['jobs']} pending ({connection.vendor})"
+        )
+        self.stdout.write(f"{'claim':<18}{'queries/dispatch':>18}{'ms/dispatch':>14}")
+        for name, (queries, elapsed) in results.items():
+            self.stdout.write(
+                f"{name:<18}{queries / options['rounds']:>18.1f}"
+                f"{elapsed * 1000 / options['rounds']:>14.2f}"
+            )
+
+    def _measure(self, claim, options):
+        """Seed pending jobs, run ``claim`` repeatedly and roll everything back"""
+        queries = elapsed = 0
+        try:
+            with transaction.atomic():
+                self._seed(options["jobs"])
+
+                with CaptureQueriesContext(connection) as context:
+                    started = time.perf_counter()
+                    for _ in range(options["rounds"]):
+                        claim(options["batch"])
+                    elapsed = time.perf_counter() - started
+
+                # Savepoint statements are bookkeeping, not claim round trips
+                queries = sum(
+                    1
+                    for query in context.captured_queries
+                    if "SAVEPOINT" not in query["sql"]
+                )
+                raise Rollback
+        except Rollback:
+            pass
+
+        return queries, elapsed
+
+    def _seed(self, count):
+        """Create pending jobs spread over all priorities and deadlines"""
+        user, _ = User.objects.get_or_create(username="benchmark_claim")
+        now = timezone.now()
+        priorities = [priority for priority, _ in Job.PRIORITY_CHOICES]
+        jobs = []
+        for i in range(count):
+            deadline = now + timedelta(minutes=i % 97)
+            jobs.append(
+                Job(
+                    user=user,
+                    name=f"benchmark {i}",
+                    estimated_duration=1,
+                    priority=priorities[i % len(priorities)],
+                    deadline=deadline,
+                    # bulk_create skips save(), which normally sets this
+                    latest_start_at=Job.compute_latest_start(deadline, 1),
+                )
+            )
+        Job.objects.bulk_create(jobs)
+        counters.jobs_created(jobs)
@@ -0,0 +1,134 @@
+import time
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from jobs import counters
+from jobs.models import Job
+from jobs.renderers import ORJSONRenderer
+from jobs.serializers import JobRowSerializer, JobSerializer
+
+
+class Rollback(Exception):
+    """Raised to discard everything the benchmark wrote"""
+
+
+def model_path(queryset):
+    """What the generic DRF path does: model instances through JobSerializer"""
+    return JobSerializer(queryset.prefetch_related("dependencies"), many=True).data
+
+
+def row_path(queryset):
+    """The list endpoint's fast path"""
+    return JobRowSerializer(list(JobRowSerializer.rows(queryset))).data
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the time to serialize and render a page of jobs through "
+        "JobSerializer and JSONRenderer with JobRowSerializer and ORJSONRenderer"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jobs", type=int, default=10000, help="Jobs per page")
+        parser.add_argument(
+            "--rounds", type=int, default=5, help="Pages serialized per path"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user = self._seed(options["jobs"])
+                queryset = Job.objects.filter(user=user).order_by("-created_at")
+                results = {
+                    "JobSerializer": self._measure(
+                        model_path, JSONRenderer(), queryset, options["rounds"]
+                    ),
+                    "JobRowSerializer": self._measure(
+                        row_path, ORJSONRenderer(), queryset, options["rounds"]
+                    ),
+                }
+                same = self._same_output(queryset)
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(
+            f"{options['rounds']} pages of {options['jobs']} jobs ({connection.vendor})"
+        )
+        self.stdout.write(
+            f"{'serializer':<18}{'serialize ms':>14}{'render ms':>11}{'rows/s':>11}"
+        )
+        for name, (serialize, render) in results.items():
+            rows_per_second = options["jobs"] * options["rounds"] / (serialize + render)
+            self.stdout.write(
+                f"{name:<18}{serialize * 1000 / options['rounds']:>14.1f}"
+                f"{render * 1000 / options['rounds']:>11.1f}{rows_per_second:>11.0f}"
+            )
+        self.stdout.write(f"Same output: {'yes' if same else 'NO'}")
+
+    def _measure(self, serialize, renderer, queryset, rounds):
+        """Seconds spent serializing (queries included) and rendering ``rounds`` pages"""
+        serializing = rendering = 0
+        for _ in range(rounds):
+            started = time.perf_counter()
+            data = serialize(queryset)
+            serialized = time.perf_counter()
+            renderer.render(data)
+            rendered = time.perf_counter()
+            serializing += serialized - started
+            rendering += rendered - serialized
+        return serializing, rendering
+
+    def _same_output(self, queryset):
+        """Whether both paths render the same bytes, wait times aside"""
+        outputs = []
+        for serialize, renderer in (
+            (model_path, JSONRenderer()),
+            (row_path, ORJSONRenderer()),
+        ):
+            data = serialize(queryset)
+            for row in data:
+                # Measured against a different now by each path
+                row["wait_time"] = None
+            outputs.append(renderer.render(data))
+        return outputs[0] == outputs[1]
+
+    def _seed(self, count):
+        """Create a user's jobs in every status, some with dependencies"""
+        user, _ = User.objects.get_or_create(username="benchmark_serialization")
+        now = timezone.now()
+        priorities = [priority for priority, _ in Job.PRIORITY_CHOICES]
+        statuses = [status for status, _ in Job.STATUS_CHOICES]
+        jobs = []
+        for i in range(count):
+            deadline = now + timedelta(minutes=i % 97)
+            status = statuses[i % len(statuses)]
+            started_at = now - timedelta(seconds=30) if status != "pending" else None
+            jobs.append(
+                Job(
+                    user=user,
+                    name=f"benchmark {i}",
+                    estimated_duration=1,
+                    priority=priorities[i % len(priorities)],
+                    deadline=deadline,
+                    # bulk_create skips save(), which normally sets this
+                    latest_start_at=Job.compute_latest_start(deadline, 1),
+                    status=status,
+                    started_at=started_at,
+                    completed_at=now if status in ("completed", "failed") else None,
+                )
+            )
+        Job.objects.bulk_create(jobs)
+        counters.jobs_created(jobs)
+
+        # Every tenth job depends on the two before it
+        Link = Job.dependencies.through
+        Link.objects.bulk_create(
+            Link(from_job_id=jobs[i].id, to_job_id=jobs[i - offset].id)
+            for i in range(10, count, 10)
+            for offset in (1, 2)
+        )
+        return user
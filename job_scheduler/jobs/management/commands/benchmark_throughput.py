@@ -0,0 +1,121 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from jobs import counters
+from jobs.models import Job, JobExecution
+from jobs.scheduler import JobScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures how many very short jobs per second the scheduler completes, "
+        "with outcomes written one at a time and in batches"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jobs", type=int, default=500, help="Jobs per run")
+        parser.add_argument(
+            "--workers", type=int, default=8, help="Jobs running at once"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.SCHEDULER_COMPLETION_BATCH_SIZE,
+            help="Outcomes per write in the batched run",
+        )
+        parser.add_argument(
+            "--timeout", type=float, default=300, help="Seconds to wait per run"
+        )
+
+    def handle(self, *args, **options):
+        # Without these, SQLite fails the workers' and the flusher's concurrent
+        # writes with "database is locked" instead of queueing them
+        if connection.vendor == "sqlite":
+            sqlite_options = connection.settings_dict["OPTIONS"]
+            if sqlite_options.get("transaction_mode") != "IMMEDIATE" or not (
+                sqlite_options.get("timeout")
+            ):
+                raise CommandError(
+                    'On SQLite, set OPTIONS {"transaction_mode": "IMMEDIATE", '
+                    '"timeout": 30} on the database so concurrent writes wait '
+                    "for the lock"
+                )
+
+        # The benchmark's scheduler would run anyone else's pending jobs too
+        if Job.objects.filter(status__in=["pending", "running"]).exists():
+            raise CommandError(
+                "There are pending or running jobs; run the benchmark on an idle "
+                "database"
+            )
+
+        user, _ = User.objects.get_or_create(username="benchmark_throughput")
+        results = {}
+        for name, batch_size in [
+            ("one at a time", 1),
+            ("batched", options["batch_size"]),
+        ]:
+            try:
+                results[name] = self._run(user, batch_size, options)
+            finally:
+                Job.objects.filter(user=user).delete()
+
+        self.stdout.write(
+            f"{options['jobs']} zero-length jobs on {options['workers']} workers "
+            f"({connection.vendor})"
+        )
+        self.stdout.write(f"{'outcomes':<15}{'jobs/s':>10}{'writes':>10}")
+        for name, (elapsed, flushes) in results.items():
+            self.stdout.write(
+                f"{name:<15}{options['jobs'] / elapsed:>10.1f}{flushes:>10}"
+            )
+
+    def _run(self, user, batch_size, options):
+        """Seed jobs, run a scheduler until they are all done and time it"""
+        self._seed(user, options["jobs"])
+
+        scheduler = JobScheduler()
+        scheduler.configure(workers=options["workers"], autoscale=False)
+        scheduler.completions.batch_size = batch_size
+
+        started = time.perf_counter()
+        scheduler.start()
+        try:
+            deadline = started + options["timeout"]
+            while Job.objects.filter(user=user, status="completed").count() < (
+                options["jobs"]
+            ):
+                if time.perf_counter() > deadline:
+                    raise CommandError(f"Jobs did not finish in {options['timeout']}s")
+                time.sleep(0.01)
+            elapsed = time.perf_counter() - started
+        finally:
+            scheduler.stop()
+
+        executions = JobExecution.objects.filter(user=user).count()
+        if executions != options["jobs"]:
+            raise CommandError(
+                f"Expected {options['jobs']} executions, got {executions}"
+            )
+
+        return elapsed, scheduler.completions.flushes
+
+    def _seed(self, user, count):
+        """Create pending jobs that finish as soon as they start"""
+        now = timezone.now()
+        deadline = now + timedelta(hours=1)
+        jobs = Job.objects.bulk_create(
+            Job(
+                user=user,
+                name=f"benchmark {i}",
+                estimated_duration=0,
+                deadline=deadline,
+                # bulk_create skips save(), which normally sets this
+                latest_start_at=Job.compute_latest_start(deadline, 0),
+            )
+            for i in range(count)
+        )
+        counters.jobs_created(jobs)
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from jobs.counters import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recounts every user's jobs, rebuilds their job counters and reports "
+        "where the counters had drifted"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the drift, leaving the counters as they are",
+        )
+
+    def handle(self, *args, **options):
+        drift = rebuild(dry_run=options["dry_run"])
+
+        for user_id, differences in sorted(drift.items()):
+            if all(stored is None for stored, _ in differences.values()):
+                self.stdout.write(f"User {user_id}: no counters")
+                continue
+
+            changes = ", ".join(
+                f"{field} {stored:g} -> {counted:g}"
+                for field, (stored, counted) in differences.items()
+            )
+            self.stdout.write(f"User {user_id}: {changes}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Job counters are up to date"))
+        elif options["dry_run"]:
+            self.stdout.write(
+                self.style.WARNING(f"Job counters of {len(drift)} users are off")
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"Rebuilt the job counters of {len(drift)} users")
+            )
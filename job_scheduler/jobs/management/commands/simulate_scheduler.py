@@ -0,0 +1,139 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from jobs.models import Job, SchedulingShare
+from jobs.queues import POLICIES
+from jobs.simulator import (
+    Simulation,
+    database_workload,
+    recorded_workload,
+    synthetic_workload,
+    write_workload,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays a synthetic or recorded workload through each scheduling policy "
+        "on a virtual clock and compares throughput, waits, deadline misses and "
+        "fairness"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--policy",
+            action="append",
+            choices=sorted(POLICIES),
+            help="Policy to simulate; repeat for several (default: all)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            nargs="+",
+            default=[settings.SCHEDULER_WORKERS],
+            help="Worker counts to simulate",
+        )
+
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument("--workload", help="CSV file of recorded jobs to replay")
+        source.add_argument(
+            "--from-db",
+            action="store_true",
+            help="Replay the jobs in the database, with their users' shares",
+        )
+
+        synthetic = parser.add_argument_group("synthetic workload")
+        synthetic.add_argument("--jobs", type=int, default=100000)
+        synthetic.add_argument("--users", type=int, default=10)
+        synthetic.add_argument(
+            "--arrival-rate", type=float, default=2.5, help="Jobs submitted per second"
+        )
+        synthetic.add_argument(
+            "--mean-duration", type=float, default=1.0, help="Mean seconds per job"
+        )
+        synthetic.add_argument(
+            "--delayed-fraction",
+            type=float,
+            default=0.0,
+            help="Share of jobs with a run_at in the future",
+        )
+        synthetic.add_argument("--seed", type=int, default=0)
+
+        parser.add_argument(
+            "--priority-aging",
+            type=float,
+            default=settings.SCHEDULER_PRIORITY_AGING,
+            help="Seconds pending worth one priority level; 0 disables aging",
+        )
+        parser.add_argument(
+            "--save-workload", help="Also write the workload to this CSV file"
+        )
+
+    def handle(self, *args, **options):
+        if any(workers < 1 for workers in options["workers"]):
+            raise CommandError("Worker counts must be at least 1")
+
+        # Recorded workloads are read once; synthetic ones are regenerated for
+        # each run so millions of jobs never sit in memory at once
+        shares = {}
+        if options["workload"]:
+            jobs = recorded_workload(options["workload"])
+        elif options["from_db"]:
+            jobs = list(database_workload(Job.objects.all()))
+            shares = {
+                user_id: (weight, max_jobs)
+                for user_id, weight, max_jobs in SchedulingShare.objects.values_list(
+                    "user_id", "weight", "max_concurrent_jobs"
+                )
+            }
+        else:
+            jobs = None
+
+        if options["save_workload"]:
+            write_workload(options["save_workload"], self._workload(jobs, options))
+
+        self.stdout.write(
+            f"{'policy':<12}{'workers':>8}{'jobs':>10}{'jobs/s':>10}{'util':>7}"
+            f"{'wait p50':>10}{'p95':>10}{'p99':>10}{'low p99':>10}{'low max':>10}"
+            f"{'missed':>8}{'fair':>7}{'real s':>8}"
+        )
+        for policy in options["policy"] or sorted(POLICIES):
+            for workers in options["workers"]:
+                simulation = Simulation(
+                    policy=policy,
+                    workers=workers,
+                    shares=shares,
+                    default_weight=settings.SCHEDULER_FAIR_SHARE_DEFAULT_WEIGHT,
+                    default_max_jobs=settings.SCHEDULER_FAIR_SHARE_MAX_JOBS,
+                    queue_concurrency=settings.SCHEDULER_QUEUE_CONCURRENCY,
+                    timer_tick=settings.SCHEDULER_TIMER_TICK,
+                    priority_aging=options["priority_aging"],
+                )
+
+                started = time.perf_counter()
+                report = simulation.run(self._workload(jobs, options))
+                elapsed = time.perf_counter() - started
+
+                self.stdout.write(
+                    f"{report.policy:<12}{report.workers:>8}{report.jobs:>10}"
+                    f"{report.throughput:>10.2f}{report.utilization:>7.0%}"
+                    f"{report.wait_p50:>10.2f}{report.wait_p95:>10.2f}"
+                    f"{report.wait_p99:>10.2f}{report.low_priority_wait_p99:>10.2f}"
+                    f"{report.low_priority_wait_max:>10.2f}"
+                    f"{report.deadline_miss_rate:>8.1%}"
+                    f"{report.fairness:>7.2f}{elapsed:>8.1f}"
+                )
+
+    def _workload(self, jobs, options):
+        """A fresh pass over the recorded ``jobs`` or the synthetic workload"""
+        if jobs is not None:
+            return iter(jobs)
+
+        return synthetic_workload(
+            options["jobs"],
+            users=options["users"],
+            arrival_rate=options["arrival_rate"],
+            mean_duration=options["mean_duration"],
+            delayed_fraction=options["delayed_fraction"],
+            seed=options["seed"],
+        )
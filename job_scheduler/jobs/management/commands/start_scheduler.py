@@ -1,7 +1,10 @@
 import time
 import logging
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from jobs.scheduler import get_scheduler
+from jobs import metrics
+from jobs.async_scheduler import AsyncJobScheduler
+from jobs.scheduler import get_scheduler, set_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -9,17 +12,81 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     help = "Starts the job scheduler to process jobs in the background"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--engine",
+            choices=["thread", "async"],
+            help="Scheduler engine (default: SCHEDULER_ENGINE)",
+        )
+        parser.add_argument(
+            "--policy",
+            choices=["priority", "laxity", "fair_share"],
+            help="Scheduling policy (default: SCHEDULER_POLICY)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Number of jobs to run at once (default: SCHEDULER_WORKERS)",
+        )
+        parser.add_argument(
+            "--autoscale",
+            action="store_true",
+            default=None,
+            help="Grow and shrink the worker pool with demand",
+        )
+        parser.add_argument(
+            "--min-workers",
+            type=int,
+            help="Smallest autoscaled pool (default: SCHEDULER_MIN_WORKERS)",
+        )
+        parser.add_argument(
+            "--max-workers",
+            type=int,
+            help="Largest autoscaled pool (default: SCHEDULER_MAX_WORKERS)",
+        )
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            help="Serve Prometheus metrics at /metrics on this port",
+        )
+
     def handle(self, *args, **options):
         try:
             self.stdout.write(self.style.SUCCESS("Starting job scheduler..."))
 
+            # The async engine replaces the default scheduler instance
+            if (options["engine"] or settings.SCHEDULER_ENGINE) == "async":
+                set_scheduler(AsyncJobScheduler())
+
             # Get scheduler instance
             scheduler = get_scheduler()
 
+            # Size the worker pool
+            scheduler.configure(
+                workers=options["workers"],
+                autoscale=options["autoscale"],
+                min_workers=options["min_workers"],
+                max_workers=options["max_workers"],
+                policy=options["policy"],
+            )
+
             # Start the scheduler
             scheduler.start()
 
-            self.stdout.write(self.style.SUCCESS("Job scheduler started"))
+            if scheduler.autoscaler:
+                pool = (
+                    f"autoscaling between {scheduler.autoscaler.min_workers} "
+                    f"and {scheduler.autoscaler.max_workers} workers"
+                )
+            elif isinstance(scheduler, AsyncJobScheduler):
+                pool = f"async engine, up to {scheduler.pool_size} jobs"
+            else:
+                pool = f"{scheduler.pool_size} workers"
+            self.stdout.write(self.style.SUCCESS(f"Job scheduler started ({pool})"))
+
+            if options["metrics_port"] is not None:
+                metrics.serve(options["metrics_port"], scheduler)
+                self.stdout.write(f"Serving metrics on port {options['metrics_port']}")
 
             # Keep the command running
             while True:
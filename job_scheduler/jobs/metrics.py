@@ -0,0 +1,295 @@
+# jobs/metrics.py
+import bisect
+import hmac
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bucket upper bounds (seconds)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+class Histogram:
+    """
+    Prometheus histogram. Observing is a bisect and two additions under a
+    lock, so it can sit on the scheduler's hot path; cumulative bucket counts
+    are only worked out when scraped.
+    """
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Record one observation"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def render(self):
+        """Exposition lines for the histogram"""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {total}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+
+class Counter:
+    """Prometheus counter with one label"""
+
+    def __init__(self, name, documentation, label):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value, amount=1):
+        """Add ``amount`` to the series for ``label_value``"""
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self):
+        """Exposition lines for the counter"""
+        with self._lock:
+            values = dict(self._values)
+
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        for label_value, value in sorted(values.items()):
+            lines.append(f'{self.name}{{{self.label}="{label_value}"}} {value}')
+        return lines
+
+
+CLAIM_SECONDS = Histogram(
+    "job_scheduler_claim_seconds",
+    "Time taken by the query claiming jobs",
+    QUERY_BUCKETS,
+)
+START_LATENCY_SECONDS = Histogram(
+    "job_scheduler_start_latency_seconds",
+    "Time from a job becoming runnable (submitted, released by the jobs it "
+    "depends on, or its run_at) to its start",
+    LATENCY_BUCKETS,
+)
+EXECUTION_SECONDS = Histogram(
+    "job_scheduler_execution_seconds",
+    "Time jobs took to run",
+    DURATION_BUCKETS,
+)
+LOOP_SECONDS = Histogram(
+    "job_scheduler_loop_iteration_seconds",
+    "Time the scheduler loop spent per iteration, not counting waits",
+    QUERY_BUCKETS,
+)
+JOBS_FINISHED = Counter(
+    "job_scheduler_jobs_finished_total",
+    "Jobs run by this process, by outcome",
+    "status",
+)
+
+METRICS = (
+    CLAIM_SECONDS,
+    START_LATENCY_SECONDS,
+    EXECUTION_SECONDS,
+    LOOP_SECONDS,
+    JOBS_FINISHED,
+)
+
+
+def gauge(name, documentation, samples, kind="gauge"):
+    """
+    Exposition lines for a gauge, or a metric of another ``kind``, from
+    ``{label string: value}``
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labels, value in samples.items():
+        lines.append(f"{name}{labels} {value}")
+    return lines
+
+
+def autoscaling_lines(pool):
+    """Exposition lines for the autoscaler's state in ``pool_metrics()``"""
+    lines = gauge(
+        "job_scheduler_pool_scaling_total",
+        "Worker pool resizes, by direction",
+        {
+            '{direction="up"}': pool["scale_ups"],
+            '{direction="down"}': pool["scale_downs"],
+        },
+        kind="counter",
+    )
+    lines.extend(
+        gauge(
+            "job_scheduler_pool_scaling_reasons_total",
+            "Worker pool resizes, by reason",
+            {
+                f'{{reason="{reason}"}}': count
+                for reason, count in sorted(pool["decisions_by_reason"].items())
+            },
+            kind="counter",
+        )
+    )
+    for name, documentation, value in [
+        ("pool_min_workers", "Smallest autoscaled pool", pool["min_workers"]),
+        ("pool_max_workers", "Largest autoscaled pool", pool["max_workers"]),
+        (
+            "pool_smoothed_utilization",
+            "Moving average of worker utilization the autoscaler decides on",
+            pool["utilization"],
+        ),
+    ]:
+        lines.extend(gauge(f"job_scheduler_{name}", documentation, {"": value}))
+
+    last = pool["last_decision"]
+    if last:
+        lines.extend(
+            gauge(
+                "job_scheduler_pool_last_scaling_timestamp_seconds",
+                "When the pool was last resized, and why",
+                {f'{{reason="{last["reason"]}"}}': last["timestamp"]},
+            )
+        )
+        lines.extend(
+            gauge(
+                "job_scheduler_pool_last_scaling_previous_size",
+                "Pool size before the last resize",
+                {"": last["previous_size"]},
+            )
+        )
+    return lines
+
+
+def render(scheduler=None):
+    """
+    All metrics in the exposition format. Gauges are read when scraped: pending
+    jobs from the database, the rest from ``scheduler`` if it runs in this
+    process, along with its autoscaling counters.
+    """
+    pending = dict(
+        Job.objects.filter(status="pending")
+        .values_list("priority")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    lines = gauge(
+        "job_scheduler_pending_jobs",
+        "Pending jobs by priority",
+        {
+            f'{{priority="{Job.PRIORITY_NAMES[level]}"}}': pending.get(level, 0)
+            for level, _ in Job.PRIORITY_CHOICES
+        },
+    )
+
+    pool = scheduler.pool_metrics() if scheduler is not None else None
+    if pool and pool["running"]:
+        for name, documentation, value in [
+            ("pool_size", "Jobs the scheduler may run at once", pool["pool_size"]),
+            ("running_jobs", "Jobs the scheduler is running", pool["busy_workers"]),
+            (
+                "worker_utilization",
+                "Share of the pool running jobs",
+                pool["busy_workers"] / pool["pool_size"] if pool["pool_size"] else 0,
+            ),
+            ("ready_queue_depth", "Jobs in the ready queue", pool["queue_depth"]),
+            ("delayed_jobs", "Jobs waiting for their run_at", pool["delayed_jobs"]),
+            (
+                "buffered_outcomes",
+                "Job outcomes not written yet",
+                pool["buffered_outcomes"],
+            ),
+        ]:
+            lines.extend(gauge(f"job_scheduler_{name}", documentation, {"": value}))
+        if pool["autoscale"]:
+            lines.extend(autoscaling_lines(pool))
+
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def token_matches(authorization):
+    """Whether an Authorization header carries SCHEDULER_METRICS_TOKEN"""
+    token = settings.SCHEDULER_METRICS_TOKEN
+    if not token or not authorization:
+        return False
+    scheme, _, credentials = authorization.partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(
+        credentials.strip().encode(), token.encode()
+    )
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """
+    Serves render() for the scheduler given to serve() at /metrics, to
+    requests with SCHEDULER_METRICS_TOKEN when one is set
+    """
+
+    scheduler = None
+
+    def do_GET(self):
+        if self.path.partition("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        if settings.SCHEDULER_METRICS_TOKEN and not token_matches(
+            self.headers.get("Authorization")
+        ):
+            self.send_response(401)
+            self.send_header("WWW-Authenticate", "Bearer")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        try:
+            body = render(self.scheduler).encode()
+        finally:
+            # Each request runs in its own thread with its own connection
+            connection.close()
+
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Scrapes are too frequent to log"""
+
+
+def serve(port, scheduler, address=""):
+    """Serve the metrics over HTTP from a background thread; returns the server"""
+    handler = type("Handler", (MetricsHandler,), {"scheduler": scheduler})
+    server = ThreadingHTTPServer((address, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Serving scheduler metrics on port {server.server_address[1]}")
+    return server
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0002_jobexecution_execution_time"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="execution_backend",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("thread", "Thread"),
+                    ("process", "Process"),
+                    ("subprocess", "Subprocess"),
+                ],
+                default="",
+                help_text="Where the job body runs; blank uses the queue's backend",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="job",
+            name="queue",
+            field=models.CharField(
+                default="default",
+                help_text="Queue the job is dispatched from",
+                max_length=50,
+            ),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:40
+
+from datetime import timedelta
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def populate_latest_start_at(apps, schema_editor):
+    Job = apps.get_model("jobs", "Job")
+    jobs = Job.objects.filter(latest_start_at__isnull=True).only(
+        "id", "deadline", "estimated_duration"
+    )
+
+    batch = []
+    for job in jobs.iterator(chunk_size=BATCH_SIZE):
+        job.latest_start_at = job.deadline - timedelta(seconds=job.estimated_duration)
+        batch.append(job)
+        if len(batch) >= BATCH_SIZE:
+            Job.objects.bulk_update(batch, ["latest_start_at"])
+            batch = []
+    if batch:
+        Job.objects.bulk_update(batch, ["latest_start_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0005_schedulingshare"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="latest_start_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_latest_start_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="job",
+            name="latest_start_at",
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["status", "latest_start_at"],
+                name="jobs_job_status_a83fc2_idx",
+            ),
+        ),
+    ]
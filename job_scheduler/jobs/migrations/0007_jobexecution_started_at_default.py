@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0006_job_latest_start_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="jobexecution",
+            name="started_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
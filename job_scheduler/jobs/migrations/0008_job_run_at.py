@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0007_jobexecution_started_at_default"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="run_at",
+            field=models.DateTimeField(
+                blank=True, help_text="Don't start the job before this time", null=True
+            ),
+        ),
+    ]
@@ -0,0 +1,130 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:32
+
+import django.db.models.deletion
+import jobs.cron
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0008_job_run_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecurringJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("name", models.CharField(max_length=255)),
+                (
+                    "cron_expression",
+                    models.CharField(
+                        help_text='Minute, hour, day of month, month and day of week, e.g. "*/5 * * * *"',
+                        max_length=100,
+                        validators=[jobs.cron.validate_cron],
+                    ),
+                ),
+                (
+                    "estimated_duration",
+                    models.PositiveIntegerField(help_text="Duration in seconds"),
+                ),
+                (
+                    "priority",
+                    models.CharField(
+                        choices=[
+                            ("high", "High"),
+                            ("medium", "Medium"),
+                            ("low", "Low"),
+                        ],
+                        default="medium",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "deadline_offset",
+                    models.PositiveIntegerField(
+                        help_text="Seconds each generated job has to complete"
+                    ),
+                ),
+                ("queue", models.CharField(default="default", max_length=50)),
+                (
+                    "execution_backend",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("thread", "Thread"),
+                            ("process", "Process"),
+                            ("subprocess", "Subprocess"),
+                        ],
+                        default="",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "misfire_policy",
+                    models.CharField(
+                        choices=[
+                            ("skip", "Skip missed runs"),
+                            ("run_once", "Run once for all missed runs"),
+                            ("catch_up", "Run every missed run"),
+                        ],
+                        default="run_once",
+                        help_text="What to do with runs missed while no scheduler was running",
+                        max_length=10,
+                    ),
+                ),
+                ("enabled", models.BooleanField(default=True)),
+                (
+                    "next_fire_at",
+                    models.DateTimeField(blank=True, editable=False, null=True),
+                ),
+                (
+                    "last_fired_at",
+                    models.DateTimeField(blank=True, editable=False, null=True),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recurring_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.AddField(
+            model_name="job",
+            name="recurring_job",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="jobs",
+                to="jobs.recurringjob",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recurringjob",
+            index=models.Index(
+                fields=["enabled", "next_fire_at"],
+                name="jobs_recurr_enabled_209700_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0009_recurringjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="dependencies",
+            field=models.ManyToManyField(
+                blank=True, related_name="dependents", to="jobs.job"
+            ),
+        ),
+        migrations.AddField(
+            model_name="job",
+            name="remaining_dependencies",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
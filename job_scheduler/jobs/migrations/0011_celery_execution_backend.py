@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0010_job_dependencies"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="job",
+            name="execution_backend",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("thread", "Thread"),
+                    ("process", "Process"),
+                    ("subprocess", "Subprocess"),
+                    ("celery", "Celery"),
+                ],
+                default="",
+                help_text="Where the job body runs; blank uses the queue's backend",
+                max_length=20,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="recurringjob",
+            name="execution_backend",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("thread", "Thread"),
+                    ("process", "Process"),
+                    ("subprocess", "Subprocess"),
+                    ("celery", "Celery"),
+                ],
+                default="",
+                max_length=20,
+            ),
+        ),
+    ]
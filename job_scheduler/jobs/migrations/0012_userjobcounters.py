@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("jobs", "0011_celery_execution_backend"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserJobCounters",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="job_counters",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("pending", models.BigIntegerField(default=0)),
+                ("running", models.BigIntegerField(default=0)),
+                ("completed", models.BigIntegerField(default=0)),
+                ("failed", models.BigIntegerField(default=0)),
+                ("high_priority", models.BigIntegerField(default=0)),
+                ("medium_priority", models.BigIntegerField(default=0)),
+                ("low_priority", models.BigIntegerField(default=0)),
+                (
+                    "timed_jobs",
+                    models.BigIntegerField(
+                        default=0,
+                        help_text="Completed jobs with a start and finish time",
+                    ),
+                ),
+                (
+                    "total_wait_time",
+                    models.FloatField(
+                        default=0, help_text="Seconds the timed jobs waited to start"
+                    ),
+                ),
+                (
+                    "total_execution_time",
+                    models.FloatField(
+                        default=0, help_text="Seconds the timed jobs ran"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "user job counters",
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0012_userjobcounters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LatencySketch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "metric",
+                    models.CharField(
+                        choices=[
+                            ("wait", "Wait time"),
+                            ("execution", "Execution time"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(
+                        choices=[
+                            ("global", "All jobs"),
+                            ("priority", "One priority"),
+                            ("user", "One user"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        blank=True,
+                        help_text="Priority or user id, blank for all jobs",
+                        max_length=150,
+                    ),
+                ),
+                ("count", models.BigIntegerField(default=0)),
+                (
+                    "total",
+                    models.FloatField(
+                        default=0, help_text="Sum of the values, in seconds"
+                    ),
+                ),
+                (
+                    "bins",
+                    models.JSONField(
+                        default=dict, help_text="Count of values per logarithmic bin"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("metric", "scope", "key"), name="unique_latency_sketch"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0013_latencysketch"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                condition=models.Q(
+                    ("remaining_dependencies", 0), ("status", "pending")
+                ),
+                fields=["priority", "deadline", "created_at"],
+                name="jobs_job_pending_claim",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["user", "status"], name="jobs_job_user_id_ec4047_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["user", "-created_at"], name="jobs_job_user_id_58dc09_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="jobexecution",
+            index=models.Index(
+                fields=["job", "-started_at"], name="jobs_jobexe_job_id_30344e_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="joblog",
+            index=models.Index(
+                fields=["job", "-timestamp"], name="jobs_joblog_job_id_6883b3_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,181 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+import jobs.models
+
+# Levels the three original priorities had before levels were configurable;
+# configured levels of the same names take precedence
+ORIGINAL_LEVELS = {"high": 3, "medium": 2, "low": 1}
+
+
+def levels():
+    """Level of each priority name, including the original three"""
+    return {**ORIGINAL_LEVELS, **settings.SCHEDULER_PRIORITY_LEVELS}
+
+
+def names_to_levels(apps, schema_editor):
+    Job = apps.get_model("jobs", "Job")
+    RecurringJob = apps.get_model("jobs", "RecurringJob")
+    UserJobCounters = apps.get_model("jobs", "UserJobCounters")
+    LatencySketch = apps.get_model("jobs", "LatencySketch")
+
+    name_levels = levels()
+    default = name_levels.get(settings.SCHEDULER_DEFAULT_PRIORITY, 2)
+    level_of_name = Case(
+        *(
+            When(priority=name, then=Value(level))
+            for name, level in name_levels.items()
+        ),
+        default=Value(default),
+    )
+    for model in (Job, RecurringJob):
+        model.objects.update(priority_level=level_of_name)
+
+    counters = list(UserJobCounters.objects.all())
+    for row in counters:
+        row.priority_counts = {
+            str(name_levels[name]): count
+            for name, count in (
+                ("high", row.high_priority),
+                ("medium", row.medium_priority),
+                ("low", row.low_priority),
+            )
+            if count
+        }
+    UserJobCounters.objects.bulk_update(counters, ["priority_counts"], batch_size=1000)
+
+    for name, level in name_levels.items():
+        LatencySketch.objects.filter(scope="priority", key=name).update(key=str(level))
+
+
+def levels_to_names(apps, schema_editor):
+    Job = apps.get_model("jobs", "Job")
+    RecurringJob = apps.get_model("jobs", "RecurringJob")
+    UserJobCounters = apps.get_model("jobs", "UserJobCounters")
+    LatencySketch = apps.get_model("jobs", "LatencySketch")
+
+    level_names = {level: name for name, level in levels().items()}
+    # Only the original three names fit the old choices
+    name_of_level = Case(
+        *(
+            When(priority_level__gte=level, then=Value(name))
+            for name, level in sorted(
+                ORIGINAL_LEVELS.items(), key=lambda item: -item[1]
+            )
+        ),
+        default=Value("low"),
+    )
+    for model in (Job, RecurringJob):
+        model.objects.update(priority=name_of_level)
+
+    counters = list(UserJobCounters.objects.all())
+    for row in counters:
+        for name in ORIGINAL_LEVELS:
+            setattr(row, f"{name}_priority", 0)
+        for level, count in row.priority_counts.items():
+            name = level_names.get(int(level), "low")
+            if name not in ORIGINAL_LEVELS:
+                name = "low"
+            field = f"{name}_priority"
+            setattr(row, field, getattr(row, field) + count)
+    UserJobCounters.objects.bulk_update(
+        counters,
+        [f"{name}_priority" for name in ORIGINAL_LEVELS],
+        batch_size=1000,
+    )
+
+    for level, name in level_names.items():
+        LatencySketch.objects.filter(scope="priority", key=str(level)).update(key=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0014_job_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="job",
+            name="jobs_job_pending_claim",
+        ),
+        migrations.AddField(
+            model_name="job",
+            name="priority_level",
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="recurringjob",
+            name="priority_level",
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="userjobcounters",
+            name="priority_counts",
+            field=models.JSONField(
+                default=dict, help_text="Jobs at each priority level, keyed by level"
+            ),
+        ),
+        migrations.RunPython(names_to_levels, levels_to_names),
+        migrations.RemoveField(
+            model_name="job",
+            name="priority",
+        ),
+        migrations.RemoveField(
+            model_name="recurringjob",
+            name="priority",
+        ),
+        migrations.RemoveField(
+            model_name="userjobcounters",
+            name="high_priority",
+        ),
+        migrations.RemoveField(
+            model_name="userjobcounters",
+            name="medium_priority",
+        ),
+        migrations.RemoveField(
+            model_name="userjobcounters",
+            name="low_priority",
+        ),
+        migrations.RenameField(
+            model_name="job",
+            old_name="priority_level",
+            new_name="priority",
+        ),
+        migrations.RenameField(
+            model_name="recurringjob",
+            old_name="priority_level",
+            new_name="priority",
+        ),
+        migrations.AlterField(
+            model_name="job",
+            name="priority",
+            field=models.PositiveSmallIntegerField(
+                choices=jobs.models.priority_choices,
+                default=jobs.models.default_priority,
+                help_text="Priority level; higher runs first",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="recurringjob",
+            name="priority",
+            field=models.PositiveSmallIntegerField(
+                choices=jobs.models.priority_choices,
+                default=jobs.models.default_priority,
+                help_text="Priority level; higher runs first",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                condition=models.Q(
+                    ("remaining_dependencies", 0), ("status", "pending")
+                ),
+                fields=["-priority", "deadline", "created_at"],
+                name="jobs_job_pending_claim",
+            ),
+        ),
+    ]
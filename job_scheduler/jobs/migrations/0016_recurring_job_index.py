@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0015_integer_priority"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["recurring_job", "-created_at"],
+                name="jobs_job_recurri_2e0c27_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_user(apps, schema_editor):
+    Job = apps.get_model("jobs", "Job")
+    JobExecution = apps.get_model("jobs", "JobExecution")
+    JobExecution.objects.filter(user__isnull=True).update(
+        user_id=Subquery(Job.objects.filter(pk=OuterRef("job_id")).values("user_id"))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0016_recurring_job_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="job",
+            name="jobs_job_user_id_58dc09_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="job",
+            name="jobs_job_recurri_2e0c27_idx",
+        ),
+        migrations.AddField(
+            model_name="jobexecution",
+            name="user",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="job_executions",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(populate_user, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="jobexecution",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="job_executions",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="jobs_job_user_id_e0b2b8_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["recurring_job", "-created_at", "-id"],
+                name="jobs_job_recurri_58a00a_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="jobexecution",
+            index=models.Index(
+                fields=["user", "-started_at", "-id"],
+                name="jobs_jobexe_user_id_0915c1_idx",
+            ),
+        ),
+    ]
@@ -1,15 +1,48 @@
 import uuid
-from django.db import models
+from datetime import timedelta
+from django.conf import settings
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.core.validators import MinValueValidator
 from django.utils import timezone
+from .cron import CronExpression, validate_cron
 
 
-class Job(models.Model):
-    PRIORITY_CHOICES = (
-        ("high", "High"),
-        ("medium", "Medium"),
-        ("low", "Low"),
+def priority_choices():
+    """``(level, label)`` of each configured priority, highest first"""
+    levels = sorted(
+        settings.SCHEDULER_PRIORITY_LEVELS.items(), key=lambda item: -item[1]
     )
+    return [(level, name.replace("_", " ").title()) for name, level in levels]
+
+
+def default_priority():
+    """Level of the SCHEDULER_DEFAULT_PRIORITY priority"""
+    return settings.SCHEDULER_PRIORITY_LEVELS[settings.SCHEDULER_DEFAULT_PRIORITY]
+
+
+class JobQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Delete the jobs, first releasing the jobs that depend on unfinished ones
+        among them so they don't wait forever. The release is one query for the
+        whole queryset.
+        """
+        # Imported here because these modules import this one
+        from . import counters
+        from .dependencies import release_unfinished
+
+        with transaction.atomic(using=self.db):
+            release_unfinished(self)
+            deleted = counters.count_jobs(self)
+            result = super().delete()
+            counters.jobs_deleted(deleted)
+            return result
+
+
+class Job(models.Model):
+    # Configured in SCHEDULER_PRIORITY_LEVELS; the column holds the level
+    PRIORITY_CHOICES = tuple(priority_choices())
 
     STATUS_CHOICES = (
         ("pending", "Pending"),
@@ -18,26 +51,176 @@ class Job(models.Model):
         ("failed", "Failed"),
     )
 
+    EXECUTION_BACKEND_CHOICES = (
+        ("thread", "Thread"),
+        ("process", "Process"),
+        ("subprocess", "Subprocess"),
+        ("celery", "Celery"),
+    )
+
+    # Level of each priority name, higher runs first, and the reverse
+    PRIORITY_VALUES = dict(settings.SCHEDULER_PRIORITY_LEVELS)
+    PRIORITY_NAMES = {level: name for name, level in PRIORITY_VALUES.items()}
+
+    # Badge color of each level: the top one stands out, the bottom one doesn't
+    PRIORITY_COLORS = {level: "warning" for level, _ in PRIORITY_CHOICES}
+    PRIORITY_COLORS[PRIORITY_CHOICES[-1][0]] = "info"
+    PRIORITY_COLORS[PRIORITY_CHOICES[0][0]] = "danger"
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="jobs")
     name = models.CharField(max_length=255)
     estimated_duration = models.PositiveIntegerField(help_text="Duration in seconds")
-    priority = models.CharField(
-        max_length=10, choices=PRIORITY_CHOICES, default="medium"
+    priority = models.PositiveSmallIntegerField(
+        choices=priority_choices,
+        default=default_priority,
+        help_text="Priority level; higher runs first",
     )
     deadline = models.DateTimeField()
+    # Deadline minus estimated duration; orders jobs by laxity
+    latest_start_at = models.DateTimeField(editable=False)
+    run_at = models.DateTimeField(
+        null=True, blank=True, help_text="Don't start the job before this time"
+    )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    queue = models.CharField(
+        max_length=50, default="default", help_text="Queue the job is dispatched from"
+    )
+    execution_backend = models.CharField(
+        max_length=20,
+        choices=EXECUTION_BACKEND_CHOICES,
+        blank=True,
+        default="",
+        help_text="Where the job body runs; blank uses the queue's backend",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    # Lease held by the scheduler running the job
+    worker_id = models.CharField(max_length=255, blank=True, default="")
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    # Jobs that must complete before this one may start, and how many of them
+    # haven't yet; the job is only runnable once the counter reaches zero
+    dependencies = models.ManyToManyField(
+        "self", symmetrical=False, related_name="dependents", blank=True
+    )
+    remaining_dependencies = models.PositiveIntegerField(default=0)
+
+    # Definition the job was generated from, if any
+    recurring_job = models.ForeignKey(
+        "RecurringJob",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="jobs",
+    )
+
+    objects = JobQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Backlog sums for the deadline feasibility check
+            models.Index(fields=["status", "latest_start_at"]),
+            # Claim query and ready queue loads; only covers the pending jobs,
+            # a small part of the table, so it stays small and hot
+            models.Index(
+                fields=["-priority", "deadline", "created_at"],
+                condition=models.Q(status="pending", remaining_dependencies=0),
+                name="jobs_job_pending_claim",
+            ),
+            # A user's jobs by status, for the job list filter and counts
+            models.Index(fields=["user", "status"]),
+            # A user's jobs newest first, the default listing; id is the
+            # keyset pagination tiebreaker
+            models.Index(fields=["user", "-created_at", "-id"]),
+            # A recurring definition's jobs newest first
+            models.Index(fields=["recurring_job", "-created_at", "-id"]),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """Keep latest_start_at in step with deadline and estimated_duration"""
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"deadline", "estimated_duration"} & set(
+            update_fields
+        ):
+            self.latest_start_at = self.compute_latest_start(
+                self.deadline, self.estimated_duration
+            )
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "latest_start_at"}
+
+        # Imported here because counters imports this module
+        from . import counters
+
+        previous = counters.state_before_save(self)
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            counters.job_saved(self, previous)
+
+    def delete(self, *args, **kwargs):
+        """
+        Delete the job, releasing the jobs that depend on it if unfinished and
+        taking it off its owner's counters
+        """
+        # Imported here because these modules import this one
+        from . import counters
+        from .dependencies import release_unfinished
+
+        with transaction.atomic(using=kwargs.get("using")):
+            job = Job.objects.filter(pk=self.pk)
+            release_unfinished(job)
+            deleted = counters.count_jobs(job)
+            result = super().delete(*args, **kwargs)
+            counters.jobs_deleted(deleted)
+            return result
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the counted state of loaded jobs, to count their next save"""
+        # Imported here because counters imports this module
+        from .counters import COUNTED_FIELDS, job_state
+
+        job = super().from_db(db, field_names, values)
+        if all(field in job.__dict__ for field in COUNTED_FIELDS):
+            job._counted_state = job_state(job)
+        return job
+
+    @staticmethod
+    def compute_latest_start(deadline, estimated_duration):
+        """Latest time a job can start and still meet its deadline"""
+        return deadline - timedelta(seconds=estimated_duration)
+
+    @staticmethod
+    def compute_ready_at(updated_at, run_at):
+        """
+        When a pending job became runnable, as far as its row tells: its last
+        change (creation, edit, or release of its dependencies) or its run_at,
+        whichever is later. Claiming the job leaves updated_at alone, so this
+        holds for the jobs a claim returns too.
+        """
+        if updated_at is None or (run_at is not None and run_at > updated_at):
+            return run_at
+        return updated_at
+
+    @property
+    def ready_at(self):
+        """When the job became runnable; see compute_ready_at()"""
+        return self.compute_ready_at(self.updated_at, self.run_at)
+
+    @property
+    def laxity(self):
+        """Seconds of slack left before the job must start to meet its deadline"""
+        return (self.latest_start_at - timezone.now()).total_seconds()
+
     @property
     def duration(self):
         """Calculate actual duration if job has completed"""
@@ -69,14 +252,30 @@ class Job(models.Model):
         return colors.get(self.status, "secondary")
 
     @property
-    def priority_value(self):
-        """Return numeric value for priority for sorting"""
-        values = {
-            "high": 3,
-            "medium": 2,
-            "low": 1,
-        }
-        return values.get(self.priority, 0)
+    def priority_name(self):
+        """Configured name of the priority level, or the level if it has none"""
+        return self.PRIORITY_NAMES.get(self.priority, str(self.priority))
+
+    @property
+    def priority_color(self):
+        """Return Bootstrap color class based on priority"""
+        return self.PRIORITY_COLORS.get(self.priority, "secondary")
+
+    @classmethod
+    def parse_priority(cls, priority):
+        """
+        Level of a priority given by name (e.g. "high") or by level. Raises
+        ValueError for priorities that are not configured.
+        """
+        if priority in cls.PRIORITY_VALUES:
+            return cls.PRIORITY_VALUES[priority]
+        try:
+            level = int(priority)
+        except (TypeError, ValueError):
+            level = None
+        if isinstance(priority, bool) or level not in cls.PRIORITY_NAMES:
+            raise ValueError(f"Unknown priority {priority!r}")
+        return level
 
     def start(self):
         """Mark job as running"""
@@ -97,17 +296,222 @@ class Job(models.Model):
         self.save()
 
 
+class SchedulingShare(models.Model):
+    """A user's weight and concurrency cap under fair-share scheduling"""
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name="scheduling_share"
+    )
+    weight = models.PositiveIntegerField(
+        default=1,
+        validators=[MinValueValidator(1)],
+        help_text="Share of the workers relative to other users",
+    )
+    max_concurrent_jobs = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(1)],
+        help_text="Most jobs the user may have running at once; blank for no cap",
+    )
+
+    def __str__(self):
+        return f"{self.user} (weight {self.weight})"
+
+
+class UserJobCounters(models.Model):
+    """
+    Running totals of a user's jobs, kept in step with every job transition so
+    their stats are read from one row instead of counted over all their jobs
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="job_counters"
+    )
+    pending = models.BigIntegerField(default=0)
+    running = models.BigIntegerField(default=0)
+    completed = models.BigIntegerField(default=0)
+    failed = models.BigIntegerField(default=0)
+    priority_counts = models.JSONField(
+        default=dict, help_text="Jobs at each priority level, keyed by level"
+    )
+    timed_jobs = models.BigIntegerField(
+        default=0, help_text="Completed jobs with a start and finish time"
+    )
+    total_wait_time = models.FloatField(
+        default=0, help_text="Seconds the timed jobs waited to start"
+    )
+    total_execution_time = models.FloatField(
+        default=0, help_text="Seconds the timed jobs ran"
+    )
+
+    class Meta:
+        verbose_name_plural = "user job counters"
+
+    def __str__(self):
+        return f"Job counters of {self.user}"
+
+
+class LatencySketch(models.Model):
+    """
+    Quantile sketch of how long jobs waited to start or took to run, over all
+    jobs, one priority's or one user's (see jobs.quantiles.QuantileSketch)
+    """
+
+    METRIC_CHOICES = (
+        ("wait", "Wait time"),
+        ("execution", "Execution time"),
+    )
+
+    SCOPE_CHOICES = (
+        ("global", "All jobs"),
+        ("priority", "One priority"),
+        ("user", "One user"),
+    )
+
+    metric = models.CharField(max_length=10, choices=METRIC_CHOICES)
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    key = models.CharField(
+        max_length=150,
+        blank=True,
+        help_text="Priority or user id, blank for all jobs",
+    )
+    count = models.BigIntegerField(default=0)
+    total = models.FloatField(default=0, help_text="Sum of the values, in seconds")
+    bins = models.JSONField(
+        default=dict, help_text="Count of values per logarithmic bin"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["metric", "scope", "key"], name="unique_latency_sketch"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_metric_display()} of {self.scope} {self.key}".strip()
+
+
+class RecurringJob(models.Model):
+    """Job definition that generates a Job every time its cron expression fires"""
+
+    MISFIRE_POLICY_CHOICES = (
+        ("skip", "Skip missed runs"),
+        ("run_once", "Run once for all missed runs"),
+        ("catch_up", "Run every missed run"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="recurring_jobs"
+    )
+    name = models.CharField(max_length=255)
+    cron_expression = models.CharField(
+        max_length=100,
+        validators=[validate_cron],
+        help_text='Minute, hour, day of month, month and day of week, e.g. "*/5 * * * *"',
+    )
+    estimated_duration = models.PositiveIntegerField(help_text="Duration in seconds")
+    priority = models.PositiveSmallIntegerField(
+        choices=priority_choices,
+        default=default_priority,
+        help_text="Priority level; higher runs first",
+    )
+    deadline_offset = models.PositiveIntegerField(
+        help_text="Seconds each generated job has to complete"
+    )
+    queue = models.CharField(max_length=50, default="default")
+    execution_backend = models.CharField(
+        max_length=20, choices=Job.EXECUTION_BACKEND_CHOICES, blank=True, default=""
+    )
+    misfire_policy = models.CharField(
+        max_length=10,
+        choices=MISFIRE_POLICY_CHOICES,
+        default="run_once",
+        help_text="What to do with runs missed while no scheduler was running",
+    )
+    enabled = models.BooleanField(default=True)
+    next_fire_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_fired_at = models.DateTimeField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["name"]
+        indexes = [
+            # Due definitions are found with one range scan
+            models.Index(fields=["enabled", "next_fire_at"]),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        """Work out the next fire time when the definition is new or rescheduled"""
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "cron_expression" in update_fields:
+            if self._state.adding or self._cron_changed():
+                self.next_fire_at = self.cron.next_after(timezone.now())
+                if update_fields is not None:
+                    kwargs["update_fields"] = {*update_fields, "next_fire_at"}
+
+        super().save(*args, **kwargs)
+
+    @property
+    def cron(self):
+        """The parsed cron expression"""
+        return CronExpression(self.cron_expression)
+
+    def make_job(self, now):
+        """An unsaved Job for one run of this definition"""
+        deadline = now + timedelta(seconds=self.deadline_offset)
+        return Job(
+            user_id=self.user_id,
+            name=self.name,
+            estimated_duration=self.estimated_duration,
+            priority=self.priority,
+            deadline=deadline,
+            # bulk_create skips Job.save(), which normally sets this
+            latest_start_at=Job.compute_latest_start(deadline, self.estimated_duration),
+            queue=self.queue,
+            execution_backend=self.execution_backend,
+            recurring_job=self,
+        )
+
+    def _cron_changed(self):
+        """Whether the stored cron expression differs from this instance's"""
+        stored = (
+            RecurringJob.objects.filter(pk=self.pk)
+            .values_list("cron_expression", flat=True)
+            .first()
+        )
+        return stored != self.cron_expression
+
+
 class JobExecution(models.Model):
     """Record of each job run"""
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name="executions")
-    started_at = models.DateTimeField(auto_now_add=True)
+    # The job's owner, so a user's executions are listed from one index
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="job_executions"
+    )
+    started_at = models.DateTimeField(default=timezone.now)
     completed_at = models.DateTimeField(null=True, blank=True)
     execution_time = models.FloatField(null=True)
     success = models.BooleanField(default=False)
     error_message = models.TextField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # A job's runs newest first
+            models.Index(fields=["job", "-started_at"]),
+            # A user's runs newest first, the execution listings
+            models.Index(fields=["user", "-started_at", "-id"]),
+        ]
+
     def __str__(self):
         return f"Execution of {self.job.name}"
 
@@ -140,3 +544,7 @@ class JobLog(models.Model):
 
     class Meta:
         ordering = ["-timestamp"]
+        indexes = [
+            # A job's log newest first
+            models.Index(fields=["job", "-timestamp"]),
+        ]
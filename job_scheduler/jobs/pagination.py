@@ -0,0 +1,274 @@
+# jobs/pagination.py
+import base64
+import binascii
+import collections
+import json
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import BooleanField, F, Func, Q, Value
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# A page of items, with the cursors of the pages either side (None at the ends)
+Page = collections.namedtuple("Page", ["items", "next_cursor", "previous_cursor"])
+
+
+class InvalidCursor(ValueError):
+    """The cursor is malformed or was made for another ordering"""
+
+
+def keyset_page(queryset, ordering, cursor=None, page_size=None):
+    """
+    One page of ``queryset`` sorted by ``ordering`` (a field, "-" first for
+    descending) and then by primary key. The page starts right after or
+    before the row a cursor points at, with a WHERE on the sort key rather
+    than an OFFSET, so every page costs the same however deep it is. The
+    sort matches an index on (field, id) in either direction: no NULLS
+    clause for columns that can't be NULL, and NULLs after every value in
+    nullable ones, as in a default B-tree index (last ascending, first
+    descending). Raises InvalidCursor for cursors not made for ``ordering``.
+    """
+    page_size = page_size or settings.SCHEDULER_PAGE_SIZE
+    descending = ordering.startswith("-")
+    pk_field = queryset.model._meta.pk
+    pk_name = pk_field.name
+    name = ordering.lstrip("-")
+    if name == "pk":
+        name = pk_name
+    field = _resolve(queryset.model, name)
+
+    position, backwards = (None, False) if cursor is None else _decode(cursor, ordering)
+    if position is not None:
+        value = None if position[0] is None else field.to_python(position[0])
+        pk = pk_field.to_python(position[1])
+        # Going back means reading forwards through the reversed order
+        queryset = queryset.filter(
+            _after(name, value, pk, descending ^ backwards, field, pk_field)
+        )
+
+    rows = list(
+        queryset.order_by(
+            _order(name, descending ^ backwards, field.null),
+            _order(pk_name, descending ^ backwards, False),
+        )[: page_size + 1]
+    )
+    more = len(rows) > page_size
+    items = rows[:page_size]
+    if backwards:
+        items.reverse()
+
+    def cursor_at(item, backwards):
+        key = [_value(item, name), getattr(item, pk_name)]
+        return _encode(key, ordering, backwards)
+
+    if not items:
+        return Page(items, None, None)
+
+    # A cursor means there are rows on the side we came from
+    has_next = more if not backwards else True
+    has_previous = more if backwards else position is not None
+    return Page(
+        items,
+        cursor_at(items[-1], False) if has_next else None,
+        cursor_at(items[0], True) if has_previous else None,
+    )
+
+
+def _resolve(model, name):
+    """The model field ``name`` refers to, following relations"""
+    *relations, last = name.split(LOOKUP_SEP)
+    try:
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(last)
+    except FieldDoesNotExist:
+        raise InvalidCursor(f"Cannot paginate on {name}")
+
+
+def _value(item, name):
+    """The value of ``name`` on an item, following relations"""
+    for attribute in name.split(LOOKUP_SEP):
+        item = getattr(item, attribute)
+        if item is None:
+            break
+    return item
+
+
+def _order(name, descending, nullable):
+    """
+    order_by() expression for a field; NULLs of a nullable one go after every
+    value, where a default index keeps them
+    """
+    expression = F(name)
+    if not nullable:
+        return expression.desc() if descending else expression.asc()
+    if descending:
+        return expression.desc(nulls_first=True)
+    return expression.asc(nulls_last=True)
+
+
+class Row(Func):
+    """SQL row value ``(a, b)``, compared column by column"""
+
+    function = ""
+
+
+class RowComparison(Func):
+    """``lhs < rhs`` or ``lhs > rhs`` of two Row values"""
+
+    template = "%(expressions)s"
+    output_field = BooleanField()
+
+    def __init__(self, lhs, operator, rhs):
+        super().__init__(lhs, rhs, arg_joiner=f" {operator} ")
+
+
+def _after(name, value, pk, descending, field, pk_field):
+    """
+    Rows after (value, pk) in the order given by ``descending``: a single row
+    comparison, which an index on (name, pk) answers with one range, plus the
+    NULLs for nullable fields
+    """
+    pk_name = pk_field.name
+    beyond = "lt" if descending else "gt"
+    if value is None:
+        # NULLs come first in descending order, so every value is after them
+        condition = Q(**{f"{name}__isnull": True, f"{pk_name}__{beyond}": pk})
+        if descending:
+            condition |= Q(**{f"{name}__isnull": False})
+        return condition
+
+    condition = Q(
+        RowComparison(
+            Row(F(name), F(pk_name)),
+            "<" if descending else ">",
+            Row(Value(value, output_field=field), Value(pk, output_field=pk_field)),
+        )
+    )
+    if field.null and not descending:
+        condition |= Q(**{f"{name}__isnull": True})
+    return condition
+
+
+def _encode(key, ordering, backwards):
+    """Opaque cursor for a position in ``ordering``"""
+    # str() keeps the microseconds of datetimes, which equality depends on
+    data = json.dumps(
+        {"o": ordering, "k": key, "b": backwards}, default=str, separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def _decode(cursor, ordering):
+    """``(key, backwards)`` of a cursor made for ``ordering``"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key, backwards = data["k"], bool(data["b"])
+        if data["o"] != ordering or len(key) != 2:
+            raise InvalidCursor("Cursor is for another ordering")
+        return key, backwards
+    except (binascii.Error, ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor(f"Invalid cursor: {e}")
+
+
+def page_from_request(queryset, ordering, request, page_size=None):
+    """
+    keyset_page() at the ``cursor`` query parameter of an HTML view's request;
+    a bad cursor shows the first page
+    """
+    try:
+        return keyset_page(queryset, ordering, request.GET.get("cursor"), page_size)
+    except (InvalidCursor, ValidationError):
+        return keyset_page(queryset, ordering, page_size=page_size)
+
+
+def page_links(request, page):
+    """
+    Query strings of the pages either side of ``page`` for an HTML view,
+    keeping the other query parameters: ``{"next_page": ..., "previous_page":
+    ...}``, None at the ends
+    """
+    links = {}
+    for name, cursor in (
+        ("next_page", page.next_cursor),
+        ("previous_page", page.previous_cursor),
+    ):
+        if cursor is None:
+            links[name] = None
+            continue
+        query = request.GET.copy()
+        query["cursor"] = cursor
+        links[name] = f"?{query.urlencode()}"
+    return links
+
+
+class KeysetPagination(BasePagination):
+    """
+    DRF cursor pagination over (ordering field, id). The ordering is the one
+    the view's OrderingFilter or get_queryset() applied, first field only;
+    responses are ``{"next": url, "previous": url, "results": [...]}``.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = self.get_ordering(queryset)
+        try:
+            self.page = keyset_page(
+                queryset,
+                ordering,
+                request.query_params.get(self.cursor_query_param),
+                self.get_page_size(request),
+            )
+        except (InvalidCursor, ValidationError):
+            raise NotFound("Invalid cursor")
+        return self.page.items
+
+    def get_ordering(self, queryset):
+        """First ordering field of the queryset, or of its model"""
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        if ordering and isinstance(ordering[0], str):
+            return ordering[0]
+        return "pk"
+
+    def get_page_size(self, request):
+        """Requested page size, capped at max_page_size"""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.SCHEDULER_PAGE_SIZE
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self._link(self.page.next_cursor),
+                "previous": self._link(self.page.previous_cursor),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def _link(self, cursor):
+        """URL of the page at ``cursor``, or None"""
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
@@ -0,0 +1,206 @@
+# jobs/quantiles.py
+import math
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Job, LatencySketch
+
+# Percentiles reported by the analytics
+PERCENTILES = (50, 95, 99)
+
+# Metric names in LatencySketch and in the analytics
+METRICS = {"wait": "wait_time", "execution": "execution_time"}
+
+
+class QuantileSketch:
+    """
+    Streaming quantile sketch with a relative error bound, after DDSketch.
+    Values are counted in logarithmic bins whose bounds grow by a constant
+    factor, so any quantile is off by at most ``relative_accuracy`` of its
+    value. Values up to ``min_value`` share the lowest bin, and past
+    ``max_bins`` the lowest bins are merged, so the sketch stays small however
+    many values it has seen. Sketches with the same accuracy merge exactly.
+    """
+
+    def __init__(
+        self, relative_accuracy=0.01, min_value=0.001, max_bins=2048, bins=None
+    ):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self._min_index = self._index(min_value)
+        self.bins = {int(index): count for index, count in (bins or {}).items()}
+        self.count = sum(self.bins.values())
+        self.total = 0.0
+
+    def _index(self, value):
+        """Bin of a value above min_value"""
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def add(self, value, count=1):
+        """Count ``value``, ``count`` times"""
+        index = self._min_index if value <= self.min_value else self._index(value)
+        self.bins[index] = self.bins.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def merge(self, other):
+        """Add the values counted by ``other``, a sketch with the same accuracy"""
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        """Fold the lowest bins into one until max_bins are left"""
+        indexes = sorted(self.bins)
+        excess = indexes[: len(indexes) - self.max_bins + 1]
+        target = excess[-1]
+        self.bins[target] = sum(self.bins.pop(index) for index in excess)
+
+    def quantile(self, q):
+        """Estimate of the ``q`` quantile (0 to 1), or None if the sketch is empty"""
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                break
+        if index == self._min_index:
+            return self.min_value
+        # The value in the middle of the bin, relative to its bounds
+        return 2 * self.gamma**index / (self.gamma + 1)
+
+
+def job_times(job):
+    """``{metric: seconds}`` for a finished job that was started"""
+    if job.started_at is None:
+        return {}
+
+    times = {"wait": (job.started_at - job.created_at).total_seconds()}
+    if job.completed_at is not None:
+        times["execution"] = (job.completed_at - job.started_at).total_seconds()
+    return times
+
+
+def record(jobs):
+    """
+    Add the wait and execution times of finished ``jobs`` to the sketches for
+    all jobs, their priorities and their owners. Each affected sketch is
+    locked, merged with the new values and written back, in a few queries
+    however many jobs there are.
+    """
+    sketches = {}
+    for job in jobs:
+        for metric, seconds in job_times(job).items():
+            for scope, key in (
+                ("global", ""),
+                ("priority", str(job.priority)),
+                ("user", str(job.user_id)),
+            ):
+                sketch = sketches.setdefault((metric, scope, key), QuantileSketch())
+                sketch.add(max(seconds, 0.0))
+
+    if not sketches:
+        return
+
+    # Another scheduler may create the same sketch first; the second attempt
+    # then finds and merges into it
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                _merge(sketches)
+            return
+        except IntegrityError:
+            if attempt:
+                raise
+
+
+def _merge(sketches):
+    """Merge ``{(metric, scope, key): QuantileSketch}`` into the stored ones"""
+    wanted = Q()
+    for metric, scope, key in sketches:
+        wanted |= Q(metric=metric, scope=scope, key=key)
+    stored = {
+        (row.metric, row.scope, row.key): row
+        for row in LatencySketch.objects.select_for_update().filter(wanted)
+    }
+
+    now = timezone.now()
+    created = []
+    for (metric, scope, key), sketch in sketches.items():
+        row = stored.get((metric, scope, key))
+        if row is None:
+            row = LatencySketch(metric=metric, scope=scope, key=key)
+            created.append(row)
+        else:
+            merged = load(row)
+            merged.merge(sketch)
+            sketch = merged
+
+        row.bins = sketch.bins
+        row.count = sketch.count
+        row.total = sketch.total
+        # bulk_update() leaves auto_now fields alone
+        row.updated_at = now
+
+    LatencySketch.objects.bulk_update(
+        list(stored.values()), ["bins", "count", "total", "updated_at"]
+    )
+    LatencySketch.objects.bulk_create(created)
+
+
+def load(row):
+    """QuantileSketch of a LatencySketch row"""
+    sketch = QuantileSketch(bins=row.bins)
+    sketch.total = row.total
+    return sketch
+
+
+def percentiles(sketch):
+    """``{"p50": seconds, ...}`` of a sketch, None when it is empty"""
+    return {f"p{p}": sketch.quantile(p / 100) for p in PERCENTILES}
+
+
+def latency_percentiles(user):
+    """
+    Wait and execution time percentiles of ``user``'s jobs, of all jobs and of
+    each priority, from one query:
+    ``{"user": {"wait_time": {"p50": ...}, ...}, "all_jobs": ..., "by_priority":
+    {priority name: ...}}``
+    """
+    user_id = getattr(user, "pk", user)
+    rows = {
+        (row.metric, row.scope, row.key): row
+        for row in LatencySketch.objects.filter(
+            Q(scope="global") | Q(scope="priority") | Q(scope="user", key=str(user_id))
+        )
+    }
+
+    def summary(scope, key):
+        return {
+            name: percentiles(
+                load(rows[metric, scope, key])
+                if (metric, scope, key) in rows
+                else QuantileSketch()
+            )
+            for metric, name in METRICS.items()
+        }
+
+    return {
+        "user": summary("user", str(user_id)),
+        "all_jobs": summary("global", ""),
+        "by_priority": {
+            Job.PRIORITY_NAMES[level]: summary("priority", str(level))
+            for level, _ in Job.PRIORITY_CHOICES
+        },
+    }
@@ -0,0 +1,340 @@
+# jobs/queues.py
+import collections
+import heapq
+import math
+import threading
+
+
+def aged_rank(priority, ready_at, priority_aging):
+    """
+    Rank of a job's priority, lowest first, for a job runnable since
+    ``ready_at`` (a datetime or seconds). With ``priority_aging`` set, a
+    runnable job gains a level every time the clock passes a multiple of that
+    many seconds, so however high the load above it, a job eventually outranks
+    everything that became runnable after it. Every waiting job gains its
+    levels at the same moments, so the rank of the level a job has at any time
+    is the fixed floor(ready_at / priority_aging) - priority, and keys never
+    need updating.
+    """
+    if not priority_aging:
+        return -priority
+    if not isinstance(ready_at, (int, float)):
+        ready_at = ready_at.timestamp()
+    return math.floor(ready_at / priority_aging) - priority
+
+
+class ReadyQueue:
+    """
+    In-memory priority queue of pending jobs, ordered like the scheduler's
+    claim query: priority first, then earliest deadline, then submission time.
+    With ``priority_aging`` seconds set, the priority a job is ranked by rises
+    by a level each time that much time passes (see aged_rank).
+
+    Only job ids and their sort keys are kept, in one heap per partition (the
+    job's queue) so callers can skip partitions that are at capacity. Replaced
+    and removed jobs are invalidated in place and skipped when they reach the
+    top of their heap, so push, remove and pop are all O(log n).
+    """
+
+    # Heap entry layout: [sort key, job id, still valid, partition]
+    _KEY, _JOB_ID, _VALID, _PARTITION = range(4)
+
+    # Seconds pending worth one priority level; 0 keeps priorities strict
+    priority_aging = 0
+
+    def __init__(self):
+        self._heaps = {}
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, job_id):
+        return job_id in self._entries
+
+    def sort_key(self, priority, deadline, created_at, latest_start_at, ready_at=None):
+        """
+        Key that sorts the job that should run first lowest. Its priority ages
+        from ``ready_at``, when it became runnable, by default when it was
+        created.
+        """
+        if ready_at is None:
+            ready_at = created_at
+        rank = aged_rank(priority, ready_at, self.priority_aging)
+        return (rank, deadline, created_at)
+
+    def job_key(self, job):
+        """Sort key for a Job instance"""
+        return self.sort_key(
+            job.priority,
+            job.deadline,
+            job.created_at,
+            job.latest_start_at,
+            job.ready_at,
+        )
+
+    def push(self, job_id, key, partition="default", user_id=None):
+        """Add a job, or move it if it is already queued under another key"""
+        self.remove(job_id)
+        entry = [key, job_id, True, partition]
+        self._entries[job_id] = entry
+        heapq.heappush(self._heaps.setdefault(partition, []), entry)
+
+    def remove(self, job_id):
+        """Drop a job if it is queued"""
+        entry = self._entries.pop(job_id, None)
+        if entry is None:
+            return
+
+        entry[self._VALID] = False
+
+        # Don't let invalidated entries outgrow the live ones
+        heap_size = sum(len(heap) for heap in self._heaps.values())
+        if heap_size > 2 * len(self._entries) + 64:
+            self._rebuild_heaps()
+
+    def pop(self, exclude=()):
+        """
+        Remove and return the id of the job that should run next, ignoring the
+        partitions in ``exclude``
+        """
+        job_id, _ = self.pop_with_partition(exclude)
+        return job_id
+
+    def pop_with_partition(self, exclude=()):
+        """Like pop(), but return ``(job_id, partition)``"""
+        best = None
+        for partition, heap in self._heaps.items():
+            if partition in exclude:
+                continue
+
+            # Discard invalidated entries at the top of this heap
+            while heap and not heap[0][self._VALID]:
+                heapq.heappop(heap)
+
+            if heap and (best is None or heap[0] < best[0]):
+                best = heap
+
+        if best is None:
+            return None, None
+
+        entry = heapq.heappop(best)
+        del self._entries[entry[self._JOB_ID]]
+        return entry[self._JOB_ID], entry[self._PARTITION]
+
+    def pop_many(self, count, exclude=()):
+        """Remove and return up to ``count`` job ids in dispatch order"""
+        job_ids = []
+        while len(job_ids) < count:
+            job_id = self.pop(exclude)
+            if job_id is None:
+                break
+            job_ids.append(job_id)
+        return job_ids
+
+    def job_finished(self, job_id):
+        """Called when a popped job stops running or turns out not to be claimable"""
+
+    def rebuild(self, items):
+        """
+        Replace the contents with ``(job_id, key, partition, user_id)`` items in
+        O(n)
+        """
+        self._entries = {
+            job_id: [key, job_id, True, partition]
+            for job_id, key, partition, _ in items
+        }
+        self._rebuild_heaps()
+
+    def _rebuild_heaps(self):
+        """Recreate the heaps from the live entries"""
+        self._heaps = {}
+        for entry in self._entries.values():
+            self._heaps.setdefault(entry[self._PARTITION], []).append(entry)
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+
+
+class LaxityQueue(ReadyQueue):
+    """
+    Least-laxity-first ready queue. Laxity is the slack a job has left:
+    deadline - now - estimated_duration. Since ``now`` is the same for every
+    job, ordering by the latest start time (deadline - estimated_duration)
+    orders by laxity, and the key never changes while the job waits. Priority
+    only breaks ties, so it is never aged.
+    """
+
+    def sort_key(self, priority, deadline, created_at, latest_start_at, ready_at=None):
+        """Key that sorts the job with the least laxity lowest"""
+        return (latest_start_at, -priority, created_at)
+
+
+class FairShareQueue:
+    """
+    Ready queue that shares workers between users by stride scheduling. Each
+    user with pending jobs has a pass value; the user with the lowest pass runs
+    their best job (by the usual priority and deadline order) and their pass
+    advances by a stride inversely proportional to their weight. Over time each
+    user gets workers in proportion to their weight, however many jobs they
+    submit. Picking a user is O(log users).
+
+    Users may also be capped at a number of jobs running at once; capped users
+    are skipped until one of their jobs finishes.
+    """
+
+    # Stride of a user with weight 1
+    STRIDE = 1 << 20
+
+    # Within a user, jobs are ordered (and aged) like in ReadyQueue
+    sort_key = ReadyQueue.sort_key
+    priority_aging = 0
+
+    def __init__(self, default_weight=1, default_max_jobs=None):
+        self.default_weight = default_weight
+        self.default_max_jobs = default_max_jobs
+        self._shares = {}
+        self._user_queues = {}
+        self._job_users = {}
+        self._passes = {}
+        self._user_heap = []
+        self._global_pass = 0
+        self._running = collections.Counter()
+        self._popped = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._job_users)
+
+    def __contains__(self, job_id):
+        return job_id in self._job_users
+
+    def set_shares(self, shares):
+        """Set per-user ``{user_id: (weight, max_jobs)}``; others use the defaults"""
+        self._shares = dict(shares)
+
+    def push(self, job_id, key, partition="default", user_id=None):
+        """Add a job, or move it if it is already queued under another key"""
+        self.remove(job_id)
+
+        queue = self._user_queues.get(user_id)
+        if queue is None:
+            queue = self._user_queues[user_id] = ReadyQueue()
+
+        # A user coming back starts level with the others, not with credit
+        # saved up while they had nothing pending
+        if not queue:
+            self._passes[user_id] = max(self._passes.get(user_id, 0), self._global_pass)
+            heapq.heappush(self._user_heap, (self._passes[user_id], user_id))
+
+        queue.push(job_id, key, partition)
+        self._job_users[job_id] = user_id
+
+    def remove(self, job_id):
+        """Drop a job if it is queued"""
+        user_id = self._job_users.pop(job_id, None)
+        if user_id is not None:
+            self._user_queues[user_id].remove(job_id)
+
+    def pop(self, exclude=()):
+        """Remove and return the id of the job that should run next"""
+        job_id, _ = self.pop_with_partition(exclude)
+        return job_id
+
+    def pop_with_partition(self, exclude=()):
+        """
+        Like pop(), but return ``(job_id, partition)``. Partitions in
+        ``exclude`` and users at their concurrency cap are skipped.
+        """
+        skipped = []
+        result = (None, None)
+
+        while self._user_heap:
+            user_pass, user_id = heapq.heappop(self._user_heap)
+
+            # Users whose jobs are all gone, or entries superseded by a newer pass
+            queue = self._user_queues.get(user_id)
+            if not queue or self._passes.get(user_id) != user_pass:
+                continue
+
+            if self._at_cap(user_id):
+                skipped.append((user_pass, user_id))
+                continue
+
+            job_id, partition = queue.pop_with_partition(exclude)
+            if job_id is None:
+                skipped.append((user_pass, user_id))
+                continue
+
+            del self._job_users[job_id]
+            with self._lock:
+                self._running[user_id] += 1
+                self._popped[job_id] = user_id
+
+            self._global_pass = user_pass
+            self._passes[user_id] = user_pass + self.STRIDE // self._weight(user_id)
+            if queue:
+                heapq.heappush(self._user_heap, (self._passes[user_id], user_id))
+
+            result = (job_id, partition)
+            break
+
+        for entry in skipped:
+            heapq.heappush(self._user_heap, entry)
+        return result
+
+    def pop_many(self, count, exclude=()):
+        """Remove and return up to ``count`` job ids in dispatch order"""
+        job_ids = []
+        while len(job_ids) < count:
+            job_id = self.pop(exclude)
+            if job_id is None:
+                break
+            job_ids.append(job_id)
+        return job_ids
+
+    def job_finished(self, job_id):
+        """Release the user's concurrency slot held by a popped job"""
+        with self._lock:
+            user_id = self._popped.pop(job_id, None)
+            if user_id is not None:
+                self._running[user_id] -= 1
+                if not self._running[user_id]:
+                    del self._running[user_id]
+
+    def rebuild(self, items):
+        """Replace the contents with ``(job_id, key, partition, user_id)`` items"""
+        self._user_queues = {}
+        self._job_users = {}
+        self._user_heap = []
+
+        items_by_user = collections.defaultdict(list)
+        for job_id, key, partition, user_id in items:
+            items_by_user[user_id].append((job_id, key, partition, user_id))
+            self._job_users[job_id] = user_id
+
+        for user_id, user_items in items_by_user.items():
+            queue = self._user_queues[user_id] = ReadyQueue()
+            queue.rebuild(user_items)
+            self._passes[user_id] = max(self._passes.get(user_id, 0), self._global_pass)
+            self._user_heap.append((self._passes[user_id], user_id))
+        heapq.heapify(self._user_heap)
+
+    def _weight(self, user_id):
+        """The user's share weight"""
+        weight, _ = self._shares.get(user_id, (None, None))
+        return weight or self.default_weight
+
+    def _at_cap(self, user_id):
+        """Whether the user already runs as many jobs as they may"""
+        _, max_jobs = self._shares.get(user_id, (None, None))
+        max_jobs = max_jobs or self.default_max_jobs
+        with self._lock:
+            return max_jobs is not None and self._running[user_id] >= max_jobs
+
+
+# Ready queue class for each scheduling policy
+POLICIES = {
+    "priority": ReadyQueue,
+    "laxity": LaxityQueue,
+    "fair_share": FairShareQueue,
+}
@@ -0,0 +1,31 @@
+# jobs/recurring.py
+from datetime import timedelta
+from django.conf import settings
+
+
+def runs_due(definition, now):
+    """
+    Fire times of ``definition`` to generate jobs for at ``now``, following
+    its misfire policy. The definition must be due (next_fire_at <= now).
+    """
+    cron = definition.cron
+    grace = timedelta(seconds=settings.SCHEDULER_RECURRING_MISFIRE_GRACE)
+
+    if definition.misfire_policy == "catch_up":
+        # Every run since the last one, up to the catch-up limit
+        fires = []
+        fire_at = definition.next_fire_at
+        while fire_at <= now and len(fires) < settings.SCHEDULER_RECURRING_MAX_CATCH_UP:
+            fires.append(fire_at)
+            fire_at = cron.next_after(fire_at)
+        return fires
+
+    if definition.misfire_policy == "skip":
+        # Only a run that is late by less than the grace period still happens
+        recent = definition.next_fire_at
+        if recent <= now - grace:
+            recent = cron.next_after(now - grace)
+        return [recent] if recent <= now else []
+
+    # run_once: a single run stands in for all the missed ones
+    return [definition.next_fire_at]
@@ -0,0 +1,30 @@
+# jobs/renderers.py
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+# orjson's own datetime format differs from DRF's, so datetimes go through the
+# encoder like other types orjson doesn't know
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson, several times faster than the json
+    module on long listings. The output is the same as JSONRenderer's; indented
+    (browsable API, ``; indent=``) and ASCII-only output fall back to it.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        encoder = self.encoder_class()
+        ret = orjson.dumps(data, default=encoder.default, option=ORJSON_OPTIONS)
+        # Escaped as by JSONRenderer, so the output stays a JavaScript subset
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
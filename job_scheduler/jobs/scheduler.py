@@ -1,16 +1,67 @@
 # jobs/scheduler.py
 import logging
+import os
+import select
+import socket
 import time
 import threading
+import uuid
 from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from django.utils import timezone
-from django.db import transaction
-from .models import Job, JobExecution
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Min, Q
+from . import counters, metrics
+from .autoscaling import Autoscaler
+from .dependencies import fail_dependents
+from .executors import ExecutionBackends
+from .models import Job, JobExecution, RecurringJob, SchedulingShare
+from .queues import POLICIES, FairShareQueue
+from .recurring import runs_due
+from .timing_wheel import TimingWheel
+from .write_behind import CompletionBuffer
 
 logger = logging.getLogger(__name__)
 
-# Maximum number of concurrent jobs
-MAX_CONCURRENT_JOBS = 3
+# Job columns the ready queue is built from
+QUEUE_FIELDS = (
+    "id",
+    "priority",
+    "deadline",
+    "created_at",
+    "latest_start_at",
+    "queue",
+    "user_id",
+    "updated_at",
+    "run_at",
+)
+
+# Postgres channel used to wake dispatchers in other processes
+WAKEUP_CHANNEL = "job_scheduler_wakeup"
+
+# Wake-up payload announcing a created, edited or deleted RecurringJob
+RECURRING_CHANGED = "recurring"
+
+# Wake-up payload prefix announcing several jobs, followed by their ids in
+# hex, comma-separated
+JOBS_CHANGED = "jobs:"
+
+# Job ids per wake-up payload; Postgres limits payloads to 8000 bytes
+NOTIFY_JOB_IDS = 200
+
+# Changed jobs loaded into the ready queue per query
+CHANGED_JOBS_CHUNK_SIZE = 1000
+
+# Most recurring definitions fired in one transaction
+RECURRING_BATCH_SIZE = 500
+
+# Seconds the listener blocks on its socket before re-checking for shutdown
+LISTEN_TIMEOUT = 5
+
+# Seconds to wait before reconnecting a failed listener
+LISTEN_RETRY_DELAY = 5
 
 
 class JobScheduler:
@@ -19,13 +70,82 @@ class JobScheduler:
     Uses a combination of:
     1. Priority Queue - prioritizes high priority jobs
     2. Earliest Deadline First (EDF) - prioritizes jobs with closer deadlines
+
+    Pending jobs are kept in an in-memory ReadyQueue that is loaded once and then
+    updated from job change events; the database is only used to claim them.
+    Jobs with a future run_at wait on a TimingWheel and move into the ready
+    queue when they come due.
+
+    Several schedulers can share the Job table. Each claimed job carries a lease
+    (worker id, heartbeat, expiry) that its scheduler keeps renewing; jobs whose
+    lease expires because their scheduler died are requeued or failed.
+
+    Job outcomes are written behind, in batches (see CompletionBuffer).
     """
 
     def __init__(self):
-        self.executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_JOBS)
         self._running = False
         self._lock = threading.Lock()
         self._current_jobs = set()
+        self._wakeup = threading.Event()
+        self._queue_stale = True
+        self._shares_stale = True
+        self._events_lock = threading.Lock()
+        self._changed_jobs = set()
+        self._last_autoscale = 0.0
+        self._next_recurring_check = 0.0
+        self.backends = ExecutionBackends()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.completions = CompletionBuffer(self.worker_id)
+        self.configure()
+
+    def configure(
+        self,
+        workers=None,
+        autoscale=None,
+        min_workers=None,
+        max_workers=None,
+        policy=None,
+    ):
+        """
+        Size the worker pool and choose the scheduling policy. A fixed pool runs
+        ``workers`` jobs at once; an autoscaling pool starts at ``min_workers``
+        and moves between the bounds with demand. Unset arguments fall back to
+        the SCHEDULER_* settings.
+        """
+        if self._running:
+            raise RuntimeError("Cannot reconfigure a running scheduler")
+
+        self.policy = policy or settings.SCHEDULER_POLICY
+        if self.policy not in POLICIES:
+            raise ImproperlyConfigured(f"Unknown scheduling policy: {self.policy}")
+
+        self._queue = POLICIES[self.policy]()
+        self._queue.priority_aging = settings.SCHEDULER_PRIORITY_AGING
+        self._timers = TimingWheel(settings.SCHEDULER_TIMER_TICK, now=time.time())
+        self._queue_stale = True
+        if isinstance(self._queue, FairShareQueue):
+            self._queue.default_weight = settings.SCHEDULER_FAIR_SHARE_DEFAULT_WEIGHT
+            self._queue.default_max_jobs = settings.SCHEDULER_FAIR_SHARE_MAX_JOBS
+
+        if autoscale is None:
+            autoscale = settings.SCHEDULER_AUTOSCALE
+
+        if autoscale:
+            self.autoscaler = Autoscaler(
+                min_workers or settings.SCHEDULER_MIN_WORKERS,
+                max_workers or settings.SCHEDULER_MAX_WORKERS,
+                cooldown=settings.SCHEDULER_AUTOSCALE_COOLDOWN,
+            )
+            self.pool_size = self.autoscaler.min_workers
+            pool_limit = self.autoscaler.max_workers
+        else:
+            self.autoscaler = None
+            self.pool_size = pool_limit = workers or settings.SCHEDULER_WORKERS
+
+        # Threads are only started as jobs need them, so sizing the executor
+        # for the upper bound costs nothing while the pool is small
+        self.executor = ThreadPoolExecutor(max_workers=pool_limit)
 
     def start(self):
         """Start the scheduler in a background thread"""
@@ -33,145 +153,583 @@ class JobScheduler:
             return
 
         self._running = True
+        self.completions.start()
         thread = threading.Thread(target=self._run_scheduler, daemon=True)
         thread.start()
-        logger.info("Job scheduler started")
+
+        # Other processes (web, API) submit jobs; Postgres tells us about them
+        if connections[DEFAULT_DB_ALIAS].vendor == "postgresql":
+            listener = threading.Thread(
+                target=self._listen_for_notifications, daemon=True
+            )
+            listener.start()
+
+        leases = threading.Thread(target=self._maintain_leases, daemon=True)
+        leases.start()
+
+        logger.info(f"Job scheduler {self.worker_id} started")
 
     def stop(self):
         """Stop the scheduler"""
         self._running = False
+        self.notify()
         self.executor.shutdown(wait=False)
+        self.backends.shutdown()
+        self.completions.stop()
         logger.info("Job scheduler stopped")
 
+    def notify(self):
+        """Wake the scheduler loop so it checks for runnable jobs immediately"""
+        self._wakeup.set()
+
+    def job_changed(self, job_id):
+        """Record that a job was created, edited or deleted and wake the loop"""
+        self.jobs_changed([job_id])
+
+    def jobs_changed(self, job_ids):
+        """Record that jobs were created, edited or deleted and wake the loop"""
+        # Only a running scheduler keeps a queue; elsewhere this would just grow
+        if not self._running:
+            return
+
+        with self._events_lock:
+            self._changed_jobs.update(job_ids)
+        self.notify()
+
+    def recurring_changed(self):
+        """Look for due recurring definitions again on the next iteration"""
+        self._next_recurring_check = 0.0
+        self.notify()
+
     def _run_scheduler(self):
-        """Main scheduler loop that continuously checks for jobs to run"""
+        """
+        Main scheduler loop. Sleeps until a job is submitted, a job finishes or
+        the safety-net poll interval elapses, then dispatches as many jobs as
+        there are free slots.
+        """
+        poll_interval = settings.SCHEDULER_POLL_INTERVAL
+        next_poll = time.monotonic() + poll_interval
+
         while self._running:
+            # Clear before dispatching so wake-ups that arrive meanwhile are kept
+            self._wakeup.clear()
+            iteration_started = time.perf_counter()
+
             try:
+                self._fire_recurring_jobs()
+
+                if self.autoscaler:
+                    self._autoscale()
+
                 # Process jobs if we have capacity
+                jobs_to_run = []
                 with self._lock:
-                    if len(self._current_jobs) < MAX_CONCURRENT_JOBS:
-                        available_slots = MAX_CONCURRENT_JOBS - len(self._current_jobs)
+                    if len(self._current_jobs) < self.pool_size:
+                        available_slots = self.pool_size - len(self._current_jobs)
                         jobs_to_run = self._get_next_jobs(limit=available_slots)
 
                         for job in jobs_to_run:
                             self._current_jobs.add(job.id)
                             self.executor.submit(self._execute_job, job)
 
+                self._announce_started(jobs_to_run)
+
             except Exception as e:
                 logger.error(f"Error in scheduler loop: {e}")
 
-            # Sleep for a bit to avoid high CPU usage
-            time.sleep(1)
+                # Popped jobs may not have been claimed; start from the database
+                self._queue_stale = True
 
-    def _get_next_jobs(self, limit=1):
-        """Get the next jobs to run based on priority and deadline"""
+            metrics.LOOP_SECONDS.observe(time.perf_counter() - iteration_started)
+
+            # Wait for the next event or delayed job; the poll is a safety net
+            timeout = min(
+                next_poll - time.monotonic(),
+                self._time_to_next_timer(),
+                self._next_recurring_check - time.time(),
+            )
+            if self.autoscaler:
+                timeout = min(timeout, settings.SCHEDULER_AUTOSCALE_INTERVAL)
+            self._wakeup.wait(timeout=max(timeout, 0))
+
+            if time.monotonic() >= next_poll:
+                next_poll = time.monotonic() + poll_interval
+
+                # Without LISTEN/NOTIFY, jobs submitted by other processes are
+                # only seen by reloading the queue on the safety-net poll
+                if connections[DEFAULT_DB_ALIAS].vendor != "postgresql":
+                    self._queue_stale = True
+
+                # Pick up changed fair-share weights
+                self._shares_stale = True
+
+    def _autoscale(self):
+        """Resize the pool once per autoscaling interval"""
+        now = time.monotonic()
+        if now - self._last_autoscale < settings.SCHEDULER_AUTOSCALE_INTERVAL:
+            return
+        self._last_autoscale = now
+
+        self._sync_queue()
+        queue_depth = len(self._queue)
+
+        # Deadline pressure: pending jobs due soon
+        urgent_jobs = 0
+        if queue_depth:
+            horizon = timezone.now() + timedelta(
+                seconds=settings.SCHEDULER_AUTOSCALE_DEADLINE_HORIZON
+            )
+            urgent_jobs = (
+                Job.objects.filter(
+                    status="pending", remaining_dependencies=0, deadline__lte=horizon
+                )
+                .filter(Q(run_at__isnull=True) | Q(run_at__lte=timezone.now()))
+                .count()
+            )
+
+        with self._lock:
+            busy = len(self._current_jobs)
+            new_size = self.autoscaler.evaluate(
+                self.pool_size, busy, queue_depth, urgent_jobs
+            )
+            if new_size != self.pool_size:
+                decision = self.autoscaler.decisions[-1]
+                logger.info(
+                    f"Scaling worker pool from {self.pool_size} to {new_size} "
+                    f"({decision.reason}: {queue_depth} pending, "
+                    f"{urgent_jobs} urgent, utilization {decision.utilization})"
+                )
+                self.pool_size = new_size
+
+    def pool_metrics(self):
+        """Current worker pool size, load and autoscaling counters"""
+        with self._lock:
+            pool = {
+                "pool_size": self.pool_size,
+                "busy_workers": len(self._current_jobs),
+                "queue_depth": len(self._queue),
+                "delayed_jobs": len(self._timers),
+                "buffered_outcomes": len(self.completions),
+                "running": self._running,
+                "autoscale": self.autoscaler is not None,
+            }
+        if self.autoscaler:
+            pool.update(self.autoscaler.metrics())
+        return pool
+
+    def _listen_for_notifications(self):
+        """Relay Postgres NOTIFY messages on the wake-up channel to the loop"""
+        while self._running:
+            # Dedicated connection: LISTEN must not share the ORM's connection
+            wrapper = connections.create_connection(DEFAULT_DB_ALIAS)
+            try:
+                wrapper.ensure_connection()
+                with wrapper.cursor() as cursor:
+                    cursor.execute(f"LISTEN {WAKEUP_CHANNEL}")
+
+                # Changes made while we were (re)connecting were not announced
+                self._queue_stale = True
+                self.notify()
+
+                pg_connection = wrapper.connection
+                while self._running:
+                    readable, _, _ = select.select(
+                        [pg_connection], [], [], LISTEN_TIMEOUT
+                    )
+                    if not readable:
+                        continue
+
+                    pg_connection.poll()
+                    while pg_connection.notifies:
+                        notification = pg_connection.notifies.pop(0)
+                        if notification.payload == RECURRING_CHANGED:
+                            self.recurring_changed()
+                        elif notification.payload.startswith(JOBS_CHANGED):
+                            job_ids = notification.payload[len(JOBS_CHANGED) :]
+                            self.jobs_changed(map(uuid.UUID, job_ids.split(",")))
+                        elif notification.payload:
+                            self.job_changed(uuid.UUID(notification.payload))
+                        else:
+                            self.notify()
+
+            except Exception as e:
+                logger.error(f"Error in notification listener: {e}")
+                time.sleep(LISTEN_RETRY_DELAY)
+
+            finally:
+                wrapper.close()
+
+    def _maintain_leases(self):
+        """Renew our leases and reap expired ones every heartbeat interval"""
+        while self._running:
+            try:
+                self._heartbeat()
+                self._reap_expired_leases()
+            except Exception as e:
+                logger.error(f"Error maintaining job leases: {e}")
+
+            time.sleep(settings.SCHEDULER_HEARTBEAT_INTERVAL)
+
+    def _heartbeat(self):
+        """
+        Extend the leases of the jobs this scheduler is running, including
+        finished ones whose outcome has not been written yet
+        """
+        job_ids = self._current_jobs | self.completions.pending_ids()
+        if not job_ids:
+            return
+
+        now = timezone.now()
+        Job.objects.filter(
+            id__in=job_ids, status="running", worker_id=self.worker_id
+        ).update(
+            heartbeat_at=now,
+            lease_expires_at=now + timedelta(seconds=settings.SCHEDULER_LEASE_SECONDS),
+        )
+
+    def _reap_expired_leases(self):
+        """
+        Requeue running jobs whose scheduler stopped renewing their lease, or
+        fail them once they have used up SCHEDULER_MAX_ATTEMPTS
+        """
+        now = timezone.now()
         with transaction.atomic():
-            # Get pending jobs
-            pending_jobs = Job.objects.filter(status="pending").select_for_update(
-                skip_locked=True
+            # Jobs claimed before leases existed have none and count as expired
+            expired_jobs = list(
+                Job.objects.select_for_update(skip_locked=True).filter(
+                    Q(lease_expires_at__lt=now) | Q(lease_expires_at__isnull=True),
+                    status="running",
+                )
+            )
+            if not expired_jobs:
+                return
+
+            requeued = []
+            failed = []
+            for job in expired_jobs:
+                if job.attempts < settings.SCHEDULER_MAX_ATTEMPTS:
+                    job.status = "pending"
+                    job.started_at = None
+                    requeued.append(job)
+                else:
+                    job.status = "failed"
+                    job.completed_at = now
+                    failed.append(job)
+                job.worker_id = ""
+                job.heartbeat_at = None
+                job.lease_expires_at = None
+                job.updated_at = now
+
+            Job.objects.bulk_update(
+                expired_jobs,
+                [
+                    "status",
+                    "started_at",
+                    "completed_at",
+                    "worker_id",
+                    "heartbeat_at",
+                    "lease_expires_at",
+                    "updated_at",
+                ],
+            )
+            counters.jobs_moved(expired_jobs, "running")
+
+            # Close executions left open by schedulers that recorded them
+            # when a job started rather than when it finished
+            JobExecution.objects.filter(
+                job__in=expired_jobs, completed_at__isnull=True
+            ).update(
+                completed_at=now,
+                success=False,
+                error_message="Lease expired: the scheduler running this job stopped",
             )
 
-            # No jobs to run
-            if not pending_jobs.exists():
-                return []
+            for job in requeued:
+                notify_scheduler(job.id)
+
+            skipped = fail_dependents([job.id for job in failed], now)
+
+        self._announce(expired_jobs + skipped, "reaped")
+        logger.warning(
+            f"Reaped {len(expired_jobs)} jobs with expired leases "
+            f"({len(requeued)} requeued, {len(failed)} failed, {len(skipped)} "
+            f"dependent jobs failed)"
+        )
+
+    def _fire_recurring_jobs(self):
+        """
+        Generate the jobs of recurring definitions that are due, then work out
+        when the next one is. Due definitions are found with one range scan of
+        the (enabled, next_fire_at) index.
+        """
+        if time.time() < self._next_recurring_check:
+            return
 
-            # Implement our prioritization algorithm
-            # First prioritize by priority level
-            high_priority = pending_jobs.filter(priority="high")
-            medium_priority = pending_jobs.filter(priority="medium")
-            low_priority = pending_jobs.filter(priority="low")
+        now = timezone.now()
+        with transaction.atomic():
+            definitions = list(
+                RecurringJob.objects.select_for_update(skip_locked=True)
+                .filter(enabled=True, next_fire_at__lte=now)
+                .order_by("next_fire_at")[:RECURRING_BATCH_SIZE]
+            )
 
-            result = []
+            jobs = []
+            for definition in definitions:
+                runs = runs_due(definition, now)
+                jobs.extend(definition.make_job(now) for _ in runs)
+                if runs:
+                    definition.last_fired_at = now
+                definition.next_fire_at = definition.cron.next_after(now)
+                definition.updated_at = now
+
+            if definitions:
+                Job.objects.bulk_create(jobs)
+                counters.jobs_created(jobs)
+                RecurringJob.objects.bulk_update(
+                    definitions, ["next_fire_at", "last_fired_at", "updated_at"]
+                )
+                notify_scheduler(job_ids=[job.id for job in jobs])
 
-            # For each priority level, sort by deadline (earliest first)
-            for priority_group in [high_priority, medium_priority, low_priority]:
-                if not priority_group.exists():
-                    continue
+        if jobs:
+            self._announce(jobs, "created")
+            logger.info(
+                f"Fired {len(definitions)} recurring jobs, creating {len(jobs)} jobs"
+            )
 
-                # Get jobs sorted by deadline
-                deadline_sorted = priority_group.order_by("deadline")
+        # More may be due than fit in one batch
+        if len(definitions) == RECURRING_BATCH_SIZE:
+            self._next_recurring_check = 0.0
+            return
 
-                # Take up to our remaining limit
-                remaining = limit - len(result)
-                if remaining <= 0:
-                    break
+        # Look again at the next fire time; the poll interval covers
+        # definitions changed in processes we don't hear from
+        next_fire_at = RecurringJob.objects.filter(enabled=True).aggregate(
+            next_fire_at=Min("next_fire_at")
+        )["next_fire_at"]
+        next_check = time.time() + settings.SCHEDULER_POLL_INTERVAL
+        if next_fire_at is not None:
+            next_check = min(next_check, next_fire_at.timestamp())
+        self._next_recurring_check = next_check
 
-                batch = list(deadline_sorted[:remaining])
-                result.extend(batch)
+    def _get_next_jobs(self, limit=1):
+        """Claim the next jobs to run"""
+        self._sync_queue()
+
+        # Queued jobs may have been claimed elsewhere or deleted since they
+        # were queued, so keep popping until the slots are filled
+        jobs = []
+        popped = []
+        while len(jobs) < limit and self._queue:
+            job_ids = self._queue.pop_many(limit - len(jobs))
+            claimed = self._claim_job_ids(job_ids)
+            jobs.extend(claimed)
+            popped.extend(job_ids)
+
+            claimed_ids = {job.id for job in claimed}
+            for job_id in job_ids:
+                if job_id not in claimed_ids:
+                    self._queue.job_finished(job_id)
+
+        if jobs:
+            # Start jobs in the order the policy picked them
+            position = {job_id: i for i, job_id in enumerate(popped)}
+            jobs.sort(key=lambda job: position[job.id])
+        return jobs
+
+    def _announce_started(self, jobs):
+        """Let the owners of jobs that were just submitted know they started"""
+        self._announce(jobs, "started")
+
+    def _announce(self, jobs, change):
+        """
+        Broadcast the new state of jobs that were just ``change`` (started,
+        created, ...) to their owners. This is best effort: the change is
+        committed either way, so a broken channel layer only costs the
+        notification.
+        """
+        # Imported here because signals imports this module
+        from .signals import broadcast_job_updates
+
+        if not jobs:
+            return
+        try:
+            broadcast_job_updates(jobs)
+        except Exception as e:
+            logger.error(f"Error announcing {len(jobs)} {change} jobs: {e}")
+
+    def _sync_queue(self):
+        """Bring the ready queue up to date with the Job table"""
+        with self._events_lock:
+            changed_jobs = self._changed_jobs
+            self._changed_jobs = set()
+
+        if self._shares_stale and isinstance(self._queue, FairShareQueue):
+            self._shares_stale = False
+            self._queue.set_shares(
+                (user_id, (weight, max_jobs))
+                for user_id, weight, max_jobs in SchedulingShare.objects.values_list(
+                    "user_id", "weight", "max_concurrent_jobs"
+                )
+            )
 
-                # If we've reached our limit, stop
-                if len(result) >= limit:
-                    break
+        if self._queue_stale:
+            self._queue_stale = False
+            # Jobs still waiting on dependencies join when they are released
+            pending_jobs = Job.objects.filter(
+                status="pending", remaining_dependencies=0
+            ).values_list(*QUEUE_FIELDS)
+            self._timers.clear()
+            self._queue.rebuild(
+                item
+                for item in map(self._admit, pending_jobs.iterator())
+                if item is not None
+            )
+            logger.info(
+                f"Loaded {len(self._queue)} pending jobs into the ready queue "
+                f"and {len(self._timers)} delayed jobs into the timing wheel"
+            )
 
-            # Mark selected jobs as running
-            for job in result:
-                job.status = "running"
-                job.started_at = timezone.now()
-                job.save(update_fields=["status", "started_at"])
+        elif changed_jobs:
+            # Jobs not found as pending were deleted or have moved on
+            for job_id in changed_jobs:
+                self._queue.remove(job_id)
+                self._timers.cancel(job_id)
+
+            changed_jobs = list(changed_jobs)
+            for start in range(0, len(changed_jobs), CHANGED_JOBS_CHUNK_SIZE):
+                pending_jobs = Job.objects.filter(
+                    id__in=changed_jobs[start : start + CHANGED_JOBS_CHUNK_SIZE],
+                    status="pending",
+                    remaining_dependencies=0,
+                ).values_list(*QUEUE_FIELDS)
+                for row in pending_jobs:
+                    item = self._admit(row)
+                    if item is not None:
+                        self._queue.push(*item)
+
+        # Delayed jobs whose start time has come
+        for item in self._timers.advance(time.time()):
+            self._queue.push(*item)
+
+    def _admit(self, row):
+        """
+        Ready queue item for a pending Job row, or None if the job may not start
+        yet and was put on the timing wheel instead
+        """
+        *fields, updated_at, run_at = row
+        item = self._queue_item(*fields, Job.compute_ready_at(updated_at, run_at))
+        if run_at is not None and self._timers.schedule(
+            item[0], run_at.timestamp(), item
+        ):
+            return None
+        return item
+
+    def _time_to_next_timer(self):
+        """Seconds until the timing wheel next needs advancing (inf if empty)"""
+        expiration = self._timers.next_expiration()
+        if expiration is None:
+            return float("inf")
+        return expiration - time.time()
+
+    def _queue_item(
+        self,
+        job_id,
+        priority,
+        deadline,
+        created_at,
+        latest_start_at,
+        queue,
+        user_id,
+        ready_at,
+    ):
+        """Ready queue ``(job_id, key, partition, user_id)`` for a Job row"""
+        key = self._queue.sort_key(
+            priority, deadline, created_at, latest_start_at, ready_at
+        )
+        return job_id, key, queue, user_id
+
+    def _claim_job_ids(self, job_ids):
+        """Claim the given jobs, skipping any that are no longer pending"""
+        if not job_ids:
+            return []
+
+        connection = connections[DEFAULT_DB_ALIAS]
+        placeholders = ", ".join(["%s"] * len(job_ids))
+        return self._claim(
+            f"status = 'pending' AND remaining_dependencies = 0 "
+            f"AND (run_at IS NULL OR run_at <= %s) AND id IN ({placeholders})",
+            [
+                timezone.now(),
+                *(
+                    Job._meta.pk.get_db_prep_value(job_id, connection)
+                    for job_id in job_ids
+                ),
+            ],
+        )
+
+    def _claim(self, condition, params):
+        """
+        Flip the jobs matching an SQL condition to running and return them, in a
+        single UPDATE ... RETURNING statement. updated_at is left alone: it
+        still tells when each job became runnable (see Job.ready_at), which
+        RETURNING could not give otherwise, and started_at records the claim.
+        """
+        connection = connections[DEFAULT_DB_ALIAS]
+        qn = connection.ops.quote_name
+        table = qn(Job._meta.db_table)
+        columns = ", ".join(qn(field.column) for field in Job._meta.concrete_fields)
+
+        sql = (
+            f"UPDATE {table} SET status = 'running', started_at = %s, "
+            f"worker_id = %s, heartbeat_at = %s, lease_expires_at = %s, "
+            f"attempts = attempts + 1 "
+            f"WHERE {condition} RETURNING {columns}"
+        )
+        now = timezone.now()
+        lease_expires_at = now + timedelta(seconds=settings.SCHEDULER_LEASE_SECONDS)
+        with transaction.atomic():
+            claim_started = time.perf_counter()
+            jobs = list(
+                Job.objects.raw(
+                    sql, [now, self.worker_id, now, lease_expires_at, *params]
+                )
+            )
+            metrics.CLAIM_SECONDS.observe(time.perf_counter() - claim_started)
+            counters.jobs_moved(jobs, "pending")
 
-            return result
+        for job in jobs:
+            metrics.START_LATENCY_SECONDS.observe((now - job.ready_at).total_seconds())
+        return jobs
 
     def _execute_job(self, job):
-        """Execute a single job"""
+        """Execute a single job and buffer its outcome"""
+        started_at = timezone.now()
         try:
-            # Create execution record
-            execution = JobExecution.objects.create(job=job)
-
             # Log start
             logger.info(f"Starting job {job.name} ({job.id})")
 
-            # Simulate work
-            time.sleep(job.estimated_duration)
-
-            # Mark job as completed
-            with transaction.atomic():
-                # Re-fetch the job to ensure we have the latest state
-                job = Job.objects.get(id=job.id)
-
-                # Only update if the job is still running
-                if job.status == "running":
-                    job.status = "completed"
-                    job.completed_at = timezone.now()
-                    job.save(update_fields=["status", "completed_at"])
-
-                    # Update execution record
-                    execution.completed_at = job.completed_at
-                    execution.success = True
-                    execution.execution_time = round(
-                        (execution.completed_at - execution.started_at).total_seconds(),
-                        3,
-                    )
-                    execution.save(
-                        update_fields=["completed_at", "success", "execution_time"]
-                    )
-
-                    logger.info(f"Completed job {job.name} ({job.id})")
-
-        except Exception as e:
-            # Mark job as failed
+            # Only the job body failing fails the job
+            success, error = True, None
             try:
-                # Re-fetch the job
-                job = Job.objects.get(id=job.id)
-                job.status = "failed"
-                job.completed_at = timezone.now()
-                job.save(update_fields=["status", "completed_at"])
-
-                # Update execution record
-                execution.completed_at = timezone.now()
-                execution.success = False
-                execution.error_message = str(e)
-                execution.save(
-                    update_fields=["completed_at", "success", "error_message"]
-                )
+                # Run the job body on its execution backend
+                self.backends.for_job(job).execute(job)
+            except Exception as e:
+                success, error = False, e
 
-                logger.error(f"Job {job.name} ({job.id}) failed: {e}")
-            except Exception as inner_e:
-                logger.error(f"Error handling job failure: {inner_e}")
+            try:
+                self.completions.record(job, started_at, success=success, error=error)
+            except Exception as e:
+                # The outcome stays buffered and is written by the next flush
+                logger.error(f"Error writing the outcome of job {job.id}: {e}")
 
         finally:
             # Remove job from the current jobs set
             with self._lock:
                 self._current_jobs.discard(job.id)
+            self._queue.job_finished(job.id)
+
+            # A slot just freed up
+            self.notify()
 
 
 # Create a singleton instance
@@ -181,3 +739,53 @@ scheduler = JobScheduler()
 def get_scheduler():
     """Get the scheduler instance"""
     return scheduler
+
+
+def set_scheduler(instance):
+    """Replace the scheduler instance, e.g. with another engine"""
+    global scheduler
+    scheduler = instance
+
+
+def notify_scheduler(
+    job_id=None, using=DEFAULT_DB_ALIAS, recurring=False, job_ids=None
+):
+    """
+    Tell the scheduler, once the current transaction commits, that a job was
+    created, edited or deleted (or just wake it when ``job_id`` is None), with
+    ``job_ids`` that several were, e.g. created in bulk, or with ``recurring``
+    that a recurring definition was. The scheduler is reached directly when
+    it runs in this process and through Postgres NOTIFY when it runs
+    elsewhere, with NOTIFY_JOB_IDS job ids per notification.
+    """
+    job_ids = None if job_ids is None else list(job_ids)
+
+    def send():
+        if job_ids is not None:
+            scheduler.jobs_changed(job_ids)
+            payloads = [
+                JOBS_CHANGED
+                + ",".join(
+                    job_id.hex for job_id in job_ids[start : start + NOTIFY_JOB_IDS]
+                )
+                for start in range(0, len(job_ids), NOTIFY_JOB_IDS)
+            ]
+        elif recurring:
+            scheduler.recurring_changed()
+            payloads = [RECURRING_CHANGED]
+        elif job_id is None:
+            scheduler.notify()
+            payloads = [""]
+        else:
+            scheduler.job_changed(job_id)
+            payloads = [str(job_id)]
+
+        connection = connections[using]
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                for payload in payloads:
+                    cursor.execute(
+                        "SELECT pg_notify(%s, %s)", [WAKEUP_CHANNEL, payload]
+                    )
+
+    transaction.on_commit(send, using=using)
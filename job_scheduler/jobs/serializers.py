@@ -1,15 +1,49 @@
 # jobs/serializers.py
-from rest_framework import serializers
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from django.db import transaction
 from django.utils import timezone
-from .models import Job, JobExecution
+from . import feasibility
+from .dependencies import unfinished_count
+from .models import Job, JobExecution, RecurringJob
+
+
+class PriorityField(serializers.Field):
+    """
+    A priority by name, e.g. "high", stored as its level. Levels are accepted
+    as input too.
+    """
+
+    default_error_messages = {
+        "invalid_choice": '"{input}" is not a valid priority; expected one of {names}.'
+    }
+
+    def to_representation(self, value):
+        return Job.PRIORITY_NAMES.get(value, value)
+
+    def to_internal_value(self, data):
+        try:
+            return Job.parse_priority(data)
+        except ValueError:
+            self.fail(
+                "invalid_choice", input=data, names=", ".join(Job.PRIORITY_VALUES)
+            )
 
 
 class JobSerializer(serializers.ModelSerializer):
     status_display = serializers.SerializerMethodField()
+    priority = PriorityField(required=False)
     priority_display = serializers.SerializerMethodField()
     wait_time = serializers.SerializerMethodField()
     duration = serializers.SerializerMethodField()
     user = serializers.ReadOnlyField(source="user.username")
+    depends_on = serializers.PrimaryKeyRelatedField(
+        source="dependencies",
+        many=True,
+        required=False,
+        queryset=Job.objects.all(),
+        help_text="IDs of jobs that must complete before this one starts",
+    )
 
     class Meta:
         model = Job
@@ -21,6 +55,13 @@ class JobSerializer(serializers.ModelSerializer):
             "priority",
             "priority_display",
             "deadline",
+            "latest_start_at",
+            "run_at",
+            "queue",
+            "execution_backend",
+            "recurring_job",
+            "depends_on",
+            "remaining_dependencies",
             "status",
             "status_display",
             "created_at",
@@ -32,6 +73,9 @@ class JobSerializer(serializers.ModelSerializer):
         read_only_fields = [
             "id",
             "status",
+            "latest_start_at",
+            "recurring_job",
+            "remaining_dependencies",
             "created_at",
             "started_at",
             "completed_at",
@@ -41,6 +85,16 @@ class JobSerializer(serializers.ModelSerializer):
             "priority_display",
         ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Jobs may only depend on their owner's jobs
+        request = self.context.get("request")
+        if request is not None and "depends_on" in self.fields:
+            self.fields["depends_on"].child_relation.queryset = Job.objects.filter(
+                user=request.user
+            )
+
     def get_status_display(self, obj):
         """Get human-readable status"""
         return dict(Job.STATUS_CHOICES).get(obj.status, obj.status)
@@ -71,11 +125,260 @@ class JobSerializer(serializers.ModelSerializer):
             )
         return value
 
+    def validate_depends_on(self, parents):
+        """Dependencies are fixed at creation and may not have failed"""
+        if self.instance is not None:
+            current = set(self.instance.dependencies.values_list("id", flat=True))
+            if {parent.id for parent in parents} != current:
+                raise serializers.ValidationError(
+                    "Dependencies can only be set when the job is created"
+                )
+            return parents
+
+        for parent in parents:
+            if parent.status == "failed":
+                raise serializers.ValidationError(
+                    f"Job {parent.id} has failed, so this job could never run"
+                )
+        return parents
+
+    def validate(self, attrs):
+        """
+        Check the job may start before its deadline and can meet it given the
+        current backlog
+        """
+        self.deadline_warning = None
+
+        # Apply the changes to a copy so partial updates are checked in full
+        values = {key: value for key, value in attrs.items() if key != "dependencies"}
+        job = Job(**{**self._current_values(), **values})
+        self._validate_run_at(job.run_at, job.deadline)
+
+        if feasibility.check_mode() == "off":
+            return attrs
+
+        problem = feasibility.deadline_problem(job)
+        if problem and feasibility.check_mode() == "reject":
+            raise serializers.ValidationError({"deadline": problem})
+        self.deadline_warning = problem
+        return attrs
+
+    @staticmethod
+    def _validate_run_at(run_at, deadline):
+        """A delayed job must be able to start before its deadline"""
+        if run_at and run_at >= deadline:
+            raise serializers.ValidationError(
+                {"run_at": "Start time must be before the deadline"}
+            )
+
+    def _current_values(self):
+        """Field values of the job being updated, if any"""
+        if self.instance is None:
+            return {}
+        return {
+            "id": self.instance.id,
+            "priority": self.instance.priority,
+            "deadline": self.instance.deadline,
+            "estimated_duration": self.instance.estimated_duration,
+            "run_at": self.instance.run_at,
+        }
+
     def create(self, validated_data):
         """Create a new job and set the user from the request"""
         user = self.context["request"].user
         validated_data["user"] = user
-        return super().create(validated_data)
+        parents = validated_data.pop("dependencies", [])
+
+        with transaction.atomic():
+            # Lock the parents so none finishes between counting and linking
+            parents = list(
+                Job.objects.select_for_update().filter(
+                    id__in=[parent.id for parent in parents]
+                )
+            )
+            if any(parent.status == "failed" for parent in parents):
+                raise serializers.ValidationError(
+                    {"depends_on": "A job this one depends on has failed"}
+                )
+
+            validated_data["remaining_dependencies"] = unfinished_count(parents)
+            job = super().create(validated_data)
+            job.dependencies.set(parents)
+
+        self._log_deadline_warning(job)
+        return job
+
+    def update(self, instance, validated_data):
+        # Unchanged, as validate_depends_on made sure
+        validated_data.pop("dependencies", None)
+        job = super().update(instance, validated_data)
+        self._log_deadline_warning(job)
+        return job
+
+    def _log_deadline_warning(self, job):
+        if getattr(self, "deadline_warning", None):
+            feasibility.log_deadline_warning(job, self.deadline_warning)
+
+
+class JobRowSerializer:
+    """
+    Read-only fast path for JobSerializer's output. Jobs are read as
+    values_list() tuples rather than model instances (see ``rows()``), the
+    dependencies of a whole page come from one query, labels come from lookup
+    tables built once, and wait times are measured against a single ``now``.
+    ``data`` is what JobSerializer(many=True) would give for the same jobs.
+    """
+
+    # Columns each row is read with, in the order to_representation() unpacks
+    COLUMNS = (
+        "id",
+        "name",
+        "user__username",
+        "estimated_duration",
+        "priority",
+        "deadline",
+        "latest_start_at",
+        "run_at",
+        "queue",
+        "execution_backend",
+        "recurring_job_id",
+        "remaining_dependencies",
+        "status",
+        "created_at",
+        "started_at",
+        "completed_at",
+    )
+
+    STATUS_LABELS = dict(Job.STATUS_CHOICES)
+    PRIORITY_LABELS = dict(Job.PRIORITY_CHOICES)
+
+    def __init__(self, rows, many=True):
+        self.rows = rows
+        self.many = many
+
+    @classmethod
+    def rows(cls, queryset):
+        """``queryset`` of jobs as the rows this serializer reads"""
+        return queryset.prefetch_related(None).values_list(*cls.COLUMNS, named=True)
+
+    @property
+    def data(self):
+        rows = self.rows if self.many else [self.rows]
+        dependencies = self._dependencies([row[0] for row in rows])
+        now = timezone.now()
+        datetime = _datetime_representation()
+        data = [
+            self.to_representation(row, dependencies, now, datetime) for row in rows
+        ]
+        return data if self.many else data[0]
+
+    def to_representation(self, row, dependencies, now, datetime):
+        (
+            job_id,
+            name,
+            username,
+            estimated_duration,
+            priority,
+            deadline,
+            latest_start_at,
+            run_at,
+            queue,
+            execution_backend,
+            recurring_job_id,
+            remaining_dependencies,
+            status,
+            created_at,
+            started_at,
+            completed_at,
+        ) = row
+        if started_at:
+            wait_time = (started_at - created_at).total_seconds()
+        else:
+            wait_time = (now - created_at).total_seconds()
+        if started_at and completed_at:
+            duration = (completed_at - started_at).total_seconds()
+        else:
+            duration = None
+
+        return {
+            "id": str(job_id),
+            "name": name,
+            "user": username,
+            "estimated_duration": estimated_duration,
+            "priority": Job.PRIORITY_NAMES.get(priority, priority),
+            "priority_display": self.PRIORITY_LABELS.get(priority, priority),
+            "deadline": datetime(deadline),
+            "latest_start_at": datetime(latest_start_at),
+            "run_at": datetime(run_at),
+            "queue": queue,
+            "execution_backend": execution_backend,
+            "recurring_job": recurring_job_id and str(recurring_job_id),
+            "depends_on": dependencies.get(job_id, []),
+            "remaining_dependencies": remaining_dependencies,
+            "status": status,
+            "status_display": self.STATUS_LABELS.get(status, status),
+            "created_at": datetime(created_at),
+            "started_at": datetime(started_at),
+            "completed_at": datetime(completed_at),
+            "wait_time": wait_time,
+            "duration": duration,
+        }
+
+    @staticmethod
+    def _dependencies(job_ids):
+        """``{job id: [dependency ids]}`` for the jobs, in the model's order"""
+        dependencies = {}
+        if not job_ids:
+            return dependencies
+
+        # Ordering by the relation applies the Job model's ordering
+        links = (
+            Job.dependencies.through.objects.filter(from_job_id__in=job_ids)
+            .order_by("to_job")
+            .values_list("from_job_id", "to_job_id")
+        )
+        for job_id, dependency_id in links:
+            dependencies.setdefault(job_id, []).append(str(dependency_id))
+        return dependencies
+
+
+def _datetime_representation():
+    """
+    Function formatting a datetime like serializers.DateTimeField, with the
+    current time zone looked up once
+    """
+    output_format = api_settings.DATETIME_FORMAT
+    if output_format is None or output_format.lower() != ISO_8601:
+        return serializers.DateTimeField().to_representation
+
+    tz = timezone.get_current_timezone()
+
+    def representation(value):
+        if not value:
+            return None
+        value = value.astimezone(tz).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    return representation
+
+
+class BulkJobSerializer(JobSerializer):
+    """
+    JobSerializer rules for rows submitted in bulk. Dependencies can't be set,
+    and the backlog-based deadline check, a query per job here, is done by
+    create_jobs() for a whole chunk at once.
+    """
+
+    depends_on = None
+
+    class Meta(JobSerializer.Meta):
+        fields = [field for field in JobSerializer.Meta.fields if field != "depends_on"]
+
+    def validate(self, attrs):
+        self._validate_run_at(attrs.get("run_at"), attrs["deadline"])
+        return attrs
 
 
 class JobExecutionSerializer(serializers.ModelSerializer):
@@ -97,3 +400,57 @@ class JobExecutionSerializer(serializers.ModelSerializer):
     def get_duration(self, obj):
         """Get execution duration in seconds"""
         return obj.duration
+
+
+class RecurringJobSerializer(serializers.ModelSerializer):
+    user = serializers.ReadOnlyField(source="user.username")
+    priority = PriorityField(required=False)
+
+    class Meta:
+        model = RecurringJob
+        fields = [
+            "id",
+            "name",
+            "user",
+            "cron_expression",
+            "estimated_duration",
+            "priority",
+            "deadline_offset",
+            "queue",
+            "execution_backend",
+            "misfire_policy",
+            "enabled",
+            "next_fire_at",
+            "last_fired_at",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = [
+            "id",
+            "next_fire_at",
+            "last_fired_at",
+            "created_at",
+            "updated_at",
+        ]
+
+    def validate_estimated_duration(self, value):
+        # Ensure estimated duration is positive
+        if value <= 0:
+            raise serializers.ValidationError(
+                "Estimated duration must be greater than zero"
+            )
+        return value
+
+    def validate(self, attrs):
+        """Check each generated job has time to run before its deadline"""
+        estimated_duration = attrs.get(
+            "estimated_duration", getattr(self.instance, "estimated_duration", None)
+        )
+        deadline_offset = attrs.get(
+            "deadline_offset", getattr(self.instance, "deadline_offset", None)
+        )
+        if deadline_offset < estimated_duration:
+            raise serializers.ValidationError(
+                {"deadline_offset": "Must be at least the estimated duration"}
+            )
+        return attrs
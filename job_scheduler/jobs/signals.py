@@ -1,8 +1,11 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
-from .models import Job
+from .models import Job, RecurringJob
+from .scheduler import notify_scheduler
+from .stats import user_job_stats
 
 
 @receiver(post_save, sender=Job)
@@ -11,64 +14,112 @@ def job_post_save(sender, instance, created, **kwargs):
     Signal to send WebSocket notifications when a job is created or updated.
     Sends notifications to the job owner's group.
     """
+    # New or edited pending jobs should be picked up without waiting for a poll
+    if instance.status == "pending":
+        notify_scheduler(instance.id)
+
     channel_layer = get_channel_layer()
 
     # Skip if no channel layer (e.g., during tests)
     if not channel_layer:
         return
 
-    # Prepare job data for WebSocket
-    job_data = {
-        "id": str(instance.id),
-        "name": instance.name,
-        "status": instance.status,
-        "priority": instance.priority,
-        "deadline": instance.deadline.isoformat() if instance.deadline else None,
-        "created_at": instance.created_at.isoformat(),
-        "started_at": instance.started_at.isoformat() if instance.started_at else None,
-        "completed_at": instance.completed_at.isoformat()
-        if instance.completed_at
-        else None,
-        "wait_time": instance.wait_time,
-        "duration": instance.duration,
-        "status_color": instance.status_color,
-    }
-
     # Send to user's group
-    group_name = f"jobs_{instance.user.id}"
+    group_name = f"jobs_{instance.user_id}"
 
     # Send job update
     async_to_sync(channel_layer.group_send)(
-        group_name, {"type": "job_update", "data": job_data}
+        group_name, {"type": "job_update", "data": get_job_data(instance)}
     )
 
     # Also send updated stats for dashboard
     # This would typically be done only on status changes, but for simplicity
-    # we'll send it on all updates
-    async_to_sync(channel_layer.group_send)(
-        group_name, {"type": "stats_update", "data": get_user_stats(instance.user)}
+    # we'll send it on all updates. The owner's counters only take the job
+    # into account once save() returns.
+    user_id = instance.user_id
+    transaction.on_commit(
+        lambda: async_to_sync(channel_layer.group_send)(
+            group_name, {"type": "stats_update", "data": user_job_stats(user_id)}
+        )
     )
 
 
-def get_user_stats(user):
+@receiver(post_delete, sender=Job)
+def job_post_delete(sender, instance, **kwargs):
+    """Let the scheduler drop deleted pending jobs from its ready queue"""
+    if instance.status == "pending":
+        notify_scheduler(instance.id)
+
+
+@receiver(post_save, sender=RecurringJob)
+@receiver(post_delete, sender=RecurringJob)
+def recurring_job_changed(sender, instance, **kwargs):
+    """Let the scheduler pick up new and rescheduled recurring definitions"""
+    notify_scheduler(recurring=True)
+
+
+def broadcast_job_updates(jobs):
     """
-    Get statistics about a user's jobs for WebSocket notifications
+    Send WebSocket notifications for jobs changed in bulk, where post_save
+    does not fire. Each owner gets every job update but only one stats update.
     """
+    channel_layer = get_channel_layer()
+
+    # Skip if no channel layer (e.g., during tests)
+    if not channel_layer:
+        return
+
+    jobs_by_user = {}
+    for job in jobs:
+        jobs_by_user.setdefault(job.user_id, []).append(job)
+
+    for user_id, user_jobs in jobs_by_user.items():
+        group_name = f"jobs_{user_id}"
 
-    user_jobs = Job.objects.filter(user=user)
+        for job in user_jobs:
+            async_to_sync(channel_layer.group_send)(
+                group_name, {"type": "job_update", "data": get_job_data(job)}
+            )
 
-    # Get counts by status
-    status_counts = {}
-    for status, _ in Job.STATUS_CHOICES:
-        status_counts[status] = user_jobs.filter(status=status).count()
+        async_to_sync(channel_layer.group_send)(
+            group_name, {"type": "stats_update", "data": user_job_stats(user_id)}
+        )
 
-    # Get counts by priority
-    priority_counts = {}
-    for priority, _ in Job.PRIORITY_CHOICES:
-        priority_counts[priority] = user_jobs.filter(priority=priority).count()
 
+def broadcast_jobs_created(user_id, count):
+    """
+    Tell a user about jobs created in bulk with one summary and one stats
+    update, not a message per job
+    """
+    channel_layer = get_channel_layer()
+
+    # Skip if no channel layer (e.g., during tests)
+    if not channel_layer:
+        return
+
+    group_name = f"jobs_{user_id}"
+    async_to_sync(channel_layer.group_send)(
+        group_name, {"type": "jobs_created", "data": {"count": count}}
+    )
+    async_to_sync(channel_layer.group_send)(
+        group_name, {"type": "stats_update", "data": user_job_stats(user_id)}
+    )
+
+
+def get_job_data(instance):
+    """Serialize a job for WebSocket notifications"""
     return {
-        "status_counts": status_counts,
-        "priority_counts": priority_counts,
-        "total_jobs": user_jobs.count(),
+        "id": str(instance.id),
+        "name": instance.name,
+        "status": instance.status,
+        "priority": instance.priority_name,
+        "deadline": instance.deadline.isoformat() if instance.deadline else None,
+        "created_at": instance.created_at.isoformat(),
+        "started_at": instance.started_at.isoformat() if instance.started_at else None,
+        "completed_at": instance.completed_at.isoformat()
+        if instance.completed_at
+        else None,
+        "wait_time": instance.wait_time,
+        "duration": instance.duration,
+        "status_color": instance.status_color,
     }
@@ -0,0 +1,373 @@
+# jobs/simulator.py
+import array
+import collections
+import csv
+import heapq
+import random
+from .models import Job
+from .queues import POLICIES, FairShareQueue
+from .timing_wheel import TimingWheel
+
+# A job as the simulator sees it. Times are seconds since the workload began;
+# ``duration`` is how long the job really runs, ``estimated_duration`` what the
+# scheduler is told.
+SimJob = collections.namedtuple(
+    "SimJob",
+    [
+        "id",
+        "user_id",
+        "priority",
+        "queue",
+        "submitted_at",
+        "run_at",
+        "estimated_duration",
+        "duration",
+        "deadline",
+    ],
+)
+
+SimulationReport = collections.namedtuple(
+    "SimulationReport",
+    [
+        "policy",
+        "workers",
+        "jobs",
+        "makespan",
+        "throughput",
+        "utilization",
+        "wait_p50",
+        "wait_p95",
+        "wait_p99",
+        "wait_max",
+        "low_priority_wait_p99",
+        "low_priority_wait_max",
+        "deadline_miss_rate",
+        "fairness",
+    ],
+)
+
+
+class Simulation:
+    """
+    Discrete-event simulation of the scheduler on a virtual clock. Jobs are
+    picked by the same ready queues, sort keys and timing wheel as JobScheduler
+    uses, but claiming is free, the database is a dict and a job's run is
+    just an event ``duration`` seconds later, so hours of work replay in
+    seconds.
+
+    Reports throughput, worker utilization, wait-time percentiles (from when a
+    job could first start to when it started), the share of jobs finishing
+    after their deadline, and fairness as Jain's index over the users' stretch
+    (time their jobs spent in the system over the time they ran), scaled by
+    their weight: 1.0 when every user is slowed down in proportion to their
+    share.
+    """
+
+    def __init__(
+        self,
+        policy="priority",
+        workers=3,
+        shares=None,
+        default_weight=1,
+        default_max_jobs=None,
+        queue_concurrency=None,
+        timer_tick=0.01,
+        priority_aging=0,
+    ):
+        self.policy = policy
+        self.workers = workers
+        self.shares = dict(shares or {})
+        self.default_weight = default_weight
+        self.queue_concurrency = dict(queue_concurrency or {})
+
+        self._queue = POLICIES[policy]()
+        self._queue.priority_aging = priority_aging
+        if isinstance(self._queue, FairShareQueue):
+            self._queue.default_weight = default_weight
+            self._queue.default_max_jobs = default_max_jobs
+            self._queue.set_shares(self.shares)
+        self._timers = TimingWheel(timer_tick, now=0.0)
+
+    def run(self, workload):
+        """Replay ``workload``, SimJobs in submission order, and report on it"""
+        queue = self._queue
+        timers = self._timers
+        waiting = {}
+        running = []
+        queue_load = collections.Counter()
+
+        waits = array.array("d")
+        # Waits of the lowest priority's jobs, the ones aging protects
+        lowest_priority = min(Job.PRIORITY_NAMES)
+        low_waits = array.array("d")
+        service = collections.Counter()
+        response = collections.Counter()
+        missed = 0
+        busy_time = 0.0
+        first_submitted = None
+        now = 0.0
+
+        arrivals = iter(workload)
+        next_job = next(arrivals, None)
+        while next_job is not None or running or len(timers):
+            # Jump to the next arrival, completion or delayed job coming due
+            events = [running[0][0]] if running else []
+            if next_job is not None:
+                events.append(next_job.submitted_at)
+            expiration = timers.next_expiration()
+            if expiration is not None:
+                events.append(expiration)
+            now = max(now, min(events))
+
+            while running and running[0][0] <= now:
+                finished_at, _, job = heapq.heappop(running)
+                response[job.user_id] += finished_at - job.submitted_at
+                queue_load[job.queue] -= 1
+                queue.job_finished(job.id)
+                if finished_at > job.deadline:
+                    missed += 1
+
+            while next_job is not None and next_job.submitted_at <= now:
+                if first_submitted is None:
+                    first_submitted = next_job.submitted_at
+                waiting[next_job.id] = next_job
+                item = self._queue_item(next_job)
+                if next_job.run_at is None or not timers.schedule(
+                    next_job.id, next_job.run_at, item
+                ):
+                    queue.push(*item)
+                next_job = next(arrivals, None)
+
+            for item in timers.advance(now):
+                queue.push(*item)
+
+            # Fill the free workers, as the async engine does, skipping queues
+            # at their concurrency limit
+            while len(running) < self.workers and len(queue):
+                saturated = {
+                    name
+                    for name, limit in self.queue_concurrency.items()
+                    if queue_load[name] >= limit
+                }
+                job_id, _ = queue.pop_with_partition(exclude=saturated)
+                if job_id is None:
+                    break
+
+                job = waiting.pop(job_id)
+                ready_at = max(job.submitted_at, job.run_at or 0.0)
+                waits.append(now - ready_at)
+                if job.priority == lowest_priority:
+                    low_waits.append(now - ready_at)
+                service[job.user_id] += job.duration
+                busy_time += job.duration
+                queue_load[job.queue] += 1
+                heapq.heappush(running, (now + job.duration, job_id, job))
+
+        return self._report(
+            waits, low_waits, missed, service, response, busy_time, first_submitted, now
+        )
+
+    def _queue_item(self, job):
+        """Ready queue ``(job_id, key, partition, user_id)`` for a SimJob"""
+        key = self._queue.sort_key(
+            job.priority,
+            job.deadline,
+            job.submitted_at,
+            # Job.compute_latest_start, in seconds rather than datetimes
+            job.deadline - job.estimated_duration,
+            # Job.compute_ready_at; simulated jobs are never edited
+            max(job.submitted_at, job.run_at or 0.0),
+        )
+        return job.id, key, job.queue, job.user_id
+
+    def _report(
+        self,
+        waits,
+        low_waits,
+        missed,
+        service,
+        response,
+        busy_time,
+        first_submitted,
+        now,
+    ):
+        """Summarise a finished run"""
+        count = len(waits)
+        makespan = now - (first_submitted or 0.0)
+        waits = sorted(waits)
+        low_waits = sorted(low_waits)
+
+        # Jain's index over each user's stretch times their weight
+        normalized = [
+            response[user_id]
+            / seconds
+            * (self.shares.get(user_id, (None, None))[0] or self.default_weight)
+            for user_id, seconds in service.items()
+            if seconds
+        ]
+        squares = sum(value * value for value in normalized)
+        fairness = (
+            sum(normalized) ** 2 / (len(normalized) * squares) if squares else 1.0
+        )
+
+        return SimulationReport(
+            policy=self.policy,
+            workers=self.workers,
+            jobs=count,
+            makespan=makespan,
+            throughput=count / makespan if makespan else 0.0,
+            utilization=busy_time / (makespan * self.workers) if makespan else 0.0,
+            wait_p50=percentile(waits, 50),
+            wait_p95=percentile(waits, 95),
+            wait_p99=percentile(waits, 99),
+            wait_max=waits[-1] if waits else 0.0,
+            low_priority_wait_p99=percentile(low_waits, 99),
+            low_priority_wait_max=low_waits[-1] if low_waits else 0.0,
+            deadline_miss_rate=missed / count if count else 0.0,
+            fairness=fairness,
+        )
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank ``q``th percentile of an already sorted sequence"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def synthetic_workload(
+    jobs,
+    users=10,
+    arrival_rate=10.0,
+    mean_duration=1.0,
+    estimate_error=0.2,
+    deadline_slack=(1.5, 10.0),
+    delayed_fraction=0.0,
+    seed=0,
+):
+    """
+    Generate ``jobs`` SimJobs with Poisson arrivals (``arrival_rate`` per
+    second) and exponentially distributed run times. Users submit in Zipf
+    proportions, so a few heavy users dominate. Estimates are off by up to
+    ``estimate_error``, deadlines allow between ``deadline_slack`` times the
+    estimate, and ``delayed_fraction`` of the jobs have a run_at up to a
+    minute ahead.
+    """
+    rng = random.Random(seed)
+    user_weights = [1 / (user + 1) for user in range(users)]
+    user_ids = list(range(users))
+    priorities = [priority for priority, _ in Job.PRIORITY_CHOICES]
+
+    submitted_at = 0.0
+    for job_id in range(jobs):
+        submitted_at += rng.expovariate(arrival_rate)
+        duration = rng.expovariate(1 / mean_duration)
+        estimated_duration = max(
+            1, round(duration * rng.uniform(1 - estimate_error, 1 + estimate_error))
+        )
+        run_at = (
+            submitted_at + rng.uniform(0, 60)
+            if rng.random() < delayed_fraction
+            else None
+        )
+        deadline = (run_at or submitted_at) + estimated_duration * rng.uniform(
+            *deadline_slack
+        )
+
+        yield SimJob(
+            id=job_id,
+            user_id=rng.choices(user_ids, user_weights)[0],
+            priority=rng.choice(priorities),
+            queue="default",
+            submitted_at=submitted_at,
+            run_at=run_at,
+            estimated_duration=estimated_duration,
+            duration=duration,
+            deadline=deadline,
+        )
+
+
+def recorded_workload(path):
+    """
+    Read SimJobs from a CSV file with a column per SimJob field (run_at may be
+    empty, priority is a name or a level), in submission order
+    """
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+
+    jobs = [
+        SimJob(
+            id=row["id"],
+            user_id=row["user_id"],
+            priority=Job.parse_priority(row["priority"]),
+            queue=row["queue"] or "default",
+            submitted_at=float(row["submitted_at"]),
+            run_at=float(row["run_at"]) if row["run_at"] else None,
+            estimated_duration=float(row["estimated_duration"]),
+            duration=float(row["duration"]),
+            deadline=float(row["deadline"]),
+        )
+        for row in rows
+    ]
+    jobs.sort(key=lambda job: job.submitted_at)
+    return jobs
+
+
+def database_workload(jobs):
+    """
+    SimJobs replaying a Job queryset as it was submitted. Jobs that ran take as
+    long as their last execution did; the others take their estimate.
+    """
+    rows = (
+        jobs.order_by("created_at")
+        .values_list(
+            "id",
+            "user_id",
+            "priority",
+            "queue",
+            "created_at",
+            "run_at",
+            "estimated_duration",
+            "deadline",
+        )
+        .iterator()
+    )
+    durations = dict(
+        jobs.filter(executions__execution_time__isnull=False)
+        .order_by("id", "executions__started_at")
+        .values_list("id", "executions__execution_time")
+    )
+
+    start = None
+    for (
+        job_id,
+        user_id,
+        priority,
+        queue,
+        created_at,
+        run_at,
+        estimate,
+        deadline,
+    ) in rows:
+        if start is None:
+            start = created_at
+        yield SimJob(
+            id=job_id,
+            user_id=user_id,
+            priority=priority,
+            queue=queue,
+            submitted_at=(created_at - start).total_seconds(),
+            run_at=(run_at - start).total_seconds() if run_at else None,
+            estimated_duration=estimate,
+            duration=durations.get(job_id, estimate),
+            deadline=(deadline - start).total_seconds(),
+        )
+
+
+def write_workload(path, workload):
+    """Save SimJobs to a CSV file recorded_workload() can read back"""
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(SimJob._fields)
+        writer.writerows(workload)
@@ -0,0 +1,28 @@
+# jobs/stats.py
+from . import counters
+from .models import Job
+
+
+def user_job_stats(user):
+    """
+    Counts by status and priority name, and the average wait and execution
+    time of the completed jobs, for all of ``user``'s jobs (a User or a user
+    id). Read from their counters in O(1) rather than aggregated over the
+    jobs; times are in seconds and averages are 0 without data.
+    """
+    row = counters.get_counters(user)
+    status_counts = {status: getattr(row, status) for status, _ in Job.STATUS_CHOICES}
+    return {
+        "total_jobs": sum(status_counts.values()),
+        "status_counts": status_counts,
+        "priority_counts": {
+            Job.PRIORITY_NAMES[level]: row.priority_counts.get(str(level), 0)
+            for level, _ in Job.PRIORITY_CHOICES
+        },
+        "avg_wait_time": (
+            row.total_wait_time / row.timed_jobs if row.timed_jobs else 0
+        ),
+        "avg_execution_time": (
+            row.total_execution_time / row.timed_jobs if row.timed_jobs else 0
+        ),
+    }
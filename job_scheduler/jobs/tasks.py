@@ -0,0 +1,12 @@
+# jobs/tasks.py
+# Celery tasks run by workers on any host. Like the job bodies they wrap, they
+# never touch the database: the scheduler that dispatched a job records its
+# outcome from the task result.
+from celery import shared_task
+from .worker import run_job
+
+
+@shared_task(name="jobs.run_job")
+def run_job_task(payload):
+    """Run a job body and return its ``(success, error_message, execution_time)``"""
+    return run_job(payload)
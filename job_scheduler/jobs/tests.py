@@ -0,0 +1,1732 @@
+# jobs/tests.py
+import collections
+import math
+import random
+import re
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from . import counters, feasibility, metrics, views
+from .cron import CronExpression
+from .models import Job, JobExecution, JobLog, RecurringJob, UserJobCounters
+from .pagination import InvalidCursor, keyset_page
+from .queues import FairShareQueue, ReadyQueue
+from .quantiles import QuantileSketch, percentiles
+from .renderers import ORJSONRenderer
+from .scheduler import QUEUE_FIELDS, JobScheduler
+from .serializers import JobRowSerializer, JobSerializer
+from .timing_wheel import TimingWheel
+from .write_behind import CompletionBuffer
+
+# Enough rows that the planner prefers an index whenever a usable one exists
+USERS = 50
+JOBS_PER_USER = 400
+
+# One job in this many is still pending, as in a busy system
+PENDING_EVERY = 50
+
+
+class HotQueryPlanTests(TestCase):
+    """
+    The queries the scheduler and the listings run all the time must be
+    answered from an index once the tables are large, never by reading
+    the whole table
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        users = User.objects.bulk_create(
+            [User(username=f"plan-user-{i}") for i in range(USERS)]
+        )
+
+        jobs = []
+        for user in users:
+            for i in range(JOBS_PER_USER):
+                deadline = now + timedelta(minutes=i)
+                jobs.append(
+                    Job(
+                        user=user,
+                        name=f"job-{i}",
+                        estimated_duration=60,
+                        priority=(3, 2, 1)[i % 3],
+                        deadline=deadline,
+                        latest_start_at=deadline - timedelta(seconds=60),
+                        status="pending" if i % PENDING_EVERY == 0 else "completed",
+                    )
+                )
+        Job.objects.bulk_create(jobs, batch_size=1000)
+
+        JobExecution.objects.bulk_create(
+            [
+                JobExecution(job=job, user=job.user, started_at=now, success=True)
+                for job in jobs
+                if job.status == "completed"
+            ],
+            batch_size=1000,
+        )
+        JobLog.objects.bulk_create(
+            [JobLog(job=job, message="Job completed") for job in jobs],
+            batch_size=1000,
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        cls.user = users[0]
+        cls.job = jobs[1]
+
+    def assertNoFullScan(self, plan, table):
+        """Fail if ``plan`` (EXPLAIN output) reads all of ``table``"""
+        if connection.vendor == "postgresql":
+            pattern = rf"Seq Scan on {table}\b"
+        else:
+            # SQLite says SCAN for a full read, unless it walks an index
+            pattern = rf"\bSCAN {table}\b(?! USING (COVERING )?INDEX)"
+        self.assertIsNone(re.search(pattern, plan), f"Full scan of {table}:\n{plan}")
+
+    def assertNoSort(self, plan):
+        """Fail if ``plan`` sorts rows rather than reading them in index order"""
+        if connection.vendor == "postgresql":
+            pattern = r"\bSort\b"
+        else:
+            pattern = r"USE TEMP B-TREE FOR (RIGHT PART OF )?ORDER BY"
+        self.assertIsNone(re.search(pattern, plan), f"Sort:\n{plan}")
+
+    def assertQueryUsesIndex(self, queryset, table):
+        self.assertNoFullScan(queryset.explain(), table)
+
+    def explain(self, sql, params=()):
+        explain = (
+            "EXPLAIN" if connection.vendor == "postgresql" else "EXPLAIN QUERY PLAN"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"{explain} {sql}", params)
+            return "\n".join(" ".join(map(str, row)) for row in cursor.fetchall())
+
+    def assertPagesReadInIndexOrder(self, queryset, ordering, table):
+        """
+        The queries keyset_page() runs for the first page, the next one and
+        the way back neither scan ``table`` nor sort its rows
+        """
+        with CaptureQueriesContext(connection) as queries:
+            first = keyset_page(queryset, ordering, page_size=50)
+            second = keyset_page(queryset, ordering, first.next_cursor, 50)
+            keyset_page(queryset, ordering, second.previous_cursor, 50)
+        self.assertEqual(len(queries), 3)
+        for query in queries:
+            plan = self.explain(query["sql"])
+            self.assertNoFullScan(plan, table)
+            self.assertNoSort(plan)
+
+    def test_claim_query(self):
+        job_ids = list(
+            Job.objects.filter(status="pending").values_list("id", flat=True)[:10]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            claimed = JobScheduler()._claim_job_ids(job_ids)
+        self.assertEqual(len(claimed), len(job_ids))
+
+        claim = next(q["sql"] for q in queries if q["sql"].startswith("UPDATE"))
+        self.assertNoFullScan(self.explain(claim), "jobs_job")
+
+    def test_ready_queue_load(self):
+        self.assertQueryUsesIndex(
+            Job.objects.filter(status="pending", remaining_dependencies=0).values_list(
+                *QUEUE_FIELDS
+            ),
+            "jobs_job",
+        )
+
+    def test_feasibility_running_jobs(self):
+        self.assertQueryUsesIndex(
+            Job.objects.filter(status="running").values_list(
+                "estimated_duration", "started_at"
+            ),
+            "jobs_job",
+        )
+
+    def test_feasibility_work_queued_ahead(self):
+        for policy in ("priority", "laxity"):
+            with self.subTest(policy=policy):
+                self.assertQueryUsesIndex(
+                    Job.objects.filter(
+                        feasibility.runnable(timezone.now())
+                        & feasibility.ahead_of(self.job, policy)
+                    ),
+                    "jobs_job",
+                )
+
+    def test_user_jobs_by_status(self):
+        self.assertQueryUsesIndex(
+            Job.objects.filter(user=self.user, status="pending"), "jobs_job"
+        )
+
+    def test_user_jobs_newest_first(self):
+        self.assertPagesReadInIndexOrder(
+            Job.objects.filter(user=self.user), "-created_at", "jobs_job"
+        )
+
+    def test_recurring_jobs_newest_first(self):
+        self.assertPagesReadInIndexOrder(
+            Job.objects.filter(recurring_job_id=self.job.id), "-created_at", "jobs_job"
+        )
+
+    def test_job_executions(self):
+        self.assertQueryUsesIndex(
+            self.job.executions.order_by("-started_at"), "jobs_jobexecution"
+        )
+
+    def test_user_executions(self):
+        self.assertPagesReadInIndexOrder(
+            JobExecution.objects.filter(user=self.user),
+            "-started_at",
+            "jobs_jobexecution",
+        )
+
+    def test_job_logs(self):
+        self.assertQueryUsesIndex(self.job.logs.all(), "jobs_joblog")
+
+
+class TimingWheelTests(SimpleTestCase):
+    """
+    A small wheel (4 slots of 1 second, 3 levels: 4, 16 and 64 seconds) so
+    that jobs cross level boundaries within a few ticks
+    """
+
+    def wheel(self, now=0.0):
+        return TimingWheel(tick=1.0, slots=4, levels=3, now=now)
+
+    def walk(self, wheel):
+        """Advance to each next_expiration() in turn: ``{time: [items]}``"""
+        released = {}
+        while (expiration := wheel.next_expiration()) is not None:
+            items = wheel.advance(expiration)
+            if items:
+                released[expiration] = items
+        return released
+
+    def test_schedule_in_the_past_or_now_is_refused(self):
+        wheel = self.wheel(now=10.0)
+        self.assertFalse(wheel.schedule("past", 3.0, "past"))
+        self.assertFalse(wheel.schedule("now", 10.0, "now"))
+        self.assertEqual(len(wheel), 0)
+        self.assertIsNone(wheel.next_expiration())
+
+    def test_schedule_in_the_future_is_held(self):
+        wheel = self.wheel()
+        self.assertTrue(wheel.schedule("job", 0.5, "item"))
+        self.assertIn("job", wheel)
+        self.assertEqual(wheel.advance(0.9), [])
+        self.assertEqual(wheel.advance(1.0), ["item"])
+        self.assertNotIn("job", wheel)
+
+    def test_cascades_through_levels_and_releases_on_time(self):
+        wheel = self.wheel()
+        wheel.schedule("job", 10.0, "item")
+
+        # Held at level 1 in the bucket for 8-11, then at level 0
+        self.assertEqual(wheel.next_expiration(), 8.0)
+        self.assertEqual(wheel.advance(8.0), [])
+        self.assertEqual(wheel.next_expiration(), 10.0)
+        self.assertEqual(wheel.advance(9.0), [])
+        self.assertEqual(wheel.advance(10.0), ["item"])
+        self.assertIsNone(wheel.next_expiration())
+
+    def test_beyond_the_span_is_parked_and_released_on_time(self):
+        wheel = self.wheel()
+        wheel.schedule("far", 300.0, "far")
+        self.assertEqual(self.walk(wheel), {300.0: ["far"]})
+
+    def test_every_item_is_released_at_its_due_tick(self):
+        rng = random.Random(0)
+        wheel = self.wheel(now=5.0)
+        dues = {f"job-{i}": 5.0 + rng.uniform(0.1, 200.0) for i in range(300)}
+        for job_id, due in dues.items():
+            self.assertTrue(wheel.schedule(job_id, due, job_id))
+
+        released = self.walk(wheel)
+        self.assertEqual(sum(map(len, released.values())), len(dues))
+        for time, items in released.items():
+            for job_id in items:
+                self.assertEqual(time, math.ceil(dues[job_id]))
+
+    def test_advancing_past_many_buckets_releases_everything_due(self):
+        wheel = self.wheel()
+        for due in (1, 3, 7, 20, 70, 90):
+            wheel.schedule(due, float(due), due)
+        self.assertEqual(sorted(wheel.advance(70.0)), [1, 3, 7, 20, 70])
+        self.assertEqual(self.walk(wheel), {90.0: [90]})
+
+    def test_reschedule_and_cancel(self):
+        wheel = self.wheel()
+        wheel.schedule("job", 20.0, "late")
+        wheel.schedule("job", 2.0, "early")
+        wheel.schedule("gone", 3.0, "gone")
+        wheel.cancel("gone")
+        self.assertEqual(len(wheel), 1)
+        self.assertEqual(self.walk(wheel), {2.0: ["early"]})
+
+    def test_clear(self):
+        wheel = self.wheel()
+        for due in (2, 30, 500):
+            wheel.schedule(due, float(due), due)
+        wheel.clear()
+        self.assertEqual(len(wheel), 0)
+        self.assertIsNone(wheel.next_expiration())
+        self.assertEqual(wheel.advance(1000.0), [])
+
+    def test_fractional_ticks_at_epoch_times(self):
+        now = 1_760_000_000.0
+        wheel = TimingWheel(tick=0.01, now=now)
+        wheel.schedule("job", now + 12.345, "item")
+        self.assertEqual(wheel.advance(now + 12.33), [])
+        # Released within a tick after it is due, never before
+        [(time, items)] = self.walk(wheel).items()
+        self.assertEqual(items, ["item"])
+        self.assertGreaterEqual(time, now + 12.345 - 1e-6)
+        self.assertLess(time, now + 12.345 + wheel.tick)
+
+
+class CronExpressionTests(SimpleTestCase):
+    """Parsing of the five fields and the fire times they give"""
+
+    def at(self, *args):
+        return timezone.make_aware(datetime(*args))
+
+    def fires(self, expression, start, count):
+        """The next ``count`` fire times after ``start``"""
+        cron = CronExpression(expression)
+        times = []
+        for _ in range(count):
+            start = cron.next_after(start)
+            times.append(start)
+        return times
+
+    def test_ranges_steps_and_lists(self):
+        cron = CronExpression("1-3,10-50/20 */6 5/10 * *")
+        self.assertEqual(cron.minutes, {1, 2, 3, 10, 30, 50})
+        self.assertEqual(cron.hours, {0, 6, 12, 18})
+        self.assertEqual(cron.days, {5, 15, 25})
+        self.assertEqual(cron.months, set(range(1, 13)))
+
+    def test_names_and_sunday_as_seven(self):
+        cron = CronExpression("0 0 * JAN-mar,Dec sun,fri-7")
+        self.assertEqual(cron.months, {1, 2, 3, 12})
+        self.assertEqual(cron.weekdays, {0, 5, 6})
+
+    def test_macros(self):
+        self.assertEqual(
+            self.fires("@hourly", self.at(2025, 1, 1, 10, 30), 2),
+            [self.at(2025, 1, 1, 11, 0), self.at(2025, 1, 1, 12, 0)],
+        )
+        self.assertEqual(
+            self.fires("@Weekly", self.at(2025, 1, 1), 1), [self.at(2025, 1, 5)]
+        )
+
+    def test_restricted_day_fields_are_ored(self):
+        # The 13th of the month or any Friday; 2025-06-13 is itself a Friday
+        self.assertEqual(
+            self.fires("0 9 13 * fri", self.at(2025, 6, 1), 4),
+            [
+                self.at(2025, 6, 6, 9, 0),
+                self.at(2025, 6, 13, 9, 0),
+                self.at(2025, 6, 20, 9, 0),
+                self.at(2025, 6, 27, 9, 0),
+            ],
+        )
+        self.assertEqual(
+            self.fires("0 9 1 * mon", self.at(2025, 6, 24), 2),
+            [self.at(2025, 6, 30, 9, 0), self.at(2025, 7, 1, 9, 0)],
+        )
+
+    def test_a_star_day_field_leaves_the_other_one_alone(self):
+        # Only Mondays, whatever the day of the month
+        self.assertEqual(
+            self.fires("0 9 * * mon", self.at(2025, 6, 1), 2),
+            [self.at(2025, 6, 2, 9, 0), self.at(2025, 6, 9, 9, 0)],
+        )
+        # "*/2" counts as a star: Mondays on odd days only, not odd days or Mondays
+        self.assertEqual(
+            self.fires("0 9 */2 * mon", self.at(2025, 6, 1), 2),
+            [self.at(2025, 6, 9, 9, 0), self.at(2025, 6, 23, 9, 0)],
+        )
+
+    def test_invalid_expressions(self):
+        for expression in (
+            "",
+            "* * * *",
+            "* * * * * *",
+            "60 * * * *",
+            "* 24 * * *",
+            "* * 0 * *",
+            "* * * 13 *",
+            "* * * * 8",
+            "5-1 * * * *",
+            "*/0 * * * *",
+            "a * * * *",
+            "* * * foo *",
+            "-1 * * * *",
+        ):
+            with self.subTest(expression=expression):
+                with self.assertRaises(ValueError):
+                    CronExpression(expression)
+
+    def test_never_firing_expression(self):
+        with self.assertRaisesMessage(ValueError, "never fires"):
+            CronExpression("0 0 30 2 *").next_after(self.at(2025, 1, 1))
+
+    def test_next_fire_is_strictly_after(self):
+        cron = CronExpression("30 12 * * *")
+        self.assertEqual(
+            cron.next_after(self.at(2025, 3, 4, 12, 30)), self.at(2025, 3, 5, 12, 30)
+        )
+        self.assertEqual(
+            cron.next_after(self.at(2025, 3, 4, 12, 29, 59)),
+            self.at(2025, 3, 4, 12, 30),
+        )
+
+    def test_next_fire_across_month_and_year_boundaries(self):
+        self.assertEqual(
+            self.fires("0 0 31 * *", self.at(2025, 1, 31, 0, 0), 3),
+            [self.at(2025, 3, 31), self.at(2025, 5, 31), self.at(2025, 7, 31)],
+        )
+        self.assertEqual(
+            self.fires("59 23 * * *", self.at(2025, 12, 31, 23, 59), 1),
+            [self.at(2026, 1, 1, 23, 59)],
+        )
+        self.assertEqual(
+            self.fires("0 0 1 jan *", self.at(2025, 6, 1), 2),
+            [self.at(2026, 1, 1), self.at(2027, 1, 1)],
+        )
+        # Leap days only
+        self.assertEqual(
+            self.fires("0 0 29 2 *", self.at(2025, 1, 1), 2),
+            [self.at(2028, 2, 29), self.at(2032, 2, 29)],
+        )
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+)
+class DependencyTests(TestCase):
+    """Jobs that wait for others: counting, release and failure"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="dependency-user")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def job(self, name, parents=(), **fields):
+        job = Job.objects.create(
+            user=self.user,
+            name=name,
+            estimated_duration=1,
+            deadline=timezone.now() + timedelta(hours=1),
+            remaining_dependencies=sum(
+                1 for parent in parents if parent.status != "completed"
+            ),
+            **fields,
+        )
+        job.dependencies.set(parents)
+        return job
+
+    def finish(self, job, success):
+        """Run ``job`` to the end through the completion buffer"""
+        Job.objects.filter(id=job.id).update(status="running", worker_id="worker")
+        job.refresh_from_db()
+        CompletionBuffer("worker", batch_size=1).record(
+            job, timezone.now(), success, None if success else "boom"
+        )
+
+    def post(self, name, parents):
+        return self.client.post(
+            reverse("jobs:api-job-list"),
+            {
+                "name": name,
+                "estimated_duration": 1,
+                "priority": 2,
+                "deadline": (timezone.now() + timedelta(hours=1)).isoformat(),
+                "depends_on": [str(parent.id) for parent in parents],
+            },
+            format="json",
+        )
+
+    def test_remaining_dependencies_counts_unfinished_parents_on_create(self):
+        done = self.job("done", status="completed")
+        running = self.job("running", status="running")
+        waiting = self.job("waiting")
+
+        response = self.post("child", [done, running, waiting])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data["remaining_dependencies"], 2)
+
+        child = Job.objects.get(id=response.data["id"])
+        self.assertEqual(child.remaining_dependencies, 2)
+        self.assertEqual(set(child.dependencies.all()), {done, running, waiting})
+
+    def test_failed_parent_is_refused_on_create(self):
+        failed = self.job("failed", status="failed")
+        response = self.post("child", [failed])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("depends_on", response.data)
+        self.assertFalse(Job.objects.filter(name="child").exists())
+
+    def test_dependencies_cannot_change_on_update(self):
+        first = self.job("first")
+        second = self.job("second")
+        child = self.job("child", [first])
+        url = reverse("jobs:api-job-detail", args=[child.id])
+
+        response = self.client.patch(
+            url, {"depends_on": [str(second.id)]}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("depends_on", response.data)
+        self.assertEqual(list(child.dependencies.all()), [first])
+
+        # Sending the same dependencies back is fine
+        response = self.client.patch(
+            url, {"name": "renamed", "depends_on": [str(first.id)]}, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        child.refresh_from_db()
+        self.assertEqual(child.name, "renamed")
+        self.assertEqual(child.remaining_dependencies, 1)
+
+    def test_child_is_released_when_its_last_parent_completes(self):
+        first = self.job("first")
+        second = self.job("second")
+        child = self.job("child", [first, second])
+        self.assertEqual(child.remaining_dependencies, 2)
+
+        self.finish(first, success=True)
+        child.refresh_from_db()
+        self.assertEqual(child.remaining_dependencies, 1)
+        self.assertEqual(child.status, "pending")
+
+        self.finish(second, success=True)
+        child.refresh_from_db()
+        self.assertEqual(child.remaining_dependencies, 0)
+        self.assertEqual(child.status, "pending")
+
+    def test_start_latency_counts_from_release(self):
+        parent = self.job("parent")
+        child = self.job("child", [parent])
+        Job.objects.filter(id=child.id).update(
+            created_at=timezone.now() - timedelta(hours=1)
+        )
+        self.finish(parent, success=True)
+
+        observed = metrics.START_LATENCY_SECONDS._sum
+        [claimed] = JobScheduler()._claim_job_ids([child.id])
+        self.assertEqual(claimed.id, child.id)
+        # Seconds since the release, not the hour since submission
+        self.assertLess(metrics.START_LATENCY_SECONDS._sum - observed, 60)
+        self.assertGreaterEqual(metrics.START_LATENCY_SECONDS._sum - observed, 0)
+
+    def test_failure_cascades_to_every_pending_descendant(self):
+        parent = self.job("parent")
+        other = self.job("other")
+        child = self.job("child", [parent, other])
+        grandchild = self.job("grandchild", [child])
+        unrelated = self.job("unrelated", [other])
+
+        with self.assertLogs("jobs.write_behind", "ERROR"):
+            self.finish(parent, success=False)
+
+        for job in (parent, child, grandchild):
+            job.refresh_from_db()
+            self.assertEqual(job.status, "failed", job.name)
+            self.assertIsNotNone(job.completed_at)
+        for job in (child, grandchild):
+            self.assertTrue(
+                JobLog.objects.filter(job=job, log_type=JobLog.ERROR).exists()
+            )
+
+        unrelated.refresh_from_db()
+        self.assertEqual(unrelated.status, "pending")
+        self.assertEqual(unrelated.remaining_dependencies, 1)
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+)
+class CounterTests(TestCase):
+    """UserJobCounters stay equal to a fresh count through every transition"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="counter-user")
+
+    def job(self, name, parents=(), priority=2):
+        job = Job.objects.create(
+            user=self.user,
+            name=name,
+            estimated_duration=1,
+            priority=priority,
+            deadline=timezone.now() + timedelta(hours=1),
+            remaining_dependencies=len(parents),
+        )
+        job.dependencies.set(parents)
+        return job
+
+    def stored(self):
+        return counters.stored_counts(UserJobCounters.objects.get(user=self.user))
+
+    def test_transitions_leave_no_drift(self):
+        jobs = [self.job(f"job-{i}", priority=(1, 2, 3)[i % 3]) for i in range(6)]
+        child = self.job("child", [jobs[0]])
+        self.job("grandchild", [child])
+        self.assertEqual(self.stored()["pending"], 8)
+
+        scheduler = JobScheduler()
+        claimed = scheduler._claim_job_ids([job.id for job in jobs])
+        self.assertEqual(len(claimed), 6)
+        self.assertEqual(counters.rebuild(dry_run=True), {})
+
+        buffer = CompletionBuffer(scheduler.worker_id, batch_size=1)
+        with self.assertLogs("jobs.write_behind", "ERROR"):
+            for job in claimed:
+                # The child and grandchild fail along with jobs[0]
+                buffer.record(job, job.started_at, job.id != jobs[0].id, "boom")
+        self.assertEqual(counters.rebuild(dry_run=True), {})
+
+        stored = self.stored()
+        self.assertEqual(stored["completed"], 5)
+        self.assertEqual(stored["failed"], 3)
+        self.assertEqual(stored["timed_jobs"], 5)
+
+        Job.objects.filter(status="failed").delete()
+        jobs[1].delete()
+        self.assertEqual(counters.rebuild(dry_run=True), {})
+        self.assertEqual(self.stored()["completed"], 4)
+
+    def test_rebuild_reports_and_repairs_drift(self):
+        self.job("first")
+        self.job("second", priority=3)
+        UserJobCounters.objects.filter(user=self.user).update(pending=5)
+
+        drift = counters.rebuild(dry_run=True)
+        self.assertEqual(drift, {self.user.id: {"pending": (5, 2)}})
+        self.assertEqual(self.stored()["pending"], 5)
+
+        self.assertEqual(counters.rebuild(), drift)
+        self.assertEqual(self.stored()["pending"], 2)
+        self.assertEqual(counters.rebuild(dry_run=True), {})
+
+    def test_rebuild_creates_missing_counters(self):
+        self.job("first")
+        UserJobCounters.objects.filter(user=self.user).delete()
+
+        drift = counters.rebuild()
+        self.assertIsNone(drift[self.user.id]["pending"][0])
+        self.assertEqual(self.stored()["pending"], 1)
+
+    def test_counters_created_concurrently_keep_both_changes(self):
+        # A job inserted without counting it, as by bulk_create()
+        now = timezone.now()
+        job = Job(
+            user=self.user,
+            name="bulk",
+            estimated_duration=1,
+            priority=2,
+            deadline=now + timedelta(hours=1),
+            latest_start_at=now + timedelta(minutes=59),
+        )
+        Job.objects.bulk_create([job])
+        UserJobCounters.objects.filter(user=self.user).delete()
+        deltas = {}
+        counters.add(deltas, counters.job_state(job))
+
+        # Nobody else: the count already includes the job
+        counters.create_counters([self.user.id], deltas)
+        self.assertEqual(self.stored()["pending"], 1)
+
+        # Another transaction inserted the row first, counting without the job
+        UserJobCounters.objects.filter(user=self.user).update(
+            pending=0, priority_counts={}
+        )
+        counters.create_counters([self.user.id], deltas)
+        self.assertEqual(self.stored()["pending"], 1)
+        self.assertEqual(self.stored()[counters.priority_field(2)], 1)
+        self.assertEqual(counters.rebuild(dry_run=True), {})
+
+
+class QuantileSketchTests(SimpleTestCase):
+    """Quantile estimates stay within the sketch's relative error bound"""
+
+    QUANTILES = (0, 0.01, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999, 1)
+
+    def values(self, count=20000, seed=0):
+        # Long-tailed, like wait times: mostly seconds, some hours
+        rng = random.Random(seed)
+        return [rng.lognormvariate(1.0, 2.0) + 0.01 for _ in range(count)]
+
+    def sketch(self, values, **kwargs):
+        sketch = QuantileSketch(**kwargs)
+        for value in values:
+            sketch.add(value)
+        return sketch
+
+    def assertWithinBound(self, sketch, values):
+        ordered = sorted(values)
+        for q in self.QUANTILES:
+            # The sketch's rank convention: the value at index q * (n - 1)
+            exact = ordered[math.floor(q * (len(ordered) - 1))]
+            with self.subTest(q=q):
+                self.assertLessEqual(
+                    abs(sketch.quantile(q) - exact),
+                    sketch.relative_accuracy * exact * (1 + 1e-9),
+                )
+
+    def test_relative_error_bound(self):
+        values = self.values()
+        for accuracy in (0.01, 0.05):
+            with self.subTest(accuracy=accuracy):
+                sketch = self.sketch(values, relative_accuracy=accuracy)
+                self.assertEqual(sketch.count, len(values))
+                self.assertAlmostEqual(sketch.total, sum(values), places=6)
+                self.assertWithinBound(sketch, values)
+
+    def test_empty_sketch(self):
+        sketch = QuantileSketch()
+        self.assertEqual(sketch.count, 0)
+        self.assertIsNone(sketch.quantile(0.5))
+        self.assertEqual(set(percentiles(sketch).values()), {None})
+
+    def test_single_value(self):
+        for value in (0.5, 42.0, 86400.0):
+            with self.subTest(value=value):
+                self.assertWithinBound(self.sketch([value]), [value])
+
+    def test_values_up_to_min_value_share_the_lowest_bin(self):
+        sketch = self.sketch([0.0, 0.0005, 0.001, 10.0])
+        self.assertEqual(len(sketch.bins), 2)
+        self.assertEqual(sketch.quantile(0), sketch.min_value)
+        self.assertEqual(sketch.quantile(0.5), sketch.min_value)
+        self.assertAlmostEqual(sketch.quantile(1), 10.0, delta=0.1)
+
+    def test_merge_is_exact(self):
+        values = self.values()
+        whole = self.sketch(values)
+        merged = self.sketch(values[:5000])
+        merged.merge(self.sketch(values[5000:]))
+        merged.merge(QuantileSketch())
+
+        self.assertEqual(merged.bins, whole.bins)
+        self.assertEqual(merged.count, whole.count)
+        self.assertAlmostEqual(merged.total, whole.total, places=6)
+        for q in self.QUANTILES:
+            self.assertEqual(merged.quantile(q), whole.quantile(q))
+
+    def test_merge_into_empty_sketch(self):
+        values = self.values(count=100)
+        merged = QuantileSketch()
+        merged.merge(self.sketch(values))
+        self.assertWithinBound(merged, values)
+
+    def test_collapsing_keeps_the_high_quantiles(self):
+        values = self.values()
+        self.assertGreater(len(self.sketch(values).bins), 256)
+        sketch = self.sketch(values, max_bins=256)
+        self.assertEqual(len(sketch.bins), 256)
+        self.assertEqual(sketch.count, len(values))
+
+        # The top 256 bins span values within a factor of gamma ** 256 (about
+        # 160) of the largest, which takes in the 99th percentile
+        ordered = sorted(values)
+        for q in (0.99, 0.999, 1):
+            exact = ordered[math.floor(q * (len(ordered) - 1))]
+            with self.subTest(q=q):
+                self.assertLessEqual(
+                    abs(sketch.quantile(q) - exact), 0.01 * exact * (1 + 1e-9)
+                )
+
+    def test_bins_loaded_from_json(self):
+        values = self.values(count=100)
+        sketch = self.sketch(values)
+        # JSONField gives the bin indexes back as strings
+        loaded = QuantileSketch(bins={str(k): v for k, v in sketch.bins.items()})
+        self.assertEqual(loaded.bins, sketch.bins)
+        self.assertEqual(loaded.count, 100)
+        self.assertEqual(loaded.quantile(0.9), sketch.quantile(0.9))
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+)
+class KeysetPaginationTests(TestCase):
+    """
+    Walking the pages either way visits every row once, in order, whatever
+    ties and NULLs the sort column holds
+    """
+
+    PAGE_SIZE = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="pagination-user")
+        now = timezone.now()
+        jobs = []
+        for i in range(40):
+            deadline = now + timedelta(minutes=i % 5)
+            jobs.append(
+                Job(
+                    user=cls.user,
+                    name=f"job-{i}",
+                    estimated_duration=1,
+                    # Three levels for 40 jobs: long runs of ties
+                    priority=(1, 2, 3)[i % 3],
+                    deadline=deadline,
+                    latest_start_at=deadline - timedelta(seconds=1),
+                    # NULL for a third of the jobs
+                    started_at=now - timedelta(seconds=i % 4) if i % 3 else None,
+                )
+            )
+        Job.objects.bulk_create(jobs)
+        cls.jobs = Job.objects.filter(user=cls.user)
+
+    def expected(self, ordering):
+        """Ids in ``ordering``, then by id, with NULLs after every value"""
+        name = ordering.lstrip("-")
+        descending = ordering.startswith("-")
+        jobs = list(self.jobs)
+        present = sorted(
+            (job for job in jobs if getattr(job, name) is not None),
+            key=lambda job: (getattr(job, name), job.id),
+            reverse=descending,
+        )
+        null = sorted(
+            (job for job in jobs if getattr(job, name) is None),
+            key=lambda job: job.id,
+            reverse=descending,
+        )
+        return [job.id for job in (null + present if descending else present + null)]
+
+    def walk_forward(self, ordering):
+        pages = []
+        cursor = None
+        while True:
+            page = keyset_page(self.jobs, ordering, cursor, self.PAGE_SIZE)
+            pages.append([job.id for job in page.items])
+            self.assertEqual(page.previous_cursor is None, cursor is None)
+            if page.next_cursor is None:
+                return pages, page
+            cursor = page.next_cursor
+
+    def test_walk_forward_and_back(self):
+        for ordering in ("-created_at", "deadline", "priority", "-priority", "pk"):
+            with self.subTest(ordering=ordering):
+                pages, last = self.walk_forward(ordering)
+                ids = [job_id for page in pages for job_id in page]
+                self.assertEqual(ids, self.expected(ordering))
+                self.assertEqual([len(page) for page in pages[:-1]], [7] * 5)
+
+                # Back from the last page, through the same pages
+                back = []
+                cursor = last.previous_cursor
+                while cursor is not None:
+                    page = keyset_page(self.jobs, ordering, cursor, self.PAGE_SIZE)
+                    back.append([job.id for job in page.items])
+                    self.assertIsNotNone(page.next_cursor)
+                    cursor = page.previous_cursor
+                self.assertEqual(back, pages[-2::-1])
+
+    def test_null_sort_keys(self):
+        for ordering in ("started_at", "-started_at", "run_at"):
+            with self.subTest(ordering=ordering):
+                pages, last = self.walk_forward(ordering)
+                ids = [job_id for page in pages for job_id in page]
+                self.assertEqual(ids, self.expected(ordering))
+
+                # Back from a page that starts among the NULLs
+                page = keyset_page(
+                    self.jobs, ordering, last.previous_cursor, self.PAGE_SIZE
+                )
+                self.assertEqual([job.id for job in page.items], pages[-2])
+                page = keyset_page(
+                    self.jobs, ordering, page.previous_cursor, self.PAGE_SIZE
+                )
+                self.assertEqual([job.id for job in page.items], pages[-3])
+
+    def test_rows_added_behind_the_cursor_are_not_repeated(self):
+        ordering = "-created_at"
+        first = keyset_page(self.jobs, ordering, page_size=self.PAGE_SIZE)
+        Job.objects.create(
+            user=self.user,
+            name="newer",
+            estimated_duration=1,
+            deadline=timezone.now() + timedelta(hours=1),
+        )
+        second = keyset_page(self.jobs, ordering, first.next_cursor, self.PAGE_SIZE)
+        self.assertEqual(
+            [job.id for job in first.items + second.items],
+            self.expected(ordering)[1 : 2 * self.PAGE_SIZE + 1],
+        )
+
+    def test_empty_queryset(self):
+        page = keyset_page(Job.objects.none(), "-created_at")
+        self.assertEqual(page, ([], None, None))
+
+    def test_invalid_cursors(self):
+        cursor = keyset_page(self.jobs, "priority", page_size=5).next_cursor
+        for ordering, bad in (
+            ("-priority", cursor),
+            ("priority", "not a cursor"),
+            ("priority", cursor[:-4]),
+        ):
+            with self.subTest(ordering=ordering, cursor=bad):
+                with self.assertRaises(InvalidCursor):
+                    keyset_page(self.jobs, ordering, bad)
+        with self.assertRaises(InvalidCursor):
+            keyset_page(self.jobs, "no_such_field")
+
+    def test_api_pages(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse("jobs:api-job-list")
+
+        ids = []
+        response = client.get(url, {"ordering": "priority", "page_size": 9})
+        self.assertIsNone(response.data["previous"])
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row["id"] for row in response.data["results"])
+            if response.data["next"] is None:
+                break
+            response = client.get(response.data["next"])
+        self.assertEqual(ids, [str(job_id) for job_id in self.expected("priority")])
+
+        self.assertEqual(client.get(url, {"cursor": "garbage"}).status_code, 404)
+
+
+class MetricsAccessTests(TestCase):
+    """Metrics are only served to staff and to scrapers with the token"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="metrics-user")
+        cls.staff = User.objects.create(username="metrics-staff", is_staff=True)
+
+    def test_metrics_view(self):
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+
+    @override_settings(SCHEDULER_METRICS_TOKEN="s3cret")
+    def test_metrics_view_with_token(self):
+        url = reverse("metrics")
+        for authorization, status in (
+            ("Bearer s3cret", 200),
+            ("bearer s3cret", 200),
+            ("Bearer wrong", 401),
+            ("Basic s3cret", 401),
+            ("s3cret", 401),
+        ):
+            with self.subTest(authorization=authorization):
+                response = self.client.get(url, HTTP_AUTHORIZATION=authorization)
+                self.assertEqual(response.status_code, status)
+
+    def fetch(self, server, path, authorization=None):
+        """Status of a GET to the standalone metrics server"""
+        port = server.server_address[1]
+        request = urllib.request.Request(f"http://127.0.0.1:{port}{path}")
+        if authorization:
+            request.add_header("Authorization", authorization)
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def serve(self):
+        server = metrics.serve(0, None, address="127.0.0.1")
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_server_only_answers_metrics(self):
+        server = self.serve()
+        self.assertEqual(self.fetch(server, "/metrics"), 200)
+        self.assertEqual(self.fetch(server, "/metrics?format=text"), 200)
+        for path in ("/", "/admin/", "/metrics/extra", "/jobs/api/jobs/"):
+            with self.subTest(path=path):
+                self.assertEqual(self.fetch(server, path), 404)
+
+    @override_settings(SCHEDULER_METRICS_TOKEN="s3cret")
+    def test_server_with_token(self):
+        server = self.serve()
+        self.assertEqual(self.fetch(server, "/metrics"), 401)
+        self.assertEqual(self.fetch(server, "/metrics", "Bearer wrong"), 401)
+        self.assertEqual(self.fetch(server, "/metrics", "Bearer s3cret"), 200)
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    SCHEDULER_WORKERS=2,
+    SCHEDULER_AUTOSCALE=False,
+)
+class BulkDeadlineCheckTests(TestCase):
+    """Bulk submissions get the deadline check single jobs get"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="bulk-deadline-user")
+        now = timezone.now()
+        rng = random.Random(0)
+        for i in range(40):
+            Job.objects.create(
+                user=cls.user,
+                name=f"backlog-{i}",
+                estimated_duration=rng.randint(10, 600),
+                priority=rng.choice((1, 2, 3)),
+                deadline=now + timedelta(seconds=rng.randint(60, 7200)),
+                # Delayed jobs can't take a worker yet
+                run_at=now + timedelta(hours=1) if i % 10 == 0 else None,
+            )
+        Job.objects.filter(name__in=["backlog-1", "backlog-2"]).update(
+            status="running", started_at=now - timedelta(seconds=30)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def candidate(self, priority, seconds, duration=60):
+        deadline = timezone.now() + timedelta(seconds=seconds)
+        return Job(
+            user=self.user,
+            name="candidate",
+            estimated_duration=duration,
+            priority=priority,
+            deadline=deadline,
+            latest_start_at=Job.compute_latest_start(deadline, duration),
+        )
+
+    def test_backlog_matches_the_per_job_queries(self):
+        now = timezone.now()
+        candidates = [
+            self.candidate(priority, seconds)
+            for priority in (1, 2, 3)
+            for seconds in (100, 1800, 5000)
+        ]
+        for policy in ("priority", "laxity"):
+            backlog = feasibility.Backlog(policy=policy, now=now)
+            for job in candidates:
+                with self.subTest(policy=policy, job=(job.priority, job.deadline)):
+                    self.assertAlmostEqual(
+                        backlog.work_ahead(job),
+                        feasibility.work_ahead(job, policy, now),
+                    )
+
+    def test_new_jobs_queue_ahead_of_one_another(self):
+        now = timezone.now()
+        first = self.candidate(3, 100, duration=500)
+        second = self.candidate(3, 200, duration=700)
+        backlog = feasibility.Backlog([first, second], policy="priority", now=now)
+        alone = feasibility.Backlog(policy="priority", now=now)
+        self.assertAlmostEqual(backlog.work_ahead(first), alone.work_ahead(first))
+        self.assertAlmostEqual(
+            backlog.work_ahead(second), alone.work_ahead(second) + 500
+        )
+
+    def post(self, *seconds):
+        return self.client.post(
+            reverse("jobs:api-job-bulk"),
+            [
+                {
+                    "name": f"bulk-{i}",
+                    "estimated_duration": 60,
+                    "priority": 1,
+                    "deadline": (timezone.now() + timedelta(seconds=s)).isoformat(),
+                }
+                for i, s in enumerate(seconds)
+            ],
+            format="json",
+        )
+
+    @override_settings(SCHEDULER_DEADLINE_CHECK="reject")
+    def test_reject(self):
+        response = self.post(36000, 30, 36000, 90)
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertEqual(set(response.data["rows"]), {1, 3})
+        self.assertIn("deadline", response.data["rows"][1])
+        self.assertFalse(Job.objects.filter(name__startswith="bulk-").exists())
+
+        response = self.post(36000, 36000)
+        self.assertEqual(response.status_code, 201, response.content)
+
+    @override_settings(SCHEDULER_DEADLINE_CHECK="warn")
+    def test_warn(self):
+        response = self.post(36000, 30)
+        self.assertEqual(response.status_code, 201, response.content)
+        warned = JobLog.objects.filter(
+            job__name__startswith="bulk-", log_type=JobLog.WARNING
+        )
+        self.assertEqual([log.job.name for log in warned], ["bulk-1"])
+
+    @override_settings(SCHEDULER_DEADLINE_CHECK="off")
+    def test_off(self):
+        response = self.post(30)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertFalse(JobLog.objects.filter(job__name="bulk-0").exists())
+
+
+class AutoscalingMetricsTests(TestCase):
+    """The autoscaler's decisions are exported with the pool gauges"""
+
+    def test_scaling_decisions_are_rendered(self):
+        scheduler = JobScheduler()
+        scheduler.configure(autoscale=True, min_workers=1, max_workers=8)
+        autoscaler = scheduler.autoscaler
+        autoscaler.cooldown = 0
+        size = autoscaler.evaluate(1, busy=1, queue_depth=10, urgent_jobs=0)
+        size = autoscaler.evaluate(size, busy=2, queue_depth=10, urgent_jobs=0)
+        size = autoscaler.evaluate(size, busy=0, queue_depth=0, urgent_jobs=0)
+        self.assertEqual((autoscaler.scale_ups, autoscaler.scale_downs), (2, 1))
+
+        # Only a running scheduler's pool is reported
+        self.assertNotIn("scaling", metrics.render(scheduler))
+        scheduler._running = True
+        try:
+            text = metrics.render(scheduler)
+        finally:
+            scheduler._running = False
+
+        self.assertIn("# TYPE job_scheduler_pool_scaling_total counter", text)
+        self.assertIn('job_scheduler_pool_scaling_total{direction="up"} 2', text)
+        self.assertIn('job_scheduler_pool_scaling_total{direction="down"} 1', text)
+        self.assertIn(
+            'job_scheduler_pool_scaling_reasons_total{reason="queue depth"} 2', text
+        )
+        self.assertIn(
+            'job_scheduler_pool_scaling_reasons_total{reason="low utilization"} 1',
+            text,
+        )
+        self.assertIn("job_scheduler_pool_max_workers 8", text)
+        self.assertIn(
+            'job_scheduler_pool_last_scaling_timestamp_seconds{reason="low utilization"}',
+            text,
+        )
+        self.assertIn("job_scheduler_pool_last_scaling_previous_size 4", text)
+
+
+class PriorityAgingTests(SimpleTestCase):
+    """Aged ready queue keys, one level per minute spent runnable"""
+
+    AGING = 60
+
+    # A whole number of aging periods, so level boundaries fall on the minute
+    START = timezone.make_aware(datetime(2026, 1, 1))
+
+    def queue(self):
+        queue = ReadyQueue()
+        queue.priority_aging = self.AGING
+        return queue
+
+    def key(self, queue, priority, ready_after):
+        """Key of a job that became runnable ``ready_after`` seconds in"""
+        ready_at = self.START + timedelta(seconds=ready_after)
+        deadline = ready_at + timedelta(hours=1)
+        return queue.sort_key(priority, deadline, ready_at, deadline, ready_at)
+
+    def test_low_priority_job_overtakes_newer_high_priority_jobs(self):
+        queue = self.queue()
+        queue.push("low", self.key(queue, 1, 0))
+
+        # Two levels apart, high-priority jobs stay ahead until they became
+        # runnable two aging periods after the low-priority job...
+        for ready_after in (0, 30, 119):
+            queue.push("high", self.key(queue, 3, ready_after))
+            self.assertEqual(queue.pop_many(2), ["high", "low"])
+            queue.push("low", self.key(queue, 1, 0))
+
+        # ...when the two rank level and the earlier deadline goes first...
+        queue.push("high", self.key(queue, 3, 120))
+        self.assertEqual(queue.pop_many(2), ["low", "high"])
+
+        # ...and from then on the low-priority job runs first however many
+        # high-priority jobs keep arriving
+        queue.push("low", self.key(queue, 1, 0))
+        for i in range(50):
+            queue.push(f"high-{i}", self.key(queue, 3, 180 + i))
+        self.assertEqual(queue.pop(), "low")
+
+    def test_without_aging_priority_is_strict(self):
+        queue = ReadyQueue()
+        queue.push("low", self.key(queue, 1, 0))
+        queue.push("high", self.key(queue, 3, 10**6))
+        self.assertEqual(queue.pop_many(2), ["high", "low"])
+
+    def test_keys_stay_valid_while_jobs_wait(self):
+        rng = random.Random(0)
+        queue = self.queue()
+        jobs = {
+            f"job-{i}": (rng.choice((1, 2, 3)), rng.uniform(0, 600)) for i in range(200)
+        }
+        keys = {
+            job_id: self.key(queue, priority, ready_after)
+            for job_id, (priority, ready_after) in jobs.items()
+        }
+        for job_id, key in keys.items():
+            queue.push(job_id, key)
+
+        # Whenever the jobs are ranked, by the priority each has aged to by
+        # then, the order is the one the keys fixed when they were pushed
+        for now in (600, 601, 659, 660, 3600, 86400):
+
+            def aged_order(job_id):
+                priority, ready_after = jobs[job_id]
+                levels = now // self.AGING - math.floor(ready_after / self.AGING)
+                return -(priority + levels), keys[job_id][1:]
+
+            expected = sorted(jobs, key=aged_order)
+            self.assertEqual(sorted(jobs, key=keys.get), expected)
+
+        # Nor do the queued keys change as jobs around them come and go
+        for job_id in queue.pop_many(50):
+            del keys[job_id]
+        queue.push("late", self.key(queue, 3, 3600))
+        for job_id, key in keys.items():
+            self.assertEqual(queue._entries[job_id][queue._KEY], key)
+        self.assertEqual(queue.pop_many(len(keys)), sorted(keys, key=keys.get))
+
+
+class ReadyQueueTests(SimpleTestCase):
+    """Dispatch order and bookkeeping of the in-memory ready queue"""
+
+    def key(self, queue, priority, deadline, created_at=0):
+        """Key of a job, with times in minutes from an arbitrary start"""
+        start = timezone.make_aware(datetime(2026, 1, 1))
+        deadline = start + timedelta(minutes=deadline)
+        created_at = start + timedelta(minutes=created_at)
+        return queue.sort_key(priority, deadline, created_at, deadline)
+
+    def test_priority_then_deadline_then_submission(self):
+        queue = ReadyQueue()
+        jobs = [
+            ("low-early", 1, 5, 0),
+            ("high-late", 3, 60, 0),
+            ("medium", 2, 10, 0),
+            ("high-early-newer", 3, 30, 2),
+            ("high-early", 3, 30, 1),
+        ]
+        for job_id, *fields in jobs:
+            queue.push(job_id, self.key(queue, *fields))
+
+        self.assertEqual(len(queue), 5)
+        self.assertEqual(
+            queue.pop_many(10),
+            ["high-early", "high-early-newer", "high-late", "medium", "low-early"],
+        )
+        self.assertEqual(len(queue), 0)
+        self.assertIsNone(queue.pop())
+
+    def test_push_again_moves_and_remove_drops(self):
+        queue = ReadyQueue()
+        queue.push("a", self.key(queue, 2, 10))
+        queue.push("b", self.key(queue, 2, 20))
+        queue.push("c", self.key(queue, 2, 30))
+
+        queue.push("c", self.key(queue, 3, 30))
+        queue.remove("a")
+        queue.remove("missing")
+        self.assertNotIn("a", queue)
+        self.assertEqual(queue.pop_many(10), ["c", "b"])
+
+    def test_partitions_can_be_skipped(self):
+        queue = ReadyQueue()
+        queue.push("gpu", self.key(queue, 3, 10), partition="gpu")
+        queue.push("default", self.key(queue, 1, 10))
+
+        self.assertEqual(
+            queue.pop_with_partition(exclude={"gpu"}), ("default", "default")
+        )
+        self.assertIsNone(queue.pop(exclude={"gpu"}))
+        self.assertEqual(queue.pop_with_partition(), ("gpu", "gpu"))
+
+    def test_rebuild_matches_pushes(self):
+        rng = random.Random(0)
+        queue = ReadyQueue()
+        items = []
+        for i in range(300):
+            key = self.key(queue, rng.choice((1, 2, 3)), rng.randrange(100), i)
+            items.append((i, key, ("default", "gpu", "io")[i % 3], None))
+
+        pushed = ReadyQueue()
+        for item in items:
+            pushed.push(*item)
+        queue.rebuild(items)
+
+        expected = [job_id for job_id, key, _, _ in sorted(items, key=lambda i: i[1])]
+        self.assertEqual(queue.pop_many(300), expected)
+        self.assertEqual(pushed.pop_many(300), expected)
+
+    def test_removed_entries_do_not_accumulate(self):
+        queue = ReadyQueue()
+        for i in range(1000):
+            queue.push(i, self.key(queue, 2, i))
+        for i in range(990):
+            queue.remove(i)
+        for i in range(990, 1000):
+            queue.push(i, self.key(queue, 1, i))
+
+        heap_size = sum(len(heap) for heap in queue._heaps.values())
+        self.assertLessEqual(heap_size, 2 * len(queue) + 64)
+        self.assertEqual(queue.pop_many(20), list(range(990, 1000)))
+
+
+class FairShareQueueTests(SimpleTestCase):
+    """Workers shared between users by weight, with per-user caps"""
+
+    def key(self, queue, priority=2, deadline=60, created_at=0):
+        start = timezone.make_aware(datetime(2026, 1, 1))
+        deadline = start + timedelta(minutes=deadline)
+        created_at = start + timedelta(minutes=created_at)
+        return queue.sort_key(priority, deadline, created_at, deadline)
+
+    def fill(self, queue, user_id, count):
+        for i in range(count):
+            queue.push(f"{user_id}-{i}", self.key(queue, created_at=i), user_id=user_id)
+
+    def dispatch(self, queue, count):
+        """Users of the next ``count`` jobs, finishing each as it starts"""
+        users = []
+        for job_id in queue.pop_many(count):
+            users.append(job_id.split("-")[0])
+            queue.job_finished(job_id)
+        return users
+
+    def test_equal_weights_alternate(self):
+        queue = FairShareQueue()
+        self.fill(queue, "alice", 100)
+        self.fill(queue, "bob", 5)
+        self.assertEqual(self.dispatch(queue, 10), ["alice", "bob"] * 5)
+        self.assertEqual(self.dispatch(queue, 5), ["alice"] * 5)
+
+    def test_workers_follow_the_weights(self):
+        queue = FairShareQueue()
+        queue.set_shares({"alice": (3, None), "bob": (1, None)})
+        self.fill(queue, "alice", 400)
+        self.fill(queue, "bob", 400)
+
+        users = collections.Counter(self.dispatch(queue, 400))
+        self.assertEqual(users, {"alice": 300, "bob": 100})
+
+    def test_each_user_runs_their_best_job_first(self):
+        queue = FairShareQueue()
+        queue.push("alice-low", self.key(queue, priority=1), user_id="alice")
+        queue.push("alice-high", self.key(queue, priority=3), user_id="alice")
+        queue.push("alice-medium", self.key(queue, priority=2), user_id="alice")
+        self.assertEqual(queue.pop_many(3), ["alice-high", "alice-medium", "alice-low"])
+
+    def test_capped_users_wait_for_a_job_to_finish(self):
+        queue = FairShareQueue()
+        queue.set_shares({"alice": (None, 2)})
+        self.fill(queue, "alice", 10)
+        self.fill(queue, "bob", 10)
+
+        running = queue.pop_many(6)
+        self.assertEqual([job_id.split("-")[0] for job_id in running].count("alice"), 2)
+        self.assertEqual(running[-2:], ["bob-2", "bob-3"])
+
+        queue.job_finished("alice-0")
+        self.assertEqual(queue.pop(), "alice-2")
+        self.assertEqual(queue.pop(), "bob-4")
+
+    def test_default_cap(self):
+        queue = FairShareQueue(default_max_jobs=1)
+        queue.set_shares({"bob": (None, 3)})
+        self.fill(queue, "alice", 5)
+        self.fill(queue, "bob", 5)
+        users = [job_id.split("-")[0] for job_id in queue.pop_many(10)]
+        self.assertEqual(sorted(users), ["alice", "bob", "bob", "bob"])
+
+    def test_returning_users_get_no_saved_credit(self):
+        queue = FairShareQueue()
+        self.fill(queue, "alice", 100)
+        self.dispatch(queue, 50)
+
+        # Bob had nothing pending while alice ran, so bob starts level with
+        # alice instead of taking the next 50 workers
+        self.fill(queue, "bob", 100)
+        self.assertEqual(self.dispatch(queue, 10), ["bob", "alice"] * 5)
+
+    def test_rebuild_keeps_the_shares(self):
+        queue = FairShareQueue()
+        queue.set_shares({"alice": (1, None), "bob": (2, None)})
+        items = [
+            (f"{user_id}-{i}", self.key(queue, created_at=i), "default", user_id)
+            for user_id in ("alice", "bob")
+            for i in range(30)
+        ]
+        queue.rebuild(items)
+        self.assertEqual(len(queue), 60)
+
+        users = collections.Counter(self.dispatch(queue, 30))
+        self.assertEqual(users, {"alice": 10, "bob": 20})
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    SCHEDULER_MAX_ATTEMPTS=2,
+)
+class LeaseReapingTests(TestCase):
+    """Running jobs whose scheduler died are requeued, then failed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="lease-user")
+
+    def job(self, name, parents=()):
+        job = Job.objects.create(
+            user=self.user,
+            name=name,
+            estimated_duration=1,
+            deadline=timezone.now() + timedelta(hours=1),
+            remaining_dependencies=len(parents),
+        )
+        job.dependencies.set(parents)
+        return job
+
+    def claim_and_die(self, job):
+        """Claim ``job`` with a scheduler that then stops renewing its lease"""
+        [claimed] = JobScheduler()._claim_job_ids([job.id])
+        Job.objects.filter(id=job.id).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        return claimed
+
+    def reap(self):
+        with self.assertLogs("jobs.scheduler", "WARNING"):
+            JobScheduler()._reap_expired_leases()
+
+    def test_expired_job_is_requeued_until_out_of_attempts(self):
+        job = self.job("job")
+        JobExecution.objects.create(job=job, user=self.user)
+
+        self.claim_and_die(job)
+        self.reap()
+        job.refresh_from_db()
+        self.assertEqual(job.status, "pending")
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(job.started_at)
+        self.assertEqual((job.worker_id, job.lease_expires_at), ("", None))
+        execution = JobExecution.objects.get(job=job)
+        self.assertFalse(execution.success)
+        self.assertIsNotNone(execution.completed_at)
+
+        # The second attempt is the last one
+        self.claim_and_die(job)
+        self.reap()
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNotNone(job.completed_at)
+        self.assertEqual(counters.rebuild(dry_run=True), {})
+
+    def test_dependents_of_a_failed_job_fail(self):
+        parent = self.job("parent")
+        child = self.job("child", [parent])
+        Job.objects.filter(id=parent.id).update(attempts=1)
+
+        self.claim_and_die(parent)
+        self.reap()
+        child.refresh_from_db()
+        self.assertEqual(child.status, "failed")
+
+    def test_broken_channel_layer_only_costs_the_notification(self):
+        job = self.job("job")
+        self.claim_and_die(job)
+        broken = {"default": {"BACKEND": "jobs.no.Layer"}}
+        with override_settings(CHANNEL_LAYERS=broken):
+            with self.assertLogs("jobs.scheduler", "WARNING") as logs:
+                JobScheduler()._reap_expired_leases()
+        output = "\n".join(logs.output)
+        self.assertIn("Error announcing 1 reaped jobs", output)
+        self.assertIn("Reaped 1 jobs with expired leases", output)
+        self.assertEqual(Job.objects.get(id=job.id).status, "pending")
+
+    def test_live_leases_are_left_alone(self):
+        job = self.job("job")
+        scheduler = JobScheduler()
+        scheduler._claim_job_ids([job.id])
+
+        with self.assertNoLogs("jobs.scheduler", "WARNING"):
+            JobScheduler()._reap_expired_leases()
+        job.refresh_from_db()
+        self.assertEqual(job.status, "running")
+        self.assertEqual(job.worker_id, scheduler.worker_id)
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+)
+class CompletionBufferTests(TestCase):
+    """Job outcomes are written in batches, once per job"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="completion-user")
+
+    def claim(self, count, scheduler):
+        jobs = [
+            Job.objects.create(
+                user=self.user,
+                name=f"job-{i}",
+                estimated_duration=1,
+                deadline=timezone.now() + timedelta(hours=1),
+            )
+            for i in range(count)
+        ]
+        return scheduler._claim_job_ids([job.id for job in jobs])
+
+    def buffer(self, scheduler, batch_size):
+        """A buffer that batches like a started one, without its thread"""
+        buffer = CompletionBuffer(scheduler.worker_id, batch_size=batch_size)
+        buffer._running = True
+        return buffer
+
+    def test_outcomes_wait_for_the_flush(self):
+        scheduler = JobScheduler()
+        jobs = self.claim(3, scheduler)
+        buffer = self.buffer(scheduler, batch_size=10)
+        for job in jobs:
+            buffer.record(job, job.started_at, success=True)
+
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(buffer.pending_ids(), {job.id for job in jobs})
+        self.assertEqual(Job.objects.filter(status="running").count(), 3)
+
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual((buffer.flushes, buffer.written, len(buffer)), (1, 3, 0))
+        self.assertEqual(Job.objects.filter(status="completed").count(), 3)
+        self.assertEqual(JobExecution.objects.filter(success=True).count(), 3)
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_a_batch_costs_the_same_queries_however_large(self):
+        scheduler = JobScheduler()
+        query_counts = []
+        for count in (2, 8):
+            buffer = self.buffer(scheduler, batch_size=100)
+            for job in self.claim(count, scheduler):
+                buffer.record(job, job.started_at, success=True)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(buffer.flush(), count)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_writes_through_when_not_buffering(self):
+        scheduler = JobScheduler()
+        [job] = self.claim(1, scheduler)
+        buffer = CompletionBuffer(scheduler.worker_id, batch_size=10)
+        buffer.record(job, job.started_at, success=True)
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(Job.objects.get(id=job.id).status, "completed")
+
+    def test_one_outcome_per_job_per_batch(self):
+        scheduler = JobScheduler()
+        [job] = self.claim(1, scheduler)
+        buffer = self.buffer(scheduler, batch_size=10)
+        buffer.record(job, job.started_at, success=True)
+        buffer.record(job, job.started_at, success=False, error="boom")
+
+        with self.assertLogs("jobs.write_behind", "ERROR"):
+            self.assertEqual(buffer.flush(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        [execution] = JobExecution.objects.filter(job=job)
+        self.assertEqual(execution.error_message, "boom")
+        self.assertEqual(counters.rebuild(dry_run=True), {})
+
+    def test_outcomes_of_lost_leases_are_dropped(self):
+        scheduler = JobScheduler()
+        kept, lost = self.claim(2, scheduler)
+        Job.objects.filter(id=lost.id).update(worker_id="another-scheduler")
+
+        buffer = self.buffer(scheduler, batch_size=10)
+        buffer.record(kept, kept.started_at, success=True)
+        buffer.record(lost, lost.started_at, success=True)
+        with self.assertLogs("jobs.write_behind", "WARNING") as logs:
+            self.assertEqual(buffer.flush(), 1)
+        self.assertIn(f"Dropped outcome of job {lost.id}", "\n".join(logs.output))
+
+        self.assertEqual(Job.objects.get(id=kept.id).status, "completed")
+        self.assertEqual(Job.objects.get(id=lost.id).status, "running")
+        self.assertFalse(JobExecution.objects.filter(job=lost).exists())
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+)
+class JobRowSerializerTests(TestCase):
+    """The listings' fast path gives exactly what JobSerializer gives"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="serializer-user")
+        now = timezone.now()
+        definition = RecurringJob.objects.create(
+            user=cls.user,
+            name="nightly",
+            cron_expression="0 2 * * *",
+            estimated_duration=60,
+            deadline_offset=3600,
+        )
+
+        jobs = []
+        for i, (status, _) in enumerate(Job.STATUS_CHOICES * 3):
+            started_at = None if status == "pending" else now - timedelta(minutes=i)
+            completed_at = now if status in ("completed", "failed") else None
+            jobs.append(
+                Job.objects.create(
+                    user=cls.user,
+                    name=f"job-{i}",
+                    estimated_duration=i + 1,
+                    priority=(1, 2, 3)[i % 3],
+                    deadline=now + timedelta(hours=1, microseconds=i),
+                    run_at=now + timedelta(minutes=5) if i % 4 == 0 else None,
+                    queue=("default", "gpu")[i % 2],
+                    recurring_job=definition if i % 5 == 0 else None,
+                    status=status,
+                    started_at=started_at,
+                    completed_at=completed_at,
+                )
+            )
+        for i, job in enumerate(jobs[3:], start=3):
+            job.dependencies.set(jobs[i % 3 : i : 2])
+
+    def without_wait_time(self, expected, data):
+        """Drop the wait times, measured against a different now by each"""
+        for expected_row, row in zip(expected, data):
+            self.assertAlmostEqual(
+                expected_row.pop("wait_time"), row.pop("wait_time"), delta=60
+            )
+
+    def test_same_json(self):
+        queryset = Job.objects.order_by("-created_at")
+        expected = JobSerializer(
+            queryset.prefetch_related("dependencies"), many=True
+        ).data
+        rows = list(JobRowSerializer.rows(queryset))
+        with self.assertNumQueries(1):
+            data = JobRowSerializer(rows).data
+
+        self.assertEqual(len(data), len(Job.STATUS_CHOICES) * 3)
+        self.without_wait_time(expected, data)
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(expected))
+
+    def test_single_job(self):
+        job = Job.objects.filter(dependencies__isnull=False).first()
+        [row] = JobRowSerializer.rows(Job.objects.filter(id=job.id))
+        data = JobRowSerializer(row, many=False).data
+        expected = JobSerializer(job).data
+        self.assertTrue(data["depends_on"])
+
+        self.without_wait_time([expected], [data])
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(expected))
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+)
+class RecurringFiringTests(TestCase):
+    """Due recurring definitions create their jobs"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="recurring-user")
+        cls.definition = RecurringJob.objects.create(
+            user=cls.user,
+            name="every minute",
+            cron_expression="* * * * *",
+            estimated_duration=1,
+            deadline_offset=3600,
+        )
+
+    def setUp(self):
+        RecurringJob.objects.filter(id=self.definition.id).update(
+            next_fire_at=timezone.now() - timedelta(seconds=1)
+        )
+
+    def test_due_definitions_fire(self):
+        with self.assertLogs("jobs.scheduler", "INFO"):
+            JobScheduler()._fire_recurring_jobs()
+        self.assertEqual(Job.objects.filter(recurring_job=self.definition).count(), 1)
+        self.definition.refresh_from_db()
+        self.assertGreater(self.definition.next_fire_at, timezone.now())
+
+    @override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "jobs.no.Layer"}})
+    def test_broken_channel_layer_only_costs_the_notification(self):
+        scheduler = JobScheduler()
+        with self.assertLogs("jobs.scheduler", "ERROR") as logs:
+            scheduler._fire_recurring_jobs()
+        self.assertIn("Error announcing 1 created jobs", "\n".join(logs.output))
+
+        self.assertEqual(Job.objects.filter(recurring_job=self.definition).count(), 1)
+        self.assertGreater(scheduler._next_recurring_check, 0)
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+)
+class ExecutionListTests(TestCase):
+    """The execution list's job filter offers the newest jobs only"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="execution-user")
+        now = timezone.now()
+        jobs = Job.objects.bulk_create(
+            Job(
+                user=cls.user,
+                name=f"job-{i}",
+                estimated_duration=1,
+                deadline=now + timedelta(hours=1),
+                latest_start_at=now + timedelta(hours=1),
+            )
+            for i in range(views.EXECUTION_FILTER_JOBS + 20)
+        )
+        # created_at is set on insert; spread it so job-0 is the newest
+        for i, job in enumerate(jobs):
+            Job.objects.filter(id=job.id).update(created_at=now - timedelta(minutes=i))
+        cls.oldest = jobs[-1]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_filter_offers_the_newest_jobs(self):
+        response = self.client.get(reverse("jobs:job_execution_list"))
+        self.assertEqual(response.status_code, 200)
+        names = [job.name for job in response.context["user_jobs"]]
+        self.assertEqual(
+            names, [f"job-{i}" for i in range(views.EXECUTION_FILTER_JOBS)]
+        )
+
+    def test_filtered_job_is_offered_and_selected(self):
+        response = self.client.get(
+            reverse("jobs:job_execution_list"), {"job": str(self.oldest.id)}
+        )
+        self.assertEqual(response.context["user_jobs"][-1], self.oldest)
+        self.assertContains(
+            response, f'<option value="{self.oldest.id}" selected>', html=False
+        )
@@ -0,0 +1,132 @@
+# jobs/timing_wheel.py
+import heapq
+import math
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel holding jobs that may not start yet.
+
+    Time is counted in ticks of ``tick`` seconds. Level 0 has one bucket per
+    tick for the next ``slots`` ticks, level 1 one bucket per ``slots`` ticks,
+    and so on, so a handful of levels covers years. Scheduling and cancelling
+    a job are O(1). When the clock reaches a bucket, its jobs either come due
+    or cascade into a finer level; each job cascades at most once per level.
+
+    Only non-empty buckets are tracked in a heap of expiry times (at most
+    ``slots * levels`` of them), so advancing the clock never walks empty
+    ticks, however long the scheduler slept, and the next expiry is known
+    without a scan.
+    """
+
+    def __init__(self, tick=0.01, slots=256, levels=4, now=0.0):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._units = [slots**level for level in range(levels)]
+        self._current = math.floor(now / tick)
+        self._buckets = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._expirations = [[None] * slots for _ in range(levels)]
+        self._heap = []
+        self._locations = {}
+
+    def __len__(self):
+        return len(self._locations)
+
+    def __contains__(self, job_id):
+        return job_id in self._locations
+
+    def schedule(self, job_id, due, item):
+        """
+        Hold ``item`` until ``due`` (seconds since the epoch). Returns False,
+        without holding it, if it is already due.
+        """
+        self.cancel(job_id)
+
+        # Round up so nothing is released before its time
+        return self._place(job_id, math.ceil(due / self.tick), item)
+
+    def cancel(self, job_id):
+        """Drop a job if it is held"""
+        location = self._locations.pop(job_id, None)
+        if location is not None:
+            level, slot = location
+            del self._buckets[level][slot][job_id]
+
+    def advance(self, now):
+        """Move the clock to ``now`` and return the items that came due"""
+        # Allow for float error so advancing to next_expiration() reaches it
+        target = math.floor(now / self.tick + 1e-6)
+        due = []
+
+        while self._heap and self._heap[0][0] <= target:
+            expiration, level, slot = heapq.heappop(self._heap)
+
+            # Buckets emptied or reused since this entry was pushed
+            if self._expirations[level][slot] != expiration:
+                continue
+
+            bucket = self._buckets[level][slot]
+            self._buckets[level][slot] = {}
+            self._expirations[level][slot] = None
+            self._current = max(self._current, expiration)
+
+            for job_id, (due_tick, item) in bucket.items():
+                del self._locations[job_id]
+                if not self._place(job_id, due_tick, item):
+                    due.append(item)
+
+        self._current = max(self._current, target)
+        return due
+
+    def next_expiration(self):
+        """Time (seconds since the epoch) the wheel next needs advancing, or None"""
+        while self._heap:
+            expiration, level, slot = self._heap[0]
+            if self._expirations[level][slot] == expiration and (
+                self._buckets[level][slot]
+            ):
+                return expiration * self.tick
+
+            heapq.heappop(self._heap)
+            if self._expirations[level][slot] == expiration:
+                self._expirations[level][slot] = None
+        return None
+
+    def clear(self):
+        """Drop every held job"""
+        for job_id in list(self._locations):
+            self.cancel(job_id)
+
+    def _place(self, job_id, due_tick, item):
+        """Put a job in the finest bucket that can hold it; False if it is due"""
+        if due_tick <= self._current:
+            return False
+
+        for level, unit in enumerate(self._units):
+            level_start = self._current - self._current % unit
+            if due_tick < level_start + unit * self.slots:
+                break
+        else:
+            # Beyond the wheel's span: park it in the coarsest level's last
+            # bucket and place it again when that bucket expires
+            level, unit = self.levels - 1, self._units[-1]
+            level_start = self._current - self._current % unit
+            due_tick_in_span = level_start + unit * (self.slots - 1)
+            return self._add(job_id, due_tick, item, level, due_tick_in_span)
+
+        return self._add(job_id, due_tick, item, level, due_tick)
+
+    def _add(self, job_id, due_tick, item, level, bucket_tick):
+        """Add a job to the bucket of ``level`` covering ``bucket_tick``"""
+        unit = self._units[level]
+        slot = (bucket_tick // unit) % self.slots
+        expiration = bucket_tick - bucket_tick % unit
+
+        if self._expirations[level][slot] != expiration:
+            self._expirations[level][slot] = expiration
+            heapq.heappush(self._heap, (expiration, level, slot))
+
+        self._buckets[level][slot][job_id] = (due_tick, item)
+        self._locations[job_id] = (level, slot)
+        return True
@@ -6,6 +6,9 @@ from . import views
 router = routers.DefaultRouter()
 router.register(r"jobs", views.JobViewSet, basename="api-job")
 router.register(r"executions", views.JobExecutionViewSet, basename="api-execution")
+router.register(
+    r"recurring-jobs", views.RecurringJobViewSet, basename="api-recurring-job"
+)
 
 app_name = "jobs"
 
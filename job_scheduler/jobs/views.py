@@ -1,14 +1,31 @@
-from rest_framework import viewsets, permissions, filters, status
+import types
+from rest_framework import viewsets, permissions, filters, generics, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
-from .models import Job, JobExecution
-from .serializers import JobSerializer, JobExecutionSerializer
+from . import feasibility, metrics
+from .bulk import BulkJSONParser, NDJSONParser, create_jobs
+from .models import Job, JobExecution, RecurringJob
+from .pagination import KeysetPagination, page_from_request, page_links
+from .quantiles import latency_percentiles
+from .renderers import ORJSONRenderer
+from .serializers import (
+    JobSerializer,
+    JobExecutionSerializer,
+    JobRowSerializer,
+    RecurringJobSerializer,
+)
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .forms import JobForm
-from django.db.models import Count
-from django.http import JsonResponse
+from .scheduler import get_scheduler
+from .stats import user_job_stats
+from django.http import HttpResponse, JsonResponse
+
+# Newest jobs offered by the execution list's job filter
+EXECUTION_FILTER_JOBS = 100
 
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
@@ -32,6 +49,8 @@ class JobViewSet(viewsets.ModelViewSet):
     search_fields = ["name"]
     ordering_fields = ["created_at", "deadline", "priority", "status"]
     ordering = ["-created_at"]
+    pagination_class = KeysetPagination
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
 
     def get_queryset(self):
         """
@@ -39,55 +58,42 @@ class JobViewSet(viewsets.ModelViewSet):
         for the currently authenticated user.
         """
         user = self.request.user
-        return Job.objects.filter(user=user)
+        return Job.objects.filter(user=user).prefetch_related("dependencies")
+
+    def list(self, request, *args, **kwargs):
+        """List jobs through the JobRowSerializer fast path"""
+        rows = JobRowSerializer.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(JobRowSerializer(page).data)
+        return Response(JobRowSerializer(rows).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Get a job through the JobRowSerializer fast path"""
+        rows = JobRowSerializer.rows(self.filter_queryset(self.get_queryset()))
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = generics.get_object_or_404(
+            rows, **{self.lookup_field: kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(request, row)
+        return Response(JobRowSerializer(row, many=False).data)
 
     @action(detail=False, methods=["get"])
     def analytics(self, request):
         """
         Provide basic analytics about user's jobs
         """
-        user = request.user
-        jobs = Job.objects.filter(user=user)
-
-        # Calculate analytics
-        stats = {
-            "total_jobs": jobs.count(),
-            "by_status": {
-                "pending": jobs.filter(status="pending").count(),
-                "running": jobs.filter(status="running").count(),
-                "completed": jobs.filter(status="completed").count(),
-                "failed": jobs.filter(status="failed").count(),
-            },
-            "by_priority": {
-                "high": jobs.filter(priority="high").count(),
-                "medium": jobs.filter(priority="medium").count(),
-                "low": jobs.filter(priority="low").count(),
-            },
-        }
-
-        # Calculate average wait times
-        completed_jobs = jobs.filter(status="completed")
-        if completed_jobs.exists():
-            waiting_times = []
-            execution_times = []
-
-            for job in completed_jobs:
-                if job.wait_time:
-                    waiting_times.append(job.wait_time)
-                if job.duration:
-                    execution_times.append(job.duration)
-
-            stats["avg_wait_time"] = (
-                sum(waiting_times) / len(waiting_times) if waiting_times else 0
-            )
-            stats["avg_execution_time"] = (
-                sum(execution_times) / len(execution_times) if execution_times else 0
-            )
-        else:
-            stats["avg_wait_time"] = 0
-            stats["avg_execution_time"] = 0
-
-        return Response(stats)
+        stats = user_job_stats(request.user)
+        return Response(
+            {
+                "total_jobs": stats["total_jobs"],
+                "by_status": stats["status_counts"],
+                "by_priority": stats["priority_counts"],
+                "avg_wait_time": stats["avg_wait_time"],
+                "avg_execution_time": stats["avg_execution_time"],
+                "percentiles": latency_percentiles(request.user),
+            }
+        )
 
     @action(detail=True, methods=["get"])
     def executions(self, request, pk=None):
@@ -121,36 +127,26 @@ class JobViewSet(viewsets.ModelViewSet):
         """Set the user when creating a job"""
         serializer.save(user=self.request.user)
 
+    @action(
+        detail=False, methods=["post"], parser_classes=[BulkJSONParser, NDJSONParser]
+    )
+    def bulk(self, request):
+        """
+        Create many jobs at once from a JSON array or streamed NDJSON (one job
+        per line), all or nothing
+        """
+        rows = request.data
+        # A JSON array parses to a list, NDJSON to a generator of rows
+        if not isinstance(rows, (list, types.GeneratorType)):
+            raise ParseError("Expected a list of jobs")
+
+        created = create_jobs(rows, request.user, self.get_serializer_context())
+        return Response({"created": created}, status=status.HTTP_201_CREATED)
+
     @action(detail=False, methods=["get"])
     def stats(self, request):
         """Get statistics about the user's jobs"""
-        user_jobs = self.get_queryset()
-
-        # Get counts by status
-        status_counts = user_jobs.values("status").annotate(count=Count("status"))
-
-        # Get counts by priority
-        priority_counts = user_jobs.values("priority").annotate(count=Count("priority"))
-
-        # Calculate average wait times
-        waiting_times = []
-        completed_jobs = user_jobs.filter(status="completed")
-        for job in completed_jobs:
-            if job.started_at and job.created_at:
-                waiting_times.append((job.started_at - job.created_at).total_seconds())
-
-        avg_wait_time = sum(waiting_times) / len(waiting_times) if waiting_times else 0
-
-        data = {
-            "status_counts": {item["status"]: item["count"] for item in status_counts},
-            "priority_counts": {
-                item["priority"]: item["count"] for item in priority_counts
-            },
-            "avg_wait_time": avg_wait_time,
-            "total_jobs": user_jobs.count(),
-        }
-
-        return Response(data)
+        return Response(user_job_stats(request.user))
 
 
 @login_required
@@ -165,6 +161,7 @@ def job_create(request):
             job.user = request.user
             job.save()
             messages.success(request, f'Job "{job.name}" created successfully!')
+            _warn_about_deadline(request, job, form.deadline_warning)
             return redirect("jobs:job_detail", job_id=job.id)
     else:
         form = JobForm()
@@ -172,6 +169,13 @@ def job_create(request):
     return render(request, "jobs/job_create.html", {"form": form})
 
 
+def _warn_about_deadline(request, job, warning):
+    """Tell the user, and the job's log, that the deadline looks unlikely"""
+    if warning:
+        feasibility.log_deadline_warning(job, warning)
+        messages.warning(request, warning)
+
+
 @login_required
 def job_list(request):
     """
@@ -188,8 +192,8 @@ def job_list(request):
     # Apply filters
     if status_filter and status_filter in dict(Job.STATUS_CHOICES):
         jobs = jobs.filter(status=status_filter)
-    if priority_filter and priority_filter in dict(Job.PRIORITY_CHOICES):
-        jobs = jobs.filter(priority=priority_filter)
+    if priority_filter and priority_filter in Job.PRIORITY_VALUES:
+        jobs = jobs.filter(priority=Job.PRIORITY_VALUES[priority_filter])
 
     # Apply sorting
     valid_sort_fields = {
@@ -204,90 +208,47 @@ def job_list(request):
         "deadline": "deadline",
         "-deadline": "-deadline",
     }
-    if sort_by in valid_sort_fields:
-        jobs = jobs.order_by(valid_sort_fields[sort_by])
+    # Show one page, starting from the cursor rather than counting rows
+    page = page_from_request(
+        jobs, valid_sort_fields.get(sort_by, "-created_at"), request
+    )
 
     # Calculate analytics
-    all_user_jobs = Job.objects.filter(user=request.user)
-
-    # Status counts
+    summary = user_job_stats(request.user)
     stats = {
-        "pending_count": all_user_jobs.filter(status="pending").count(),
-        "running_count": all_user_jobs.filter(status="running").count(),
-        "completed_count": all_user_jobs.filter(status="completed").count(),
-        "failed_count": all_user_jobs.filter(status="failed").count(),
+        f"{status}_count": count for status, count in summary["status_counts"].items()
     }
-
-    # Priority counts
-    stats.update(
-        {
-            "high_priority_count": all_user_jobs.filter(priority="high").count(),
-            "medium_priority_count": all_user_jobs.filter(priority="medium").count(),
-            "low_priority_count": all_user_jobs.filter(priority="low").count(),
-        }
-    )
-
-    # Calculate average wait time for completed jobs
-    completed_jobs = all_user_jobs.filter(status="completed")
-    total_wait_time = 0
-    wait_time_count = 0
-
-    for job in completed_jobs:
-        if job.started_at and job.created_at:
-            wait_time = (job.started_at - job.created_at).total_seconds()
-            total_wait_time += wait_time
-            wait_time_count += 1
-
-    stats["avg_wait_time"] = (
-        round(total_wait_time / wait_time_count, 3) if wait_time_count > 0 else 0
-    )
-
-    # Calculate average execution time
-    total_execution_time = 0
-    execution_count = 0
-
-    for job in completed_jobs:
-        if job.duration is not None:
-            total_execution_time += job.duration
-            execution_count += 1
-
-    stats["avg_execution_time"] = (
-        round(total_execution_time / execution_count, 3) if execution_count > 0 else 0
-    )
-
-    # Calculate priority percentages
-    total_jobs = all_user_jobs.count()
-    if total_jobs > 0:
-        stats.update(
-            {
-                "high_priority_percentage": round(
-                    (stats["high_priority_count"] / total_jobs) * 100, 1
-                ),
-                "medium_priority_percentage": round(
-                    (stats["medium_priority_count"] / total_jobs) * 100, 1
-                ),
-                "low_priority_percentage": round(
-                    (stats["low_priority_count"] / total_jobs) * 100, 1
-                ),
-            }
-        )
-    else:
-        stats.update(
+    total_jobs = summary["total_jobs"]
+    priority_stats = []
+    for level, label in Job.PRIORITY_CHOICES:
+        count = summary["priority_counts"][Job.PRIORITY_NAMES[level]]
+        percentage = round(count / total_jobs * 100, 1) if total_jobs else 0
+        stats[f"{Job.PRIORITY_NAMES[level]}_priority_count"] = count
+        stats[f"{Job.PRIORITY_NAMES[level]}_priority_percentage"] = percentage
+        priority_stats.append(
             {
-                "high_priority_percentage": 0,
-                "medium_priority_percentage": 0,
-                "low_priority_percentage": 0,
+                "label": label,
+                "color": Job.PRIORITY_COLORS[level],
+                "count": count,
+                "percentage": percentage,
             }
         )
+    stats["avg_wait_time"] = round(summary["avg_wait_time"], 3)
+    stats["avg_execution_time"] = round(summary["avg_execution_time"], 3)
 
     context = {
-        "jobs": jobs,
+        "jobs": page.items,
+        **page_links(request, page),
         "stats": stats,
+        "priority_stats": priority_stats,
         "status_filter": status_filter,
         "priority_filter": priority_filter,
         "sort_by": sort_by,
         "status_choices": Job.STATUS_CHOICES,
-        "priority_choices": Job.PRIORITY_CHOICES,
+        # Filtered by name, so links keep working if levels are renumbered
+        "priority_choices": [
+            (Job.PRIORITY_NAMES[level], label) for level, label in Job.PRIORITY_CHOICES
+        ],
     }
 
     return render(request, "jobs/job_list.html", context)
@@ -326,6 +287,7 @@ def job_edit(request, job_id):
         if form.is_valid():
             form.save()
             messages.success(request, f'Job "{job.name}" updated successfully!')
+            _warn_about_deadline(request, job, form.deadline_warning)
             return redirect("jobs:job_detail", job_id=job.id)
     else:
         form = JobForm(instance=job)
@@ -363,33 +325,7 @@ def job_delete(request, job_id):
 @login_required
 def job_stats(request):
     """Get job statistics"""
-    user_jobs = Job.objects.filter(user=request.user)
-
-    # Get counts by status
-    status_counts = user_jobs.values("status").annotate(count=Count("status"))
-
-    # Get counts by priority
-    priority_counts = user_jobs.values("priority").annotate(count=Count("priority"))
-
-    # Calculate average wait times
-    waiting_times = []
-    completed_jobs = user_jobs.filter(status="completed")
-    for job in completed_jobs:
-        if job.started_at and job.created_at:
-            waiting_times.append((job.started_at - job.created_at).total_seconds())
-
-    avg_wait_time = sum(waiting_times) / len(waiting_times) if waiting_times else 0
-
-    data = {
-        "status_counts": {item["status"]: item["count"] for item in status_counts},
-        "priority_counts": {
-            item["priority"]: item["count"] for item in priority_counts
-        },
-        "avg_wait_time": avg_wait_time,
-        "total_jobs": user_jobs.count(),
-    }
-
-    return JsonResponse(data)
+    return JsonResponse(user_job_stats(request.user))
 
 
 class JobExecutionViewSet(viewsets.ReadOnlyModelViewSet):
@@ -399,10 +335,45 @@ class JobExecutionViewSet(viewsets.ReadOnlyModelViewSet):
 
     serializer_class = JobExecutionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
 
     def get_queryset(self):
         """Only return executions for jobs belonging to the current user"""
-        return JobExecution.objects.filter(job__user=self.request.user)
+        return JobExecution.objects.filter(user=self.request.user).order_by(
+            "-started_at"
+        )
+
+
+class RecurringJobViewSet(viewsets.ModelViewSet):
+    """
+    API endpoint for recurring job definitions. Each one generates a job every
+    time its cron expression fires.
+    """
+
+    serializer_class = RecurringJobSerializer
+    permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ["name"]
+    ordering_fields = ["name", "next_fire_at", "created_at"]
+    ordering = ["name"]
+
+    def get_queryset(self):
+        """Only return the current user's definitions"""
+        return RecurringJob.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        """Set the user when creating a definition"""
+        serializer.save(user=self.request.user)
+
+    @action(detail=True, methods=["get"])
+    def jobs(self, request, pk=None):
+        """Get the jobs a definition has generated, newest first, a page at a time"""
+        definition = self.get_object()
+        jobs = JobRowSerializer.rows(definition.jobs.order_by("-created_at"))
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(jobs, request, view=self)
+        return paginator.get_paginated_response(JobRowSerializer(page).data)
 
 
 @login_required
@@ -416,9 +387,7 @@ def job_execution_list(request):
     sort_by = request.GET.get("sort", "-started_at")  # Default sort by start time desc
 
     # Get all executions for the user's jobs
-    executions = JobExecution.objects.filter(job__user=request.user).select_related(
-        "job"
-    )
+    executions = JobExecution.objects.filter(user=request.user).select_related("job")
 
     # Apply filters
     if job_filter:
@@ -437,14 +406,25 @@ def job_execution_list(request):
         "job__name": "job__name",
         "-job__name": "-job__name",
     }
-    if sort_by in valid_sort_fields:
-        executions = executions.order_by(valid_sort_fields[sort_by])
+    page = page_from_request(
+        executions, valid_sort_fields.get(sort_by, "-started_at"), request
+    )
 
-    # Get all jobs for the filter dropdown
-    user_jobs = Job.objects.filter(user=request.user)
+    # Offer the newest jobs, read in (user, -created_at, -id) index order
+    # rather than the user's whole history, plus the one filtered on
+    user_jobs = list(
+        Job.objects.filter(user=request.user)
+        .order_by("-created_at", "-id")
+        .only("id", "name")[:EXECUTION_FILTER_JOBS]
+    )
+    if job_filter and all(str(job.id) != job_filter for job in user_jobs):
+        user_jobs.extend(
+            Job.objects.filter(user=request.user, id=job_filter).only("id", "name")
+        )
 
     context = {
-        "executions": executions,
+        "executions": page.items,
+        **page_links(request, page),
         "job_filter": job_filter,
         "success_filter": success_filter,
         "sort_by": sort_by,
@@ -452,3 +432,21 @@ def job_execution_list(request):
     }
 
     return render(request, "jobs/job_execution_list.html", context)
+
+
+def metrics_view(request):
+    """
+    Prometheus metrics, for staff users and requests with the bearer token
+    SCHEDULER_METRICS_TOKEN. Scheduler gauges are only included when the
+    scheduler runs in this process; otherwise scrape start_scheduler's
+    --metrics-port.
+    """
+    if not metrics.token_matches(request.headers.get("Authorization")):
+        if not request.user.is_authenticated:
+            return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+        if not request.user.is_staff:
+            return HttpResponse(status=403)
+
+    return HttpResponse(
+        metrics.render(get_scheduler()), content_type=metrics.CONTENT_TYPE
+    )
@@ -0,0 +1,31 @@
+# jobs/worker.py
+# Job bodies. This module must not import Django: it runs inside worker
+# processes and as `python -m jobs.worker`, which reads one JSON payload on
+# stdin and writes one JSON result to stdout.
+import json
+import sys
+import time
+
+
+def run_job(payload):
+    """
+    Run a job body and return a compact ``(success, error_message,
+    execution_time)`` result
+    """
+    started = time.perf_counter()
+    try:
+        # Simulate work
+        time.sleep(payload["estimated_duration"])
+    except Exception as e:
+        return False, str(e), round(time.perf_counter() - started, 3)
+    return True, None, round(time.perf_counter() - started, 3)
+
+
+def main():
+    """Run the payload read from stdin"""
+    result = run_job(json.load(sys.stdin))
+    json.dump(result, sys.stdout, separators=(",", ":"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# jobs/write_behind.py
+import collections
+import logging
+import threading
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from . import counters, metrics, quantiles
+from .dependencies import fail_dependents, release_dependents
+from .models import Job, JobExecution
+
+logger = logging.getLogger(__name__)
+
+
+JobOutcome = collections.namedtuple(
+    "JobOutcome", ["job", "started_at", "completed_at", "success", "error_message"]
+)
+
+
+class CompletionBuffer:
+    """
+    Write-behind buffer for job outcomes. Finished jobs are recorded in memory
+    and written in batches, every flush interval or as soon as a batch fills
+    up: one locking SELECT, one bulk UPDATE of the jobs and one bulk INSERT of
+    their execution records per batch, instead of several round trips per job.
+
+    Buffered jobs stay ``running`` in the database until their batch is
+    written, and the scheduler keeps renewing their leases meanwhile. If the
+    scheduler dies first, their leases expire and they are requeued like any
+    other job it was running, so no outcome is ever reported that was not
+    written. Only jobs still running under this scheduler's lease are updated.
+    """
+
+    def __init__(self, worker_id, flush_interval=None, batch_size=None):
+        self.worker_id = worker_id
+        self.flush_interval = (
+            flush_interval or settings.SCHEDULER_COMPLETION_FLUSH_INTERVAL
+        )
+        self.batch_size = batch_size or settings.SCHEDULER_COMPLETION_BATCH_SIZE
+        self.flushes = 0
+        self.written = 0
+        self._outcomes = []
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Start flushing in a background thread"""
+        if self._running:
+            return
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and write whatever is still buffered"""
+        self._running = False
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def record(self, job, started_at, success, error=None):
+        """Buffer the outcome of a job that ran under this scheduler's lease"""
+        outcome = JobOutcome(
+            job=job,
+            started_at=started_at,
+            completed_at=timezone.now(),
+            success=success,
+            error_message=None if error is None else str(error),
+        )
+        metrics.EXECUTION_SECONDS.observe(
+            (outcome.completed_at - started_at).total_seconds()
+        )
+        metrics.JOBS_FINISHED.inc("completed" if success else "failed")
+
+        with self._lock:
+            self._outcomes.append(outcome)
+            full = len(self._outcomes) >= self.batch_size
+
+        # Without a flusher thread, or with batching turned off, write through
+        if not self.buffering:
+            self.flush()
+        elif full:
+            self._wakeup.set()
+
+    @property
+    def buffering(self):
+        """Whether record() leaves writing to the background thread"""
+        return self._running and self.batch_size > 1
+
+    def pending_ids(self):
+        """Ids of jobs whose outcome has not been written yet"""
+        with self._lock:
+            return {outcome.job.id for outcome in self._outcomes} | self._in_flight
+
+    def __len__(self):
+        with self._lock:
+            return len(self._outcomes)
+
+    def _run(self):
+        """Flush every interval, or sooner when a batch fills up"""
+        while self._running:
+            self._wakeup.wait(timeout=self.flush_interval)
+            self._wakeup.clear()
+
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error writing job outcomes: {e}")
+
+    def flush(self):
+        """Write the buffered outcomes now; return how many jobs were updated"""
+        with self._flush_lock:
+            with self._lock:
+                outcomes, self._outcomes = self._outcomes, []
+                self._in_flight = {outcome.job.id for outcome in outcomes}
+
+            if not outcomes:
+                return 0
+
+            try:
+                written = self._write(outcomes)
+            except Exception:
+                # Keep them for the next flush; their leases are still renewed
+                with self._lock:
+                    self._outcomes[:0] = outcomes
+                raise
+            finally:
+                with self._lock:
+                    self._in_flight = set()
+
+        self.flushes += 1
+        self.written += written
+        return written
+
+    def _write(self, outcomes):
+        """Apply a batch of outcomes to the Job and JobExecution tables"""
+        # Imported here because signals imports the scheduler, which imports us
+        from .scheduler import notify_scheduler
+        from .signals import broadcast_job_updates
+
+        # A job is only moved once per batch, by its latest outcome
+        outcomes = list({outcome.job.id: outcome for outcome in outcomes}.values())
+
+        with transaction.atomic():
+            # Another scheduler may have taken over an expired lease
+            held = set(
+                Job.objects.select_for_update()
+                .filter(
+                    id__in=[outcome.job.id for outcome in outcomes],
+                    status="running",
+                    worker_id=self.worker_id,
+                )
+                .values_list("id", flat=True)
+            )
+
+            jobs = []
+            executions = []
+            for outcome in outcomes:
+                job = outcome.job
+                if job.id not in held:
+                    continue
+
+                job.status = "completed" if outcome.success else "failed"
+                job.completed_at = job.updated_at = outcome.completed_at
+                jobs.append(job)
+
+                executions.append(
+                    JobExecution(
+                        job=job,
+                        user_id=job.user_id,
+                        started_at=outcome.started_at,
+                        completed_at=outcome.completed_at,
+                        success=outcome.success,
+                        execution_time=round(
+                            (outcome.completed_at - outcome.started_at).total_seconds(),
+                            3,
+                        ),
+                        error_message=outcome.error_message,
+                    )
+                )
+
+            Job.objects.bulk_update(jobs, ["status", "completed_at", "updated_at"])
+            counters.jobs_moved(jobs, "running")
+            quantiles.record(jobs)
+            JobExecution.objects.bulk_create(executions)
+
+            # Start the jobs waiting only on these, and give up on the jobs
+            # that depend on failed ones
+            runnable = release_dependents(
+                [job.id for job in jobs if job.status == "completed"]
+            )
+            for job_id in runnable:
+                notify_scheduler(job_id)
+            skipped = fail_dependents(
+                [job.id for job in jobs if job.status == "failed"],
+                now=timezone.now(),
+            )
+
+        broadcast_job_updates(jobs + skipped)
+
+        for outcome in outcomes:
+            job = outcome.job
+            if job.id not in held:
+                logger.warning(f"Dropped outcome of job {job.id}: lease lost")
+            elif outcome.success:
+                logger.info(f"Completed job {job.name} ({job.id})")
+            else:
+                logger.error(
+                    f"Job {job.name} ({job.id}) failed: {outcome.error_message}"
+                )
+        return len(jobs)
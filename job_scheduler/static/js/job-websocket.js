@@ -7,6 +7,7 @@ class JobSocket {
 			stats: [],
 			jobs: [],
 			job_update: [],
+			jobs_created: [],
 		};
 	}
 
@@ -27,9 +28,12 @@ class JobSocket {
 		this.socket.addEventListener("message", (event) => {
 			const data = JSON.parse(event.data);
 
-			// Trigger appropriate callbacks based on message type
+			// Trigger appropriate callbacks based on message type. The whole
+			// message is passed too, for the page cursors of "jobs" messages.
 			if (data.type && this.callbacks[data.type]) {
-				this.callbacks[data.type].forEach((callback) => callback(data.data));
+				this.callbacks[data.type].forEach((callback) =>
+					callback(data.data, data)
+				);
 			}
 		});
 
@@ -68,14 +72,16 @@ class JobSocket {
 		);
 	}
 
-	// Request updated job list
-	getJobs(status = null) {
+	// Request a page of the job list; pass the "next" or "previous" cursor
+	// of a "jobs" message to get the page after or before it
+	getJobs(status = null, cursor = null) {
 		if (!this.connected) return;
 
 		this.socket.send(
 			JSON.stringify({
 				command: "get_jobs",
 				status: status,
+				cursor: cursor,
 			})
 		);
 	}